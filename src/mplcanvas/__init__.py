@@ -8,26 +8,28 @@ try:
 except importlib.metadata.PackageNotFoundError:
     __version__ = "0.0.0"
 
-
-# For matplotlib compatibility
-import matplotlib.rcsetup as _rcsetup
-
 from . import pyplot
+from .animation import FuncAnimation
+from .config import rcParams
 from .figure import Figure
 
-rcParams = _rcsetup.defaultParams.copy()
-
 # Re-export pyplot functions at package level (like matplotlib)
 from .pyplot import (
     figure,
     subplots,
 )
+from .store import SeriesStore, series_store
+from .updates import UpdateQueue
 
 __all__ = [
     "Figure",
+    "FuncAnimation",
+    "SeriesStore",
+    "UpdateQueue",
     "figure",
     "pyplot",
     "rcParams",
+    "series_store",
     "subplots",
 ]
 
@@ -0,0 +1,187 @@
+# mplcanvas/animation.py
+"""
+Animations driven by the kernel event loop.
+
+Unlike a loop calling ``set_data`` and ``Figure.draw`` in a cell, which blocks the
+kernel until it is done, an animation schedules its frames on the asyncio event
+loop, so the notebook stays responsive while it runs.
+
+Usage:
+    fig, ax = plt.subplots()
+    (line,) = ax.plot(x, np.sin(x))
+
+    def update(i):
+        line.set_ydata(np.sin(x + i / 10))
+        return (line,)
+
+    anim = FuncAnimation(fig, update, frames=200, fps=30, blit=True)
+"""
+
+import itertools
+import time
+
+from .render import data_artists
+from .utils import running_loop
+
+
+class FuncAnimation:
+    """
+    Make an animation by repeatedly calling a function, like
+    ``matplotlib.animation.FuncAnimation``.
+
+    ``func(frame, *fargs)`` is called for each frame. ``frames`` can be an
+    iterable, an int (``range(frames)``), a generator function, or ``None`` for an
+    endless animation. The animation targets ``fps`` frames per second (or one
+    frame per ``interval`` milliseconds). When rendering can not keep up, frames
+    are skipped instead of falling behind: the frames which are due are skipped
+    except for the last one, and no frame is computed while the previous one is
+    still waiting to be sent to the browser.
+
+    With ``blit=True``, ``func`` (and ``init_func``) must return the artists which
+    they changed. Only these artists are then sent for each frame: the other
+    artists of their axes are drawn once into an offscreen canvas (see
+    ``Figure.set_static``), and the axes without animated artists are not
+    redrawn. Without blitting, the whole figure is redrawn for each frame.
+
+    The animation starts immediately, and requires a running event loop (as in
+    Jupyter).
+    """
+
+    def __init__(
+        self,
+        fig,
+        func,
+        frames=None,
+        init_func=None,
+        fargs=None,
+        interval: float = 200.0,
+        fps: float | None = None,
+        repeat: bool = True,
+        blit: bool = False,
+    ):
+        self.figure = fig
+        self.func = func
+        self.init_func = init_func
+        self.fargs = tuple(fargs or ())
+        self.interval = 1.0 / fps if fps is not None else interval / 1000.0
+        self.repeat = repeat
+        self.blit = blit
+        self._frames = frames
+        self._loop = running_loop()
+        if self._loop is None:
+            raise RuntimeError("Animations require a running event loop.")
+
+        # Number of frames which were skipped to keep up with the frame rate
+        self.skipped = 0
+        self._handle = None
+        self._static = []
+        self._blit_axes = None
+
+        self._iterator = self._new_iterator()
+        if init_func is not None:
+            init = init_func()
+            if blit and init is None:
+                raise RuntimeError("The init_func must return a sequence of Artists.")
+            self._set_animated(init)
+        self._start = time.monotonic()
+        self._count = 0
+        self._handle = self._loop.call_soon(self._step)
+
+    def _new_iterator(self):
+        frames = self._frames
+        if frames is None:
+            return itertools.count()
+        if isinstance(frames, int):
+            return iter(range(frames))
+        if callable(frames):
+            return iter(frames())
+        return iter(frames)
+
+    def _next_frame(self):
+        """The next frame, or ``None`` at the end of the animation"""
+        try:
+            return (next(self._iterator),)
+        except StopIteration:
+            if not self.repeat:
+                return None
+            self._iterator = self._new_iterator()
+            try:
+                return (next(self._iterator),)
+            except StopIteration:
+                return None
+
+    def _step(self):
+        """Compute and draw the frame which is due, then schedule the next one"""
+        self._handle = None
+        now = time.monotonic()
+        due = int((now - self._start) / self.interval)
+        if self.figure._deferred_handle is not None:
+            # The previous frame was deferred by the flow control, and is still
+            # waiting to be sent: do not compute a new one
+            self._schedule(due + 1)
+            return
+
+        # Skip the frames which are overdue, except the last one. The last frame of
+        # the animation is always drawn.
+        frame = self._next_frame()
+        while frame is not None and self._count < due:
+            following = self._next_frame()
+            if following is None:
+                break
+            self._count += 1
+            self.skipped += 1
+            frame = following
+        if frame is None:
+            self.stop()
+            return
+        self._count += 1
+
+        changed = self.func(*frame, *self.fargs)
+        if self.blit and changed is None:
+            self.stop()
+            raise RuntimeError(
+                "The animation function must return a sequence of Artists when "
+                "blitting."
+            )
+        if self.blit:
+            if self._blit_axes is None:
+                self._set_animated(changed)
+            self.figure.draw(self._blit_axes)
+        else:
+            self.figure.draw()
+        self._schedule(self._count)
+
+    def _schedule(self, count):
+        delay = self._start + count * self.interval - time.monotonic()
+        self._handle = self._loop.call_later(max(delay, 0.0), self._step)
+
+    def _set_animated(self, artists):
+        """
+        Mark all the other artists of the axes of the animated artists as static,
+        so that only the animated artists are sent for each frame
+        """
+        if not self.blit:
+            return
+        animated = {id(artist) for artist in artists or ()}
+        axes = []
+        for artist in artists or ():
+            if all(artist.axes is not ax for ax in axes):
+                axes.append(artist.axes)
+        static = self.figure._static_artists
+        for ax in axes:
+            for child in data_artists(ax):
+                # Artists made static by the user are left alone
+                if id(child) not in animated and id(child) not in static:
+                    self.figure.set_static(child)
+                    self._static.append(child)
+        self._blit_axes = axes
+
+    def stop(self):
+        """Stop the animation"""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        for artist in self._static:
+            self.figure.set_static(artist, False)
+        self._static = []
+        self._blit_axes = None
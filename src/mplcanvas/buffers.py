@@ -0,0 +1,47 @@
+# mplcanvas/buffers.py
+"""
+Reusable scratch arrays for the render hot path.
+
+Preparing an artist needs several temporary arrays as large as its data (packed
+coordinates, masks, ...). Allocating them anew for every artist of every frame
+causes memory spikes and garbage collection pauses while panning over large data.
+A ``BufferPool`` hands out arrays which reuse the memory of the previous request
+with the same key, so that steady-state frames do not allocate.
+"""
+
+import threading
+
+import numpy as np
+
+# Buffers grow by this factor when they are too small, so that slowly growing
+# data does not reallocate on every frame
+GROWTH = 1.5
+
+
+class BufferPool:
+    """
+    Arrays keyed by name, reused from one request to the next.
+
+    Each thread has its own buffers, so that axes prepared concurrently (see
+    ``Figure.render_threads``) do not overwrite each other's data. An array is
+    only valid until the next request with the same key in the same thread.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def get(self, key, shape, dtype=float):
+        """An uninitialized array of the given shape and type"""
+        buffers = self._local.__dict__.setdefault("buffers", {})
+        shape = (shape,) if np.isscalar(shape) else tuple(shape)
+        size = int(np.prod(shape))
+        buffer = buffers.get(key)
+        if buffer is None or buffer.dtype != dtype or buffer.size < size:
+            capacity = size if buffer is None else max(size, int(buffer.size * GROWTH))
+            buffer = buffers[key] = np.empty(capacity, dtype=dtype)
+        return buffer[:size].reshape(shape)
+
+    def nbytes(self) -> int:
+        """Memory used by the buffers of the current thread"""
+        buffers = self._local.__dict__.get("buffers", {})
+        return sum(buffer.nbytes for buffer in buffers.values())
@@ -0,0 +1,43 @@
+# mplcanvas/config.py
+"""
+Runtime configuration of mplcanvas.
+
+Besides matplotlib's parameters, ``rcParams`` holds the rendering quality profiles:
+``"quality.final"`` is used for regular draws, and ``"quality.interactive"`` while
+the user pans or zooms with the toolbar, trading fidelity for frame rate. A final
+draw follows when the gesture ends. The settings of a profile are:
+
+- ``max_points``: maximum number of points drawn per artist, by subsampling
+  (``None`` for no limit)
+- ``lod_points_per_pixel``: number of points per pixel drawn for lines with a
+  level-of-detail pyramid
+- ``marker_dedup``: size, in pixels, of the cells in which only one marker is
+  drawn (``0`` to draw all markers)
+- ``max_markers``: maximum number of markers drawn per artist after
+  deduplication, beyond which markers are subsampled (``None`` for no limit)
+- ``text``: whether to draw tick labels and axis labels
+- ``antialiased``: if ``False``, lines are snapped to pixel centers, which draws
+  them crisp instead of antialiased
+"""
+
+# For matplotlib compatibility
+import matplotlib.rcsetup as _rcsetup
+
+rcParams = _rcsetup.defaultParams.copy()
+
+rcParams["quality.final"] = {
+    "max_points": None,
+    "lod_points_per_pixel": 2,
+    "marker_dedup": 1,
+    "max_markers": None,
+    "text": True,
+    "antialiased": True,
+}
+rcParams["quality.interactive"] = {
+    "max_points": 100_000,
+    "lod_points_per_pixel": 1,
+    "marker_dedup": 2,
+    "max_markers": 50_000,
+    "text": True,
+    "antialiased": False,
+}
@@ -1,17 +1,67 @@
 # mplcanvas/figure.py
+import time
+import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import nullcontext
 
 import ipywidgets as ipw
 import matplotlib
+import numpy as np
 from ipycanvas import Canvas, MultiCanvas, hold_canvas
+from ipycanvas.utils import image_bytes_to_array
 from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.figure import Figure as MplFigure
+from matplotlib.transforms import Bbox
 
 matplotlib.use("Agg")  # Headless backend
 
 # from .axes import Axes
-from .render import draw_axes
+from .buffers import BufferPool
+from .config import rcParams
+from .diffing import emit_changes
+from .lod import LinePyramid
+from .offload import build_pyramid
+from .recording import RecordingCanvas
+from .render import (
+    axis_ticks,
+    data_artists,
+    emit_axes,
+    emit_collection,
+    max_artist_size,
+    prepare_axes,
+)
+from .selection import LinkedBrush
+from .tiles import TILE_SIZE, ImagePyramid, TileCache
 from .toolbar import Toolbar
+from .utils import flip_y, rects_overlap, running_loop
+
+# Extra space (in pixels) around the tight bounding box of an axes, so that tick
+# labels which grow when zooming are not cut off by the edges of the axes layer
+LAYER_PADDING = 10
+
+# Maximum number of points per artist in the first pass of progressive rendering,
+# and growth factor of that number for each refinement pass. The passes have a
+# point budget rather than a time budget: most of the time of a frame is spent
+# by the browser, which the kernel cannot measure, and frames are already paced
+# by the acknowledgements of the browser (see MAX_FRAMES_IN_FLIGHT).
+PROGRESSIVE_START_POINTS = 10_000
+PROGRESSIVE_STEP = 10
+
+# Maximum number of frames sent to the browser but not yet acknowledged. While
+# that many frames are in flight, new frames are skipped: the dirty axes accumulate
+# and are drawn in a single frame once the browser has caught up.
+MAX_FRAMES_IN_FLIGHT = 2
+# Frames which are not acknowledged after this many seconds are considered lost.
+# Flow control is then suspended until the next acknowledgement.
+FRAME_ACK_TIMEOUT = 1.0
+# Frames are numbered by the color of the pixel acknowledging them
+FRAME_IDS = 0x1000000
+
+# Delay (in seconds) after the last resize of a burst (e.g. while dragging a
+# splitter) before the layout is computed again and the figure redrawn
+RESIZE_DELAY = 0.15
 
 
 class Figure(ipw.HBox):
@@ -20,16 +70,42 @@ class Figure(ipw.HBox):
 
     Inherits from VBox so it can be composed with other widgets,
     and implements _repr_mimebundle_ for automatic Jupyter display.
+
+    By default, each axes is rendered into its own canvas layer. With
+    ``single_canvas=True``, all axes draw directly into one shared canvas instead,
+    and redrawing an axes only updates its (clipped) region. This keeps creation
+    time and browser memory constant for large grids of small panels.
+
+    When several axes are redrawn at once, their rendering is prepared in a pool of
+    ``render_threads`` threads (the default depends on the number of CPUs). Use
+    ``render_threads=1`` to prepare them sequentially.
+
+    The ``ncanvases`` argument is deprecated and ignored, as the canvas layers are
+    created for the axes.
     """
 
     def __init__(
         self,
         facecolor: str = "white",
         # toolbar: bool = True,
-        ncanvases: int = 1,
+        ncanvases: int | None = None,
+        single_canvas: bool = False,
+        render_threads: int | None = None,
         **kwargs,
     ):
+        if ncanvases is not None:
+            warnings.warn(
+                "The ncanvases argument of Figure is deprecated and ignored, as "
+                "each axes gets its own canvas layer.",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+        self.single_canvas = single_canvas
+        self.render_threads = render_threads
+        self._executor = None
         self.mpl_figure = MplFigure(facecolor=facecolor, **kwargs)
+        # Agg canvas used only to compute the layout (text extents) of the axes
+        FigureCanvasAgg(self.mpl_figure)
 
         # Convert figsize from inches to pixels
         self.figsize = self.mpl_figure.get_size_inches()
@@ -39,12 +115,19 @@ class Figure(ipw.HBox):
 
         layout = ipw.Layout(width=f"{self.width}px", height=f"{self.height}px")
 
-        # Create the canvas
+        # Create the canvas. Only three layers span the full figure: the bottom one,
+        # onto which the axes are composited, one for the highlights of linked
+        # brushing, and the top one for interactive overlays (zoom rectangle). Each
+        # axes is rendered into its own canvas, sized to the bounding box of the
+        # axes (see _update_layout), unless in single-canvas mode, where the axes
+        # draw directly into the bottom layer.
         self.canvas = MultiCanvas(
-            ncanvases + 1, width=self.width, height=self.height, layout=layout
+            3, width=self.width, height=self.height, layout=layout
         )
         # self.canvas[0].style = {"zIndex": 0}  # Background
 
+        self.data_canvas = self.canvas[0]
+        self.highlight_canvas = self.canvas[1]
         self.drawing_canvas = self.canvas[-1]
         # self.canvas = self.canvas[0]
 
@@ -67,9 +150,49 @@ class Figure(ipw.HBox):
             **kwargs,
         )
 
-        # Container for all axes
-        self._axes_to_canvas = {}
-        self._canvas_to_axes = {}
+        # Canvas layer for each axes: {axes_id: {"axes", "canvas", "origin", "rect"}}
+        # where "origin" is the bottom-left corner of the layer in matplotlib display
+        # coordinates, and "rect" is (x, y, width, height) in figure canvas
+        # coordinates (top-left origin). In single-canvas mode, "canvas" is None
+        # and "rect" is the region of the data canvas owned by the axes.
+        self._axes_layers = {}
+        self._layout_stale = True
+        # Axes that need to be redrawn on the next draw
+        self._dirty = set()
+        # State shared by all the render functions (see render.prepare_axes)
+        self._render_context = {
+            "lods": {},
+            "tiles": TileCache(),
+            "buffers": BufferPool(),
+        }
+        # Axes currently displayed at reduced fidelity by progressive rendering:
+        # {axes_id: max_points}
+        self._unrefined = {}
+        self._refine_handle = None
+        # Ids of the artists drawn once into an offscreen canvas (see set_static)
+        self._static_artists = set()
+        # Rendering quality profile in use, "final" or "interactive" (see config)
+        self._quality = "final"
+        # Datasets with linked selections (see link_brushing)
+        self._brushes = []
+
+        # Flow control: the end of each frame is marked by drawing into this 1x1
+        # canvas, which makes the browser send back its image once it has processed
+        # the frame. This acknowledges the frame. It only tells that the canvas
+        # model in the browser has processed the commands of the frame, not that
+        # the frame was displayed.
+        self._ack_canvas = Canvas(width=1, height=1, sync_image_data=True)
+        self._ack_canvas.observe(self._on_frame_ack, names="image_data")
+        # (frame id, send time) of the unacknowledged frames
+        self._frames_in_flight = deque()
+        self._frame_count = 0
+        # Flow control starts with the first acknowledgement, as there may be no
+        # browser displaying the figure
+        self._frames_acknowledged = False
+        self._deferred_handle = None
+        # Size (in pixels) of the pending resize, applied after RESIZE_DELAY
+        self._pending_size = None
+        self._resize_handle = None
 
         # Figure-level properties
         self.facecolor = facecolor
@@ -80,11 +203,15 @@ class Figure(ipw.HBox):
     def add_subplot(self, nrows: int, ncols: int, index: int, **kwargs) -> Axes:
         # print(f"Adding subplot {nrows}x{ncols} index {index}")
         new_axes = self.mpl_figure.add_subplot(nrows, ncols, index, **kwargs)
-        self._axes_to_canvas[id(new_axes)] = index - 1
-        self._canvas_to_axes[index - 1] = new_axes
-
-        # print("self._axes_to_canvas", self._axes_to_canvas)
-        # print("self._canvas_to_axes", self._canvas_to_axes)
+        self._axes_layers[id(new_axes)] = {
+            "axes": new_axes,
+            "canvas": None if self.single_canvas else Canvas(width=1, height=1),
+            "origin": (0, 0),
+            "rect": (0, 0, 1, 1),
+        }
+        # The layer sizes are computed lazily on the next draw, so that creating
+        # many subplots does not compute the layout once per subplot
+        self._layout_stale = True
         return new_axes
 
         # """Add a subplot to the figure"""
@@ -143,49 +270,636 @@ class Figure(ipw.HBox):
         """
         # # Ensure we're drawn
         # if self._auto_draw:
-        self.draw()
+        self.draw_progressive()
 
         # Let the parent VBox handle the representation
         return super()._repr_mimebundle_(include=include, exclude=exclude)
 
-    def _draw_canvas(self, canvas, index, hold=True):
-        """Render the entire figure"""
-        ctx = hold_canvas(canvas) if hold else nullcontext()
+    def _update_layout(self):
+        """
+        Size and position the canvas layer of each axes to the bounding box of the
+        axes, including its decorations (ticks, tick labels, axis labels).
+        """
+        renderer = self.mpl_figure.canvas.get_renderer()
+        engine = self.mpl_figure.get_layout_engine()
+        if engine is not None:
+            engine.execute(self.mpl_figure)
+        for layer in self._axes_layers.values():
+            bbox = self._layer_bbox(layer, renderer)
+            x0 = max(int(np.floor(bbox.x0)), 0)
+            y0 = max(int(np.floor(bbox.y0)), 0)
+            x1 = min(int(np.ceil(bbox.x1)), self.width)
+            y1 = min(int(np.ceil(bbox.y1)), self.height)
+            width, height = max(x1 - x0, 1), max(y1 - y0, 1)
+
+            canvas = layer["canvas"]
+            if canvas is not None:
+                if canvas.width != width:
+                    canvas.width = width
+                if canvas.height != height:
+                    canvas.height = height
+            layer["origin"] = (x0, y0)
+            layer["rect"] = (x0, self.height - y1, width, height)
+        self._layout_stale = False
+
+    def _layer_bbox(self, layer, renderer):
+        """
+        The bounding box of an axes with its decorations, padded. Computing it
+        measures all the texts of the axes, so it is cached until the axes moves or
+        its limits or labels change.
+        """
+        ax = layer["axes"]
+        key = (
+            tuple(ax.bbox.bounds),
+            ax.get_xlim(),
+            ax.get_ylim(),
+            ax.get_title(),
+            ax.get_xlabel(),
+            ax.get_ylabel(),
+        )
+        cached = layer.get("bbox")
+        if cached is None or cached[0] != key:
+            bbox = Bbox.union(
+                [ax.get_tightbbox(renderer), ax.get_window_extent(renderer)]
+            ).padded(LAYER_PADDING)
+            cached = layer["bbox"] = (key, bbox)
+        return cached[1]
+
+    def _prepare(self, axes_ids):
+        """
+        Prepare the drawing of several axes. This is the CPU-heavy part of rendering
+        (mostly NumPy, which releases the GIL), so it runs in a thread pool when
+        there is more than one axes to prepare.
+        """
+        layers = [self._axes_layers[axes_id] for axes_id in axes_ids]
+        shared_ticks = self._shared_ticks([layer["axes"] for layer in layers])
+        for layer in layers:
+            self._update_static_canvas(layer)
+
+        def prepare(layer):
+            context = {
+                **self._render_context,
+                "quality": rcParams[f"quality.{self._quality}"],
+            }
+            ticks = shared_ticks.get(id(layer["axes"]))
+            if ticks:
+                context = {**context, "ticks": ticks}
+            max_points = self._unrefined.get(id(layer["axes"]))
+            if max_points is not None:
+                context = {**context, "max_points": max_points}
+            if layer.get("pan") is not None:
+                context = {**context, "pan": layer["pan"]}
+            if layer.get("static") is not None:
+                context = {**context, "static": layer["static"]}
+            if self.single_canvas:
+                return prepare_axes(layer["axes"], self.data_canvas, context=context)
+            return prepare_axes(
+                layer["axes"], layer["canvas"], origin=layer["origin"], context=context
+            )
+
+        if len(layers) > 1 and self.render_threads != 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.render_threads,
+                    thread_name_prefix="mplcanvas-render",
+                )
+            prepared = self._executor.map(prepare, layers)
+        else:
+            prepared = map(prepare, layers)
+        return dict(zip(axes_ids, prepared, strict=True))
+
+    def set_static(self, artist, static: bool = True):
+        """
+        Mark an artist as static (or not).
+
+        The static artists of an axes are drawn once into an offscreen canvas,
+        which later draws copy onto the axes with a single ``drawImage``. They are
+        only drawn again when the axes limits change, or when one of them changes.
+        This makes redrawing an axes with heavy static artists (e.g. reference
+        lines) and a few frequently updated ones cheap. Static artists are drawn
+        below the other artists of the axes.
+        """
+        if static:
+            self._static_artists.add(id(artist))
+        else:
+            self._static_artists.discard(id(artist))
+        if artist.axes is not None and id(artist.axes) in self._axes_layers:
+            self._dirty.add(id(artist.axes))
+
+    def _update_static_canvas(self, layer):
+        """
+        Create, resize or remove the offscreen canvas of the static artists of an
+        axes, as needed
+        """
+        has_static = self._static_artists and any(
+            id(child) in self._static_artists for child in data_artists(layer["axes"])
+        )
+        if not has_static:
+            layer.pop("static", None)
+            return
+        # The offscreen canvas covers the layer of the axes, which in single-canvas
+        # mode is a region of the data canvas
+        x, y, width, height = layer["rect"]
+        static = layer.get("static")
+        if static is None:
+            static = layer["static"] = {
+                "ids": self._static_artists,
+                "canvas": Canvas(width=width, height=height),
+            }
+        static["position"] = (0, 0) if layer["canvas"] is not None else (x, y)
+        if (static["canvas"].width, static["canvas"].height) != (width, height):
+            static["canvas"].width = width
+            static["canvas"].height = height
+            static["key"] = None
+
+    def _static_canvas(self, axes_id):
+        """The offscreen canvas of the static artists of an axes, if any"""
+        static = self._axes_layers[axes_id].get("static")
+        return None if static is None else static["canvas"]
+
+    def _shared_ticks(self, axes):
+        """
+        Compute the ticks of shared axes once per group of shared axes. This runs
+        before the preparation in threads, since the axes of a group share their
+        tick locator and formatter, which are not thread-safe.
+
+        Returns ``{axes_id: {"x": ticks, "y": ticks}}`` with the ticks of the shared
+        axis (or axes) only.
+        """
+        groups = {}
+        ticks = {}
+        for ax in axes:
+            for name, axis, grouper in (
+                ("x", ax.xaxis, ax.get_shared_x_axes()),
+                ("y", ax.yaxis, ax.get_shared_y_axes()),
+            ):
+                siblings = grouper.get_siblings(ax)
+                if len(siblings) < 2:
+                    continue
+                key = (name, min(id(sibling) for sibling in siblings))
+                if key not in groups:
+                    groups[key] = axis_ticks(axis)
+                ticks.setdefault(id(ax), {})[name] = groups[key]
+        return ticks
+
+    def _linked_axes(self, ax: Axes) -> list[Axes]:
+        """The axes of the figure sharing their x or y limits with ``ax``"""
+        siblings = {
+            *ax.get_shared_x_axes().get_siblings(ax),
+            *ax.get_shared_y_axes().get_siblings(ax),
+        }
+        return [
+            layer["axes"]
+            for layer in self._axes_layers.values()
+            if layer["axes"] in siblings
+        ]
+
+    def _draw_canvas(self, layer, prepared, hold=True):
+        """
+        Render a single prepared axes into its layer. Only the commands which
+        changed since the previous draw are sent (see ``diffing``), except while
+        panning, where everything changes. Returns ``False`` if nothing changed.
+        """
+        canvas = layer["canvas"]
+        static_canvas = self._static_canvas(id(layer["axes"]))
+        ctx = hold_canvas() if hold else nullcontext()
         with ctx:
-            # Clear canvas
+            if layer.get("pan") is None:
+                return emit_changes(
+                    prepared, canvas, layer.setdefault("commands", {}), static_canvas
+                )
+            # The record is not kept up to date during a pan
+            layer.pop("commands", None)
             canvas.clear()
 
             # # Draw background
             # canvas.fill_style = self.facecolor
             # canvas.fill_rect(0, 0, self.width, self.height)
 
-            ax = self._canvas_to_axes[index]
-            # print(f"Drawing axes {index} {ax}")
-            draw_axes(ax, canvas)
+            emit_axes(prepared, canvas, static_canvas)
+            return True
+
+    def _composite(self, rect=None):
+        """
+        Copy the axes layers onto the data canvas.
+
+        If ``rect`` (x, y, width, height) is given, only that region of the data
+        canvas is updated, using all the layers that overlap with it.
+        """
+        canvas = self.data_canvas
+        if rect is None:
+            canvas.clear()
+            for layer in self._axes_layers.values():
+                canvas.draw_image(layer["canvas"], *layer["rect"][:2])
+            return
+
+        x, y, width, height = rect
+        canvas.save()
+        canvas.begin_path()
+        canvas.rect(x, y, width, height)
+        canvas.clip()
+        canvas.clear_rect(x, y, width, height)
+        for layer in self._axes_layers.values():
+            if rects_overlap(rect, layer["rect"]):
+                canvas.draw_image(layer["canvas"], *layer["rect"][:2])
+        canvas.restore()
+
+    def _overlapping(self, axes_ids):
+        """Find all the axes whose region overlaps with that of the given axes"""
+        rects = [self._axes_layers[axes_id]["rect"] for axes_id in axes_ids]
+        return [
+            axes_id
+            for axes_id, layer in self._axes_layers.items()
+            if any(rects_overlap(rect, layer["rect"]) for rect in rects)
+        ]
+
+    def _draw_region(self, rect, prepared):
+        """
+        Redraw a region of the data canvas in single-canvas mode.
+
+        All axes overlapping with the region are drawn, clipped to the region.
+        """
+        canvas = self.data_canvas
+        x, y, width, height = rect
+        canvas.save()
+        canvas.begin_path()
+        canvas.rect(x, y, width, height)
+        canvas.clip()
+        canvas.clear_rect(x, y, width, height)
+        for axes_id, layer in self._axes_layers.items():
+            if rects_overlap(rect, layer["rect"]):
+                emit_axes(prepared[axes_id], canvas, self._static_canvas(axes_id))
+        canvas.restore()
+
+    def _backpressure(self, loop):
+        """
+        Check if too many frames are in flight, in which case the current frame is
+        deferred until a frame is acknowledged (or times out).
+        """
+        now = time.monotonic()
+        if (
+            self._frames_in_flight
+            and now - self._frames_in_flight[0][1] > FRAME_ACK_TIMEOUT
+        ):
+            # The acknowledgements were lost (e.g. the output was displayed again):
+            # draw without flow control until the next acknowledgement, rather
+            # than waiting for the timeout again at every frame
+            self._frames_in_flight.clear()
+            self._frames_acknowledged = False
+        if (
+            not self._frames_acknowledged
+            or len(self._frames_in_flight) < MAX_FRAMES_IN_FLIGHT
+        ):
+            return False
+        if self._deferred_handle is None:
+            timeout = self._frames_in_flight[0][1] + FRAME_ACK_TIMEOUT - now
+            self._deferred_handle = loop.call_later(timeout, self._draw_deferred)
+        return True
+
+    def _draw_deferred(self):
+        self._deferred_handle = None
+        self._draw_dirty()
+
+    def _on_frame_ack(self, change):
+        """
+        The browser has processed a frame, and therefore all the frames before it.
+        The frame is identified by the color of the acknowledgement pixel.
+        """
+        if not change["new"]:
+            return
+        r, g, b = image_bytes_to_array(change["new"])[0, 0, :3].tolist()
+        frame = (r << 16) | (g << 8) | b
+        self._frames_acknowledged = True
+        # Acknowledgements of frames which timed out are late, and do not
+        # acknowledge newer frames
+        while (
+            self._frames_in_flight
+            and (frame - self._frames_in_flight[0][0]) % FRAME_IDS < FRAME_IDS // 2
+        ):
+            self._frames_in_flight.popleft()
+        if self._deferred_handle is not None:
+            self._deferred_handle.cancel()
+            self._draw_deferred()
+
+    def _draw_dirty(self) -> bool:
+        """
+        Redraw all the dirty axes in a single batch of canvas commands. Returns
+        ``False`` if there was nothing to draw, or if the frame was deferred.
+        """
+        if not self._dirty:
+            return False
+        # Flow control is only possible when the kernel event loop is running, as
+        # the acknowledgements arrive through it
+        loop = running_loop()
+        if loop is not None and self._backpressure(loop):
+            return False
+
+        full = len(self._dirty) == len(self._axes_layers)
+        if self.single_canvas and not full:
+            # Partial region updates also need to redraw the overlapping neighbours
+            prepared = self._prepare(self._overlapping(self._dirty))
+        else:
+            prepared = self._prepare(list(self._dirty))
+
+        # Emission is serialized into a single batch
+        with hold_canvas():
+            if self.single_canvas and full:
+                self.data_canvas.clear()
+                for axes_id in self._axes_layers:
+                    emit_axes(
+                        prepared[axes_id],
+                        self.data_canvas,
+                        self._static_canvas(axes_id),
+                    )
+            elif self.single_canvas:
+                for axes_id in self._dirty:
+                    self._draw_region(self._axes_layers[axes_id]["rect"], prepared)
+            else:
+                changed = [
+                    axes_id
+                    for axes_id in self._dirty
+                    if self._draw_canvas(
+                        self._axes_layers[axes_id], prepared[axes_id], hold=False
+                    )
+                ]
+                if full:
+                    self._composite()
+                else:
+                    # Unchanged layers are already up to date on the data canvas
+                    for axes_id in changed:
+                        self._composite(self._axes_layers[axes_id]["rect"])
+            if self._brushes:
+                self._emit_highlights(self._dirty)
+            self.toolbar._on_frame_drawn(self._dirty)
+            if loop is not None:
+                # Use a different color for each frame, so that the image changes,
+                # and the acknowledgement tells which frame was processed
+                self._frame_count += 1
+                frame = self._frame_count % FRAME_IDS
+                self._ack_canvas.fill_style = f"#{frame:06x}"
+                self._ack_canvas.fill_rect(0, 0, 1, 1)
+                self._frames_in_flight.append((frame, time.monotonic()))
+        self._dirty.clear()
+        # The next refinement pass is only drawn once this frame is sent
+        if loop is not None and self._unrefined and self._refine_handle is None:
+            self._refine_handle = loop.call_soon(self._refine)
+        return True
 
-            # # Draw all axes
-            # # print("Drawing all axes...", self.mpl_figure.axes)
-            # for ax in self.mpl_figure.axes:
-            #     draw_axes(ax, canvas)
+    def link_brushing(self, *collections, color="red") -> LinkedBrush:
+        """
+        Link scatter collections (from ``scatter``) drawing the same rows of a
+        dataset, in one or several axes. Selecting points of one of them with the
+        select tool of the toolbar highlights the same rows in all of them.
+
+        Returns the ``LinkedBrush``, whose ``mask`` is the current selection.
+        """
+        brush = LinkedBrush(collections, color=color)
+        self._brushes.append(brush)
+        return brush
 
-    def draw(self, ax: Axes | None = None):
+    def _brushable(self, ax: Axes):
+        """The linked brushes with a collection in ``ax``, with that collection"""
+        return [
+            (brush, collection)
+            for brush in self._brushes
+            for collection in brush.collections
+            if collection.axes is ax
+        ]
+
+    def _brush(self, ax: Axes, polygon):
+        """
+        Select the points of the brushes of an axes inside of a polygon (in display
+        coordinates), and redraw the highlights of all the linked axes
         """
-        Render the figure or a specific axes.
+        canvas = self.highlight_canvas
+        polygon = [(x, flip_y(y, canvas)) for x, y in polygon]
+        axes_ids = set()
+        for brush, collection in self._brushable(ax):
+            brush.select(collection, polygon, canvas)
+            axes_ids.update(id(other.axes) for other in brush.collections)
+        with hold_canvas():
+            self._emit_highlights(axes_ids)
 
-        If index is None, redraw the entire figure.
-        If index is an integer, redraw only the specified axes (1-based index).
+    def _emit_highlights(self, axes_ids):
         """
-        index = self._axes_to_canvas.get(id(ax)) if ax is not None else None
-        # print(f"Figure.draw called with ax={id(ax)} index={index}")
-        if index is None:
-            # Redraw all canvases
-            with hold_canvas(self.canvas):
-                for i in range(len(self.canvas._canvases) - 1):
-                    self._draw_canvas(self.canvas[i], index=i, hold=False)
+        Draw the highlights of the selected points of the given axes into the
+        highlight layer. Nothing else is redrawn.
+        """
+        canvas = self.highlight_canvas
+        for axes_id in axes_ids:
+            ax = self._axes_layers[axes_id]["axes"]
+            left, bottom, width, height = ax.bbox.bounds
+            frame = (left, flip_y(bottom + height, canvas), width, height)
+            canvas.clear_rect(*frame)
+            items = []
+            for brush in self._brushes:
+                for collection in brush.collections:
+                    if collection.axes is ax:
+                        items += brush.prepare_highlight(collection, canvas)
+            if not items:
+                continue
+            canvas.save()
+            canvas.begin_path()
+            canvas.rect(*frame)
+            canvas.clip()
+            for item in items:
+                emit_collection(item, canvas)
+            canvas.restore()
+
+    def draw(self, ax: Axes | list[Axes] | None = None):
+        """
+        Render the figure or specific axes.
+
+        If ax is None, redraw the entire figure.
+        If ax is given, redraw only the layer (or region) of that axes.
+        If ax is a list of axes, redraw them all in a single batch.
+        Axes sharing their limits with the given axes are redrawn with them.
+        """
+        if self._layout_stale:
+            ax = None
+            self._update_layout()
+        if ax is None:
+            self._dirty.update(self._axes_layers)
         else:
-            # if index < 1 or index >= len(self.canvas.canvases):
-            #     raise ValueError(f"Invalid axes index {index}")
-            self._draw_canvas(self.canvas[index], index=index)
+            for a in [ax] if isinstance(ax, Axes) else ax:
+                self._dirty.update(id(linked) for linked in self._linked_axes(a))
+        # Drawing at full fidelity makes pending refinements unnecessary
+        for axes_id in self._dirty:
+            self._unrefined.pop(axes_id, None)
+        self._draw_dirty()
+
+    def _begin_pan(self, ax: Axes):
+        """
+        Keep the prepared artists of an axes from frame to frame while it is
+        panned, so that frames which only translate the view do not transform the
+        data again
+        """
+        for linked in self._linked_axes(ax):
+            self._axes_layers[id(linked)]["pan"] = {}
+        self._begin_interaction()
+
+    def _end_pan(self, ax: Axes):
+        """Stop reusing the prepared artists of an axes, and redraw it"""
+        for linked in self._linked_axes(ax):
+            self._axes_layers[id(linked)].pop("pan", None)
+        self._end_interaction(ax)
+
+    def _begin_interaction(self):
+        """Draw with the "interactive" quality profile, during a toolbar gesture"""
+        self._quality = "interactive"
+
+    def _end_interaction(self, ax: Axes):
+        """Go back to the "final" quality profile, and redraw the axes with it"""
+        self._quality = "final"
+        self.draw(ax=ax)
+
+    def draw_progressive(self):
+        """
+        Render the figure progressively.
+
+        A first pass draws a subsample of at most ``PROGRESSIVE_START_POINTS``
+        points of every artist, so that the time to first paint does not depend on
+        the size of the data. Refinement passes are then scheduled on the event
+        loop, redrawing one axes at a time with ``PROGRESSIVE_STEP`` times more
+        points, until the full data is drawn. Each pass is scheduled once the
+        frame of the previous one is sent, so that deferred frames do not skip
+        passes. Drawing an axes (e.g. when panning) cancels its remaining
+        refinement passes.
+
+        Without a running event loop, this is the same as ``draw()``.
+        """
+        loop = running_loop()
+        if loop is None:
+            self.draw()
+            return
+        if self._layout_stale:
+            self._update_layout()
+        self._unrefined = {
+            axes_id: PROGRESSIVE_START_POINTS
+            for axes_id, layer in self._axes_layers.items()
+            if max_artist_size(layer["axes"]) > PROGRESSIVE_START_POINTS
+        }
+        self._dirty.update(self._axes_layers)
+        self._draw_dirty()
+
+    def _refine(self):
+        """
+        Redraw the next unrefined axes with more points. If the frame is deferred,
+        the pass is drawn with the deferred frame.
+        """
+        self._refine_handle = None
+        if not self._unrefined:
+            return
+        axes_id, max_points = next(iter(self._unrefined.items()))
+        max_points *= PROGRESSIVE_STEP
+        # Move the axes to the back of the queue, or remove it once all the data
+        # fits in the point budget
+        del self._unrefined[axes_id]
+        if max_points < max_artist_size(self._axes_layers[axes_id]["axes"]):
+            self._unrefined[axes_id] = max_points
+        self._dirty.add(axes_id)
+        self._draw_dirty()
+
+    def build_lod(self, line, processes: bool = False):
+        """
+        Build a level-of-detail pyramid for a line with very many points (with
+        sorted x values), so that only about two points per pixel are drawn.
+
+        With ``processes=True``, the pyramid is built in a worker process. A coarse
+        preview is drawn immediately, and replaced by the full-resolution pyramid
+        when the worker finishes. Returns a future resolved with the pyramid.
+        Without a running event loop (e.g. in a script), this waits for the worker.
+        """
+        xdata, ydata = line.get_xdata(), line.get_ydata()
+        lods = self._render_context["lods"]
+
+        def set_pyramid(pyramid):
+            lods[id(line)] = {"xdata": xdata, "ydata": ydata, "pyramid": pyramid}
+            # The line changes when it is drawn from another pyramid
+            line.stale = True
+            self.draw(line.axes)
+
+        if not processes:
+            set_pyramid(LinePyramid.build(xdata, ydata))
+            return None
+
+        set_pyramid(LinePyramid.preview(xdata, ydata))
+        future = build_pyramid(xdata, ydata)
+        loop = running_loop()
+        if loop is None:
+            set_pyramid(future.result())
+            return future
+        future.add_done_callback(
+            lambda f: loop.call_soon_threadsafe(lambda: set_pyramid(f.result()))
+        )
+        return future
+
+    def build_image_pyramid(
+        self,
+        image,
+        data=None,
+        memmap: bool = False,
+        tile_size: int = TILE_SIZE,
+    ):
+        """
+        Set up the multi-resolution pyramid from which an image (from ``imshow``)
+        is drawn tile by tile.
+
+        Images get a pyramid of their data automatically. This allows reading the
+        full-resolution pixels from ``data`` instead, e.g. a memory-mapped array
+        much larger than the (preview) array given to ``imshow``, which then only
+        sets the colormapping. The image extent must be given to ``imshow``. With
+        ``memmap=True``, the reduced levels of the pyramid are stored in temporary
+        files instead of memory.
+        """
+        if data is None:
+            data = np.ma.getdata(image.get_array())
+        pyramid = ImagePyramid(data, tile_size=tile_size, memmap=memmap)
+        self._render_context["tiles"].set_pyramid(image, pyramid)
+        image.stale = True
+        self.draw(image.axes)
+        return pyramid
+
+    def record(self) -> RecordingCanvas:
+        """
+        Record the canvas commands drawing the whole figure, as they are sent to the
+        browser (with the same decimation), without drawing anything. The tiles
+        of images are recorded canvases too.
+        """
+        canvas = RecordingCanvas(self.width, self.height)
+        context = {
+            **self._render_context,
+            "tiles": self._render_context["tiles"].recording(),
+        }
+        for layer in self._axes_layers.values():
+            emit_axes(prepare_axes(layer["axes"], canvas, context=context), canvas)
+        return canvas
+
+    def savefig(self, fname, format: str | None = None):
+        """
+        Save the figure as an SVG document or a PNG image, without a browser.
+
+        The figure is rendered through the same pipeline as on screen, which is
+        much faster than matplotlib for large (decimated) plots. The format is
+        taken from the file name extension if it is not given. ``fname`` can also
+        be a binary file object.
+        """
+        if format is None:
+            format = str(getattr(fname, "name", fname)).rsplit(".", 1)[-1]
+        format = format.lower()
+        recording = self.record()
+        if format == "svg":
+            svg = recording.to_svg(facecolor=self.facecolor)
+            if hasattr(fname, "write"):
+                # File objects are binary, as for the PNG format
+                fname.write(svg.encode())
+            else:
+                with open(fname, "w") as f:
+                    f.write(svg)
+        elif format == "png":
+            recording.to_image(facecolor=self.facecolor).save(fname, format="png")
+        else:
+            raise ValueError(f"Unsupported format '{format}', use 'svg' or 'png'.")
 
     def show(self):
         """
@@ -196,8 +910,7 @@ class Figure(ipw.HBox):
         line in a cell, which will use _repr_mimebundle_.
         """
         # Ensure we're drawn
-        if self._auto_draw:
-            self.draw()
+        self.draw()
 
         # Return self so Jupyter displays it
         return self
@@ -215,8 +928,29 @@ class Figure(ipw.HBox):
     #     return super()._repr_mimebundle_(include=include, exclude=exclude)
 
     def clf(self):
-        """Clear the figure"""
-        self.axes.clear()
+        """
+        Clear the figure: remove its axes, close their canvases, and forget the
+        state kept for them (static artists, refinements, brushes, and the caches
+        of level-of-detail and image pyramids)
+        """
+        self.mpl_figure.clear()
+        for layer in self._axes_layers.values():
+            if layer["canvas"] is not None:
+                layer["canvas"].close()
+            if layer.get("static") is not None:
+                layer["static"]["canvas"].close()
+        self._axes_layers.clear()
+        self._dirty.clear()
+        self._unrefined.clear()
+        if self._refine_handle is not None:
+            self._refine_handle.cancel()
+            self._refine_handle = None
+        self._static_artists.clear()
+        self._brushes.clear()
+        self._render_context["lods"].clear()
+        self._render_context["tiles"].clear()
+        for canvas in (self.data_canvas, self.highlight_canvas, self.drawing_canvas):
+            canvas.clear()
         self.draw()
 
     # def add_child_widget(self, widget):
@@ -242,45 +976,72 @@ class Figure(ipw.HBox):
     def set_facecolor(self, color):
         """Set the figure face color"""
         self.facecolor = color
-        if self._auto_draw:
-            self.draw()
+        self.mpl_figure.set_facecolor(color)
+        self.draw()
 
     def set_size_inches(self, w, h=None, forward=True):
         """
         Set the figure size in inches.
 
-        If forward=True, also update the canvas size.
+        If forward=True, the figure is redrawn at its new size (see ``resize``).
+        Otherwise, it is resized right away but only redrawn on the next draw.
         """
         if h is None:
             w, h = w  # Assume w is a tuple
+        width, height = int(w * self.dpi), int(h * self.dpi)
+        if forward:
+            self.resize(width, height)
+        else:
+            self._pending_size = (width, height)
+            self._apply_resize(draw=False)
+
+    def resize(self, width: int, height: int):
+        """
+        Resize the figure to ``width`` x ``height`` pixels, e.g. to follow the size
+        of its container in a dashboard (widgets do not report their size to the
+        kernel, so the container needs to call this).
 
-        self.figsize = (w, h)
+        The browser stretches the current image right away, but the layout is only
+        computed again, and the figure redrawn, once no other resize came for
+        ``RESIZE_DELAY`` seconds, so that a burst of resizes (dragging a splitter)
+        costs a single relayout. Without a running event loop, the figure is
+        redrawn immediately.
+        """
+        width, height = max(int(width), 1), max(int(height), 1)
+        self.canvas.layout.width = f"{width}px"
+        self.canvas.layout.height = f"{height}px"
+        self._pending_size = (width, height)
+        loop = running_loop()
+        if loop is None:
+            self._apply_resize()
+            return
+        if self._resize_handle is not None:
+            self._resize_handle.cancel()
+        self._resize_handle = loop.call_later(RESIZE_DELAY, self._apply_resize)
 
-        if forward:
-            new_width = int(w * self.dpi)
-            new_height = int(h * self.dpi)
-
-            # Update canvas size
-            self.canvas.width = new_width
-            self.canvas.height = new_height
-            self.width = new_width
-            self.height = new_height
-
-            # Reposition axes
-            for ax in self.axes:
-                # Recalculate axes dimensions
-                margin_left = 80
-                margin_right = 20
-                margin_top = 20
-                margin_bottom = 60
-
-                ax.x = margin_left
-                ax.y = margin_top
-                ax.width = self.width - margin_left - margin_right
-                ax.height = self.height - margin_top - margin_bottom
-
-            if self._auto_draw:
-                self.draw()
+    def _apply_resize(self, draw=True):
+        """
+        Resize the matplotlib figure and the canvas layers to the pending size, and
+        redraw
+        """
+        self._resize_handle = None
+        if self._pending_size is None:
+            return
+        self.width, self.height = self._pending_size
+        self._pending_size = None
+        self.mpl_figure.set_size_inches(
+            self.width / self.dpi, self.height / self.dpi, forward=False
+        )
+        self.figsize = self.mpl_figure.get_size_inches()
+        # The layers are resized in place, which keeps their widgets and views
+        self.canvas.layout.width = f"{self.width}px"
+        self.canvas.layout.height = f"{self.height}px"
+        if (self.canvas.width, self.canvas.height) != (self.width, self.height):
+            self.canvas.width = self.width
+            self.canvas.height = self.height
+        self._layout_stale = True
+        if draw:
+            self.draw()
 
     # Toolbar management methods
     def hide_toolbar(self):
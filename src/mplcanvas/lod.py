@@ -0,0 +1,127 @@
+# mplcanvas/lod.py
+"""
+Level-of-detail (LOD) pyramids for lines with very many points.
+
+A pyramid stores, for blocks of ``factor**k`` consecutive points, the minimum and
+maximum y values of the block. Drawing the min/max envelope of the blocks visible
+in the current view then needs about two points per pixel column, independently of
+the size of the data, while preserving the visual extent of the line.
+"""
+
+import numpy as np
+
+# Number of points reduced into one block at each level of the pyramid
+LOD_FACTOR = 4
+
+
+def level_sizes(npoints: int, factor: int = LOD_FACTOR) -> list[int]:
+    """Number of blocks in each level of a pyramid built from ``npoints`` points"""
+    sizes = []
+    size = npoints
+    while size > 1:
+        size = -(-size // factor)  # ceil division
+        sizes.append(size)
+    return sizes
+
+
+def reduce_level(ymin, ymax, factor: int = LOD_FACTOR, out_min=None, out_max=None):
+    """
+    Compute the next level of the pyramid from the previous one.
+
+    NaN values are ignored, unless all values of a block are NaN.
+    """
+    n = len(ymin)
+    full = n - n % factor
+    nblocks = -(-n // factor)
+    if out_min is None:
+        out_min = np.empty(nblocks, dtype=ymin.dtype)
+        out_max = np.empty(nblocks, dtype=ymax.dtype)
+    np.fmin.reduce(
+        ymin[:full].reshape(-1, factor), axis=1, out=out_min[: full // factor]
+    )
+    np.fmax.reduce(
+        ymax[:full].reshape(-1, factor), axis=1, out=out_max[: full // factor]
+    )
+    if full < n:
+        out_min[-1] = np.fmin.reduce(ymin[full:])
+        out_max[-1] = np.fmax.reduce(ymax[full:])
+    return out_min, out_max
+
+
+def build_levels(y, factor: int = LOD_FACTOR):
+    """Build all the levels of the pyramid of ``y``, as (ymin, ymax) pairs"""
+    levels = []
+    ymin = ymax = np.asarray(y)
+    for _ in level_sizes(len(y), factor):
+        ymin, ymax = reduce_level(ymin, ymax, factor)
+        levels.append((ymin, ymax))
+    return levels
+
+
+class LinePyramid:
+    """
+    Min/max pyramid of a line whose x values are sorted in increasing order.
+
+    Use ``LinePyramid.build`` to compute the levels in the current process, or
+    ``mplcanvas.offload.build_pyramid`` to compute them in a worker process.
+    """
+
+    def __init__(self, x, y, levels, factor: int = LOD_FACTOR):
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        self.levels = levels
+        self.factor = factor
+
+    @classmethod
+    def build(cls, x, y, factor: int = LOD_FACTOR):
+        check_sorted(x)
+        return cls(x, y, build_levels(y, factor), factor=factor)
+
+    @classmethod
+    def preview(cls, x, y, max_points: int = 100_000, factor: int = LOD_FACTOR):
+        """
+        Coarse pyramid of a strided subsample of the line, which is cheap to build
+        and can be displayed while the full pyramid is being computed.
+        """
+        stride = max(len(x) // max_points, 1)
+        return cls.build(x[::stride], y[::stride], factor=factor)
+
+    def decimate(self, xmin: float, xmax: float, max_points: int):
+        """
+        Return (x, y) arrays of at most about ``max_points`` points, tracing the
+        min/max envelope of the line between ``xmin`` and ``xmax``.
+        """
+        x = self.x
+        if xmin > xmax:
+            xmin, xmax = xmax, xmin
+        # Include one point on each side so that the line reaches the edges
+        start = max(int(np.searchsorted(x, xmin, side="left")) - 1, 0)
+        stop = min(int(np.searchsorted(x, xmax, side="right")) + 1, len(x))
+        if stop - start <= max_points:
+            return x[start:stop], self.y[start:stop]
+
+        # Finest level for which the envelope fits in the point budget
+        # (two points per block)
+        level = 0
+        block = self.factor
+        while (
+            2 * (-(-stop // block) - start // block) > max_points
+            and level < len(self.levels) - 1
+        ):
+            level += 1
+            block *= self.factor
+        first = start // block
+        last = -(-stop // block)
+        ymin, ymax = self.levels[level]
+        blocks = np.arange(first, last)
+        xs = np.repeat(x[blocks * block], 2)
+        ys = np.empty(2 * len(blocks), dtype=ymin.dtype)
+        ys[0::2] = ymin[first:last]
+        ys[1::2] = ymax[first:last]
+        return xs, ys
+
+
+def check_sorted(x):
+    """Raise if ``x`` is not sorted in increasing order"""
+    if len(x) > 1 and not np.all(x[1:] >= x[:-1]):
+        raise ValueError("Level-of-detail pyramids require sorted x values.")
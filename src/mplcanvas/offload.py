@@ -0,0 +1,152 @@
+# mplcanvas/offload.py
+"""
+Opt-in process-pool backend for preprocessing very large arrays.
+
+Building level-of-detail pyramids for 100M+ points takes seconds. Doing it in a
+worker process keeps the kernel (and therefore the toolbar) responsive. The arrays
+are exchanged through ``multiprocessing.shared_memory`` blocks, so that they do not
+need to be pickled and copied through a pipe.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .lod import LOD_FACTOR, LinePyramid, check_sorted, level_sizes, reduce_level
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    Return the process pool shared by all figures, creating it if needed.
+
+    Workers are started from a fork server (or spawned where there is none), as
+    forking the kernel would copy its threads and their held locks.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            method = (
+                "forkserver"
+                if "forkserver" in multiprocessing.get_all_start_methods()
+                else "spawn"
+            )
+            _POOL = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context(method)
+            )
+    return _POOL
+
+
+def _to_shared(array) -> shared_memory.SharedMemory:
+    """Copy an array into a new shared memory block"""
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm
+
+
+def _build_levels_worker(x_name, y_name, npoints, x_dtype, y_dtype, out_name, factor):
+    """Compute the levels of a pyramid, writing them into shared memory"""
+    blocks = [shared_memory.SharedMemory(name=name) for name in (x_name, y_name)]
+    blocks.append(shared_memory.SharedMemory(name=out_name))
+    try:
+        _build_levels_into(
+            *(block.buf for block in blocks), npoints, x_dtype, y_dtype, factor
+        )
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def _build_levels_into(x_buf, y_buf, out_buf, npoints, x_dtype, y_dtype, factor):
+    # Kept separate from the worker so that all array views of the shared buffers
+    # are released before the blocks are closed
+    check_sorted(np.ndarray((npoints,), dtype=x_dtype, buffer=x_buf))
+    sizes = level_sizes(npoints, factor)
+    out = np.ndarray((2, sum(sizes)), dtype=y_dtype, buffer=out_buf)
+    ymin = ymax = np.ndarray((npoints,), dtype=y_dtype, buffer=y_buf)
+    start = 0
+    for size in sizes:
+        ymin, ymax = reduce_level(
+            ymin,
+            ymax,
+            factor,
+            out_min=out[0, start : start + size],
+            out_max=out[1, start : start + size],
+        )
+        start += size
+
+
+def build_pyramid(x, y, factor: int = LOD_FACTOR) -> Future:
+    """
+    Build a ``LinePyramid`` in a worker process.
+
+    Returns a future, which is resolved once the pyramid is ready. The arrays are
+    copied into shared memory in a thread (numpy releases the GIL while copying),
+    so that the caller is not blocked for a time proportional to their size.
+    """
+    result = Future()
+    threading.Thread(
+        target=_submit_pyramid, args=(x, y, factor, result), daemon=True
+    ).start()
+    return result
+
+
+def _submit_pyramid(x, y, factor, result):
+    """Copy the data of a line into shared memory, and submit its pyramid"""
+    blocks = []
+    try:
+        x = np.ascontiguousarray(x)
+        y = np.ascontiguousarray(y)
+        sizes = level_sizes(len(y), factor)
+        blocks.append(_to_shared(x))
+        blocks.append(_to_shared(y))
+        blocks.append(
+            shared_memory.SharedMemory(
+                create=True, size=max(2 * sum(sizes) * y.itemsize, 1)
+            )
+        )
+        x_shm, y_shm, out_shm = blocks
+        future = get_pool().submit(
+            _build_levels_worker,
+            x_shm.name,
+            y_shm.name,
+            len(y),
+            x.dtype.str,
+            y.dtype.str,
+            out_shm.name,
+            factor,
+        )
+    except BaseException as error:
+        _release(blocks)
+        result.set_exception(error)
+        return
+
+    def done(future):
+        try:
+            if future.exception() is not None:
+                result.set_exception(future.exception())
+                return
+            out = np.ndarray((2, sum(sizes)), dtype=y.dtype, buffer=out_shm.buf).copy()
+            levels = []
+            start = 0
+            for size in sizes:
+                levels.append(
+                    (out[0, start : start + size], out[1, start : start + size])
+                )
+                start += size
+            result.set_result(LinePyramid(x, y, levels, factor=factor))
+        finally:
+            _release(blocks)
+
+    future.add_done_callback(done)
+
+
+def _release(blocks):
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
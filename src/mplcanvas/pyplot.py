@@ -34,18 +34,40 @@ def figure(**kwargs) -> Figure:
     return Figure(**kwargs)
 
 
-def subplots(nrows=1, ncols=1, **kwargs):
+def _share_with(share, axes, index, ncols):
+    """
+    The axes to share an axis with, for matplotlib's ``sharex``/``sharey``
+    values: ``True`` or ``"all"``, ``"row"``, ``"col"``, or ``False`` or ``"none"``.
+    """
+    if share is True or share == "all":
+        return axes[0] if axes else None
+    if share == "row" and index % ncols:
+        return axes[index - index % ncols]
+    if share == "col" and index >= ncols:
+        return axes[index % ncols]
+    return None
+
+
+def subplots(nrows=1, ncols=1, sharex=False, sharey=False, **kwargs):
     """
     Create a figure and subplots.
 
     Returns (fig, ax) or (fig, axes_array) to match matplotlib exactly.
+    Panning or zooming one of the axes sharing an axis (with ``sharex`` or
+    ``sharey``) redraws all of them in a single batch.
     """
     # global _current_figure, _current_axes
     prod = nrows * ncols
-    fig = figure(ncanvases=prod, **kwargs)
+    fig = figure(**kwargs)
     axes = []
     for i in range(prod):
-        ax = fig.add_subplot(nrows, ncols, i + 1)
+        ax = fig.add_subplot(
+            nrows,
+            ncols,
+            i + 1,
+            sharex=_share_with(sharex, axes, i, ncols),
+            sharey=_share_with(sharey, axes, i, ncols),
+        )
         axes.append(ax)
     # print("axes", axes)
     return fig, np.array(axes) if prod > 1 else axes[0]
@@ -0,0 +1,686 @@
+# mplcanvas/recording.py
+"""
+Headless rendering: record the canvas commands of a figure, and replay them as an
+SVG document or a PNG image, without a browser.
+
+``RecordingCanvas`` has the subset of the ipycanvas ``Canvas`` API used by the
+render functions, so the exact same (decimated) command stream as on screen can be
+exported, or compared in snapshot tests.
+
+Usage:
+    canvas = RecordingCanvas(640, 480)
+    draw_axes(ax, canvas)
+    canvas.to_image().save("axes.png")
+
+Images are rasterized with the Agg renderer of matplotlib, with one call per batch
+command (per style), so exporting large plots is about as fast as drawing them.
+"""
+
+import base64
+import io
+import itertools
+import math
+import re
+from xml.sax.saxutils import escape
+
+import numpy as np
+from matplotlib.backends.backend_agg import RendererAgg
+from matplotlib.colors import to_rgba
+from matplotlib.font_manager import FontProperties
+from matplotlib.path import Path
+from matplotlib.transforms import Affine2D, Bbox, IdentityTransform
+from PIL import Image
+
+# Canvas attributes which are recorded when set
+STYLE_ATTRIBUTES = (
+    "fill_style",
+    "stroke_style",
+    "line_width",
+    "font",
+    "text_align",
+    "text_baseline",
+    "global_alpha",
+    "image_smoothing_enabled",
+)
+
+# Canvas methods which are recorded when called
+COMMANDS = (
+    "save",
+    "restore",
+    "translate",
+    "rotate",
+    "begin_path",
+    "move_to",
+    "line_to",
+    "rect",
+    "stroke",
+    "clip",
+    "clear",
+    "clear_rect",
+    "fill_rect",
+    "stroke_rect",
+    "fill_rects",
+    "stroke_rects",
+    "fill_styled_rects",
+    "fill_circles",
+    "stroke_circles",
+    "fill_styled_circles",
+    "fill_polygons",
+    "stroke_polygons",
+    "stroke_line_segments",
+    "stroke_styled_line_segments",
+    "fill_text",
+    "draw_image",
+    "put_image_data",
+)
+
+DEFAULT_STYLE = {
+    "fill_style": "black",
+    "stroke_style": "black",
+    "line_width": 1.0,
+    "font": "12px sans-serif",
+    "text_align": "start",
+    "text_baseline": "alphabetic",
+    "global_alpha": 1.0,
+    "image_smoothing_enabled": True,
+}
+
+
+class RecordingCanvas:
+    """
+    Stand-in for an ipycanvas ``Canvas`` which records the commands sent to it.
+
+    The commands are kept in ``commands``, as ``(name, args, kwargs)`` tuples, with
+    ``name="set"`` for style attributes.
+    """
+
+    def __init__(self, width: int, height: int):
+        object.__setattr__(self, "width", width)
+        object.__setattr__(self, "height", height)
+        object.__setattr__(self, "commands", [])
+
+    def __setattr__(self, name, value):
+        if name not in STYLE_ATTRIBUTES:
+            raise AttributeError(f"RecordingCanvas does not support '{name}'.")
+        self.commands.append(("set", (name, value), {}))
+
+    def __getattr__(self, name):
+        if name not in COMMANDS:
+            raise AttributeError(f"RecordingCanvas does not support '{name}'.")
+
+        def record(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+
+        return record
+
+    def close(self):
+        """Nothing to release, for compatibility with ``Canvas``"""
+
+    def to_svg(self, facecolor="white") -> str:
+        """Replay the commands as an SVG document"""
+        return _SVGRenderer(self, facecolor).render()
+
+    def to_image(self, facecolor="white") -> Image.Image:
+        """Rasterize the commands to an RGB image"""
+        return _ImageRenderer(self, facecolor).render()
+
+
+def _broadcast(n, *values):
+    return [np.broadcast_to(np.asarray(value, dtype=float), (n,)) for value in values]
+
+
+def _batch(points, counts):
+    """
+    The points ``(n, 2)`` of a batch command, and the number of points of each of
+    its polygons or lines, given ``counts`` as an array, as the same number for
+    all, or as ``None`` (one per row of a 3d array, or a single one)
+    """
+    points = np.asarray(points, dtype=float)
+    if counts is None:
+        counts = [points.shape[1]] * len(points) if points.ndim == 3 else [-1]
+    points = points.reshape(-1, 2)
+    counts = np.asarray(counts, dtype=int)
+    if counts.ndim == 0:
+        counts = np.full(len(points) // counts, counts)
+    counts[counts == -1] = len(points)
+    return points, counts
+
+
+def _styled_colors(color, alpha, n):
+    """RGBA colors (floats in [0, 1]) of the styled batch commands"""
+    rgb = np.broadcast_to(np.asarray(color, dtype=float).reshape(-1, 3), (n, 3))
+    alpha = np.broadcast_to(np.asarray(alpha, dtype=float), (n,))
+    return np.column_stack([rgb / 255, alpha])
+
+
+def _rgba(image_data):
+    """Image data given to ``put_image_data``, as an RGBA array of uint8"""
+    data = np.asarray(image_data, dtype=np.uint8)
+    if data.shape[2] == 3:
+        data = np.dstack([data, np.full(data.shape[:2], 255, dtype=np.uint8)])
+    return data
+
+
+def _placed(image_data, x=0, y=0):
+    """The arguments of ``put_image_data``"""
+    return _rgba(image_data), int(x), int(y)
+
+
+def _image_data(canvas):
+    """
+    The pixels of a canvas drawn as an image, as an RGBA array. The canvas must be
+    a ``RecordingCanvas`` only filled with ``put_image_data``.
+    """
+    commands = getattr(canvas, "commands", None)
+    if commands is None or any(name != "put_image_data" for name, _, _ in commands):
+        raise ValueError(
+            "Only recording canvases filled with put_image_data can be drawn."
+        )
+    data = np.zeros((canvas.height, canvas.width, 4), dtype=np.uint8)
+    for _, args, kwargs in commands:
+        pixels, x, y = _placed(*args, **kwargs)
+        pixels = pixels[: max(canvas.height - y, 0), : max(canvas.width - x, 0)]
+        data[y : y + pixels.shape[0], x : x + pixels.shape[1]] = pixels
+    return data
+
+
+class _Renderer:
+    """
+    Replay recorded commands. Subclasses implement the drawing primitives, in
+    device coordinates: ``polylines`` and ``polygons`` (points with the number of
+    points of each), ``rects``, ``circles``, ``text``, ``image``, and the clipping
+    with ``push_clip``/``pop_clip``. Colors are given as an (n, 4) array, with one
+    row for all the shapes or one per shape.
+    """
+
+    def __init__(self, canvas, facecolor):
+        self.canvas = canvas
+        self.width, self.height = canvas.width, canvas.height
+        self.facecolor = to_rgba(facecolor)
+        self.state = {**DEFAULT_STYLE, "matrix": np.eye(3), "clips": 0}
+        self.stack = []
+        self.path = []
+
+    def render(self):
+        for name, args, kwargs in self.canvas.commands:
+            if name == "set":
+                self.state[args[0]] = args[1]
+            else:
+                getattr(self, "_" + name)(*args, **kwargs)
+        while self.stack:
+            self._restore()
+        return self.result()
+
+    def color(self, style):
+        rgba = to_rgba(style)
+        return np.array([(*rgba[:3], rgba[3] * self.state["global_alpha"])])
+
+    def transform(self, points):
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        matrix = self.state["matrix"]
+        return points @ matrix[:2, :2].T + matrix[:2, 2]
+
+    def rotated(self):
+        matrix = self.state["matrix"]
+        return matrix[0, 1] != 0 or matrix[1, 0] != 0
+
+    # State
+    def _save(self):
+        self.stack.append(self.state)
+        self.state = {**self.state, "clips": 0}
+
+    def _restore(self):
+        for _ in range(self.state["clips"]):
+            self.pop_clip()
+        self.state = self.stack.pop()
+
+    def _translate(self, x, y):
+        self.state["matrix"] = self.state["matrix"] @ np.array(
+            [[1, 0, x], [0, 1, y], [0, 0, 1]], dtype=float
+        )
+
+    def _rotate(self, angle):
+        c, s = np.cos(angle), np.sin(angle)
+        self.state["matrix"] = self.state["matrix"] @ np.array(
+            [[c, -s, 0], [s, c, 0], [0, 0, 1]], dtype=float
+        )
+
+    # Paths
+    def _begin_path(self):
+        self.path = []
+
+    def _move_to(self, x, y):
+        self.path.append([(x, y)])
+
+    def _line_to(self, x, y):
+        if self.path:
+            self.path[-1].append((x, y))
+        else:
+            self._move_to(x, y)
+
+    def _rect(self, x, y, width, height):
+        self.path.append(
+            [(x, y), (x + width, y), (x + width, y + height), (x, y + height), (x, y)]
+        )
+
+    def _stroke(self):
+        lines = [subpath for subpath in self.path if len(subpath) > 1]
+        if lines:
+            points = self.transform(np.concatenate([np.array(p) for p in lines]))
+            counts = np.array([len(line) for line in lines])
+            self.polylines(points, counts, self.color(self.state["stroke_style"]))
+
+    def _clip(self):
+        # Only rectangular clipping regions are supported
+        points = self.transform(np.concatenate([np.array(p) for p in self.path]))
+        lower, upper = points.min(axis=0), points.max(axis=0)
+        self.push_clip((*lower, *upper))
+        self.state["clips"] += 1
+
+    # Rectangles
+    def _clear(self):
+        self._clear_rect(0, 0, self.width, self.height)
+
+    def _clear_rect(self, x, y, width, height):
+        self.rects(*_broadcast(1, x, y, width, height), [self.facecolor], fill=True)
+
+    def _fill_rect(self, x, y, width, height=None):
+        self._fill_rects(x, y, width, height)
+
+    def _stroke_rect(self, x, y, width, height=None):
+        self._stroke_rects(x, y, width, height)
+
+    def _draw_rects(self, x, y, width, height, colors, fill):
+        height = width if height is None else height
+        n = max(np.size(x), np.size(y), np.size(width), np.size(height))
+        x, y, width, height = _broadcast(n, x, y, width, height)
+        if not self.rotated():
+            x, y = self.transform(np.column_stack([x, y])).T
+            self.rects(x, y, width, height, colors, fill=fill)
+            return
+        corners = np.stack(
+            [
+                np.column_stack([x, y]),
+                np.column_stack([x + width, y]),
+                np.column_stack([x + width, y + height]),
+                np.column_stack([x, y + height]),
+            ],
+            axis=1,
+        )
+        self.polygons(self.transform(corners), np.full(n, 4), colors, fill=fill)
+
+    def _fill_rects(self, x, y, width, height=None):
+        color = self.color(self.state["fill_style"])
+        self._draw_rects(x, y, width, height, color, fill=True)
+
+    def _stroke_rects(self, x, y, width, height=None):
+        color = self.color(self.state["stroke_style"])
+        self._draw_rects(x, y, width, height, color, fill=False)
+
+    def _fill_styled_rects(self, x, y, width, height, color, alpha=1):
+        n = max(np.size(x), np.size(y), np.size(width), np.size(height))
+        self._draw_rects(x, y, width, height, _styled_colors(color, alpha, n), True)
+
+    # Circles
+    def _draw_circles(self, x, y, radius, colors, fill):
+        n = max(np.size(x), np.size(y), np.size(radius))
+        x, y, radius = _broadcast(n, x, y, radius)
+        x, y = self.transform(np.column_stack([x, y])).T
+        self.circles(x, y, radius, colors, fill=fill)
+
+    def _fill_circles(self, x, y, radius):
+        color = self.color(self.state["fill_style"])
+        self._draw_circles(x, y, radius, color, fill=True)
+
+    def _stroke_circles(self, x, y, radius):
+        color = self.color(self.state["stroke_style"])
+        self._draw_circles(x, y, radius, color, fill=False)
+
+    def _fill_styled_circles(self, x, y, radius, color, alpha=1):
+        n = max(np.size(x), np.size(y), np.size(radius))
+        self._draw_circles(x, y, radius, _styled_colors(color, alpha, n), True)
+
+    # Polygons and lines
+    def _fill_polygons(self, points, points_per_polygon=None):
+        points, counts = _batch(points, points_per_polygon)
+        color = self.color(self.state["fill_style"])
+        self.polygons(self.transform(points), counts, color, fill=True)
+
+    def _stroke_polygons(self, points, points_per_polygon=None):
+        points, counts = _batch(points, points_per_polygon)
+        color = self.color(self.state["stroke_style"])
+        self.polygons(self.transform(points), counts, color, fill=False)
+
+    def _stroke_line_segments(self, points, points_per_line_segment=None):
+        points, counts = _batch(points, points_per_line_segment)
+        color = self.color(self.state["stroke_style"])
+        self.polylines(self.transform(points), counts, color)
+
+    def _stroke_styled_line_segments(
+        self, points, color, alpha=1, points_per_line_segment=None
+    ):
+        points, counts = _batch(points, points_per_line_segment)
+        colors = _styled_colors(color, alpha, len(counts))
+        colors[:, 3] *= self.state["global_alpha"]
+        self.polylines(self.transform(points), counts, colors)
+
+    # Text
+    def _fill_text(self, text, x, y, max_width=None):
+        ((x, y),) = self.transform([(x, y)])
+        matrix = self.state["matrix"]
+        angle = np.arctan2(matrix[1, 0], matrix[0, 0])
+        match = re.search(r"([\d.]+)px", self.state["font"])
+        size = float(match.group(1)) if match else 12.0
+        self.text(text, x, y, angle, size, self.color(self.state["fill_style"])[0])
+
+    # Images
+    def _draw_image(self, image, x, y, width=None, height=None):
+        data = _image_data(image)
+        width = data.shape[1] if width is None else width
+        height = data.shape[0] if height is None else height
+        if self.rotated():
+            raise ValueError("Rotated images are not supported.")
+        (x0, y0), (x1, y1) = self.transform([(x, y), (x + width, y + height)])
+        if x1 < x0:
+            data, x0, x1 = data[:, ::-1], x1, x0
+        if y1 < y0:
+            data, y0, y1 = data[::-1], y1, y0
+        self.image(
+            data, x0, y0, x1 - x0, y1 - y0, self.state["image_smoothing_enabled"]
+        )
+
+    def _put_image_data(self, image_data, x=0, y=0):
+        data = _rgba(image_data)
+        self.image(data, x, y, data.shape[1], data.shape[0], False)
+
+
+def _svg_color(rgba):
+    r, g, b, a = rgba
+    return f"#{round(r * 255):02x}{round(g * 255):02x}{round(b * 255):02x}", a
+
+
+def _svg_points(points):
+    return " ".join(f"{x:.2f},{y:.2f}" for x, y in points)
+
+
+def _split(points, counts):
+    return np.split(points, np.cumsum(counts)[:-1])
+
+
+class _SVGRenderer(_Renderer):
+    def __init__(self, canvas, facecolor):
+        super().__init__(canvas, facecolor)
+        self.elements = []
+        self.nclips = 0
+
+    def result(self):
+        header = (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" '
+            f'height="{self.height}" viewBox="0 0 {self.width} {self.height}">'
+        )
+        return "\n".join([header, *self.elements, "</svg>"]) + "\n"
+
+    def paint(self, color, fill):
+        hex_color, alpha = _svg_color(color)
+        if fill:
+            return f'fill="{hex_color}" fill-opacity="{alpha:.3g}" stroke="none"'
+        return (
+            f'fill="none" stroke="{hex_color}" stroke-opacity="{alpha:.3g}" '
+            f'stroke-width="{float(self.state["line_width"]):.3g}" '
+            'stroke-linejoin="round"'
+        )
+
+    def batches(self, shapes, colors):
+        """Group consecutive shapes with the same color, to emit one path each"""
+        colors = [tuple(color) for color in colors]
+        if len(colors) == 1:
+            yield colors[0], shapes
+            return
+        start = 0
+        for i in range(1, len(shapes) + 1):
+            if i == len(shapes) or colors[i] != colors[start]:
+                yield colors[start], shapes[start:i]
+                start = i
+
+    def polylines(self, points, counts, colors):
+        for color, batch in self.batches(_split(points, counts), colors):
+            d = " ".join(f"M{_svg_points(line)}" for line in batch if len(line) > 1)
+            if d:
+                self.elements.append(f'<path d="{d}" {self.paint(color, False)}/>')
+
+    def polygons(self, points, counts, colors, fill):
+        for color, batch in self.batches(_split(points, counts), colors):
+            d = " ".join(f"M{_svg_points(polygon)}Z" for polygon in batch)
+            if d:
+                self.elements.append(f'<path d="{d}" {self.paint(color, fill)}/>')
+
+    def rects(self, x, y, width, height, colors, fill):
+        rects = list(zip(x, y, width, height, strict=True))
+        for color, batch in self.batches(rects, colors):
+            d = " ".join(
+                f"M{x:.2f},{y:.2f}h{w:.2f}v{h:.2f}h{-w:.2f}Z" for x, y, w, h in batch
+            )
+            if d:
+                self.elements.append(f'<path d="{d}" {self.paint(color, fill)}/>')
+
+    def circles(self, x, y, radius, colors, fill):
+        circles = list(zip(x, y, radius, strict=True))
+        for color, batch in self.batches(circles, colors):
+            d = " ".join(
+                f"M{x - r:.2f},{y:.2f}a{r:.2f},{r:.2f} 0 1,0 {2 * r:.2f},0"
+                f"a{r:.2f},{r:.2f} 0 1,0 {-2 * r:.2f},0"
+                for x, y, r in batch
+            )
+            if d:
+                self.elements.append(f'<path d="{d}" {self.paint(color, fill)}/>')
+
+    def text(self, text, x, y, angle, size, color):
+        anchor = {"center": "middle", "right": "end", "end": "end"}.get(
+            self.state["text_align"], "start"
+        )
+        baseline = {
+            "top": "text-before-edge",
+            "middle": "central",
+            "bottom": "text-after-edge",
+        }.get(self.state["text_baseline"], "auto")
+        hex_color, alpha = _svg_color(color)
+        rotation = ""
+        if angle:
+            rotation = f' transform="rotate({np.degrees(angle):.3g} {x:.2f} {y:.2f})"'
+        self.elements.append(
+            f'<text x="{x:.2f}" y="{y:.2f}" font-size="{size:.3g}" '
+            f'font-family="sans-serif" text-anchor="{anchor}" '
+            f'dominant-baseline="{baseline}" fill="{hex_color}" '
+            f'fill-opacity="{alpha:.3g}"{rotation}>{escape(text)}</text>'
+        )
+
+    def image(self, data, x, y, width, height, smoothing):
+        buffer = io.BytesIO()
+        Image.fromarray(data, "RGBA").save(buffer, format="png")
+        href = base64.b64encode(buffer.getvalue()).decode()
+        rendering = "" if smoothing else ' style="image-rendering:pixelated"'
+        self.elements.append(
+            f'<image x="{x:.2f}" y="{y:.2f}" width="{width:.2f}" '
+            f'height="{height:.2f}" preserveAspectRatio="none"{rendering} '
+            f'href="data:image/png;base64,{href}"/>'
+        )
+
+    def push_clip(self, box):
+        x0, y0, x1, y1 = box
+        self.nclips += 1
+        self.elements.append(
+            f'<clipPath id="clip{self.nclips}"><rect x="{x0:.2f}" y="{y0:.2f}" '
+            f'width="{x1 - x0:.2f}" height="{y1 - y0:.2f}"/></clipPath>'
+        )
+        self.elements.append(f'<g clip-path="url(#clip{self.nclips})">')
+
+    def pop_clip(self):
+        self.elements.append("</g>")
+
+
+def _color_runs(colors, n):
+    """Ranges ``(start, stop, color)`` of consecutive shapes with the same color"""
+    if len(colors) == 1:
+        return [(0, n, tuple(colors[0]))]
+    change = np.flatnonzero(np.any(colors[1:] != colors[:-1], axis=1)) + 1
+    bounds = [0, *change.tolist(), n]
+    return [
+        (start, stop, tuple(colors[start]))
+        for start, stop in itertools.pairwise(bounds)
+    ]
+
+
+def _counterclockwise(points, counts):
+    """
+    The points of polygons, with the clockwise ones reversed, so that overlapping
+    polygons are all filled with the nonzero winding rule
+    """
+    index = np.arange(len(points))
+    starts = np.cumsum(counts) - counts
+    last = np.repeat(starts + counts - 1, counts)
+    following = np.where(index == last, np.repeat(starts, counts), index + 1)
+    x, y = points[:, 0], points[:, 1]
+    area = np.add.reduceat(x * y[following] - x[following] * y, starts)
+    reverse = np.repeat(area < 0, counts)
+    local = index - np.repeat(starts, counts)
+    return points[np.where(reverse, last - local, index)]
+
+
+class _ImageRenderer(_Renderer):
+    """
+    Rasterize with the Agg renderer of matplotlib. Each batch of shapes of the
+    same color is a single path or path collection.
+    """
+
+    def __init__(self, canvas, facecolor):
+        super().__init__(canvas, facecolor)
+        # One point is one pixel at 72 dpi
+        self.renderer = RendererAgg(self.width, self.height, 72)
+        # Canvas coordinates have their origin at the top
+        self.flip = Affine2D().scale(1, -1).translate(0, self.height)
+        # Clipping regions being drawn, as (x0, y0, x1, y1) in canvas coordinates
+        self.clips = [(0, 0, self.width, self.height)]
+        self._clear()
+
+    def result(self):
+        return Image.fromarray(np.asarray(self.renderer.buffer_rgba())).convert("RGB")
+
+    def gc(self, color=None):
+        gc = self.renderer.new_gc()
+        x0, y0, x1, y1 = self.clips[-1]
+        gc.set_clip_rectangle(
+            Bbox([[x0, self.height - y1], [max(x1, x0), self.height - y0]])
+        )
+        gc.set_linewidth(float(self.state["line_width"]))
+        gc.set_joinstyle("round")
+        if color is not None:
+            gc.set_foreground(color, isRGBA=True)
+        return gc
+
+    def polylines(self, points, counts, colors):
+        starts = np.cumsum(counts) - counts
+        codes = np.full(len(points), Path.LINETO, dtype=Path.code_type)
+        codes[starts] = Path.MOVETO
+        offsets = np.append(starts, len(points))
+        for first, last, color in _color_runs(colors, len(counts)):
+            start, stop = offsets[first], offsets[last]
+            path = Path(points[start:stop], codes[start:stop])
+            self.renderer.draw_path(self.gc(color), path, self.flip)
+
+    def polygons(self, points, counts, colors, fill):
+        if len(points) == 0:
+            return
+        points = _counterclockwise(points, counts)
+        # Each polygon is closed by an extra vertex
+        ends = np.cumsum(counts)
+        starts = ends - counts
+        vertices = np.insert(points, ends, points[starts], axis=0)
+        codes = np.full(len(vertices), Path.LINETO, dtype=Path.code_type)
+        offsets = starts + np.arange(len(counts))
+        codes[offsets] = Path.MOVETO
+        codes[ends + np.arange(len(counts))] = Path.CLOSEPOLY
+        offsets = np.append(offsets, len(vertices))
+        for first, last, color in _color_runs(colors, len(counts)):
+            start, stop = offsets[first], offsets[last]
+            path = Path(vertices[start:stop], codes[start:stop])
+            if fill:
+                gc = self.gc()
+                gc.set_linewidth(0)
+                self.renderer.draw_path(gc, path, self.flip, color)
+            else:
+                self.renderer.draw_path(self.gc(color), path, self.flip)
+
+    def collection(self, path, x, y, scale_x, scale_y, colors, fill):
+        """Draw a copy of ``path`` at each point, scaled, in a single call"""
+        transforms = np.zeros((len(x), 3, 3))
+        transforms[:, 0, 0] = scale_x
+        # Canvas coordinates have their origin at the top
+        transforms[:, 1, 1] = -np.asarray(scale_y)
+        transforms[:, 2, 2] = 1
+        offsets = np.column_stack([x, self.height - np.asarray(y)])
+        colors = np.asarray(colors, dtype=float)
+        none = np.zeros((0, 4))
+        self.renderer.draw_path_collection(
+            self.gc(),
+            IdentityTransform(),
+            [path],
+            transforms,
+            offsets,
+            IdentityTransform(),
+            colors if fill else none,
+            none if fill else colors,
+            [0.0 if fill else float(self.state["line_width"])],
+            [(0, None)],
+            [True],
+            [None],
+            "screen",
+        )
+
+    def rects(self, x, y, width, height, colors, fill):
+        self.collection(Path.unit_rectangle(), x, y, width, height, colors, fill)
+
+    def circles(self, x, y, radius, colors, fill):
+        self.collection(Path.unit_circle(), x, y, radius, radius, colors, fill)
+
+    def text(self, text, x, y, angle, size, color):
+        prop = FontProperties(family="sans-serif", size=size)
+        width, height, descent = self.renderer.get_text_width_height_descent(
+            text, prop, ismath=False
+        )
+        # Offset of the start of the baseline, along and across the text
+        dx = {"center": -width / 2, "right": -width, "end": -width}.get(
+            self.state["text_align"], 0
+        )
+        dy = {
+            "top": height - descent,
+            "middle": height / 2 - descent,
+            "bottom": -descent,
+        }.get(self.state["text_baseline"], 0)
+        c, s = math.cos(angle), math.sin(angle)
+        x, y = x + c * dx - s * dy, y + s * dx + c * dy
+        # Like the canvas, draw_text takes y from the top (the renderer flips y) and
+        # places the baseline at y. Canvas angles turn clockwise.
+        self.renderer.draw_text(
+            self.gc(tuple(color)), x, y, text, prop, -np.degrees(angle)
+        )
+
+    def image(self, data, x, y, width, height, smoothing):
+        size = (max(round(width), 1), max(round(height), 1))
+        resample = Image.Resampling.BILINEAR if smoothing else Image.Resampling.NEAREST
+        pixels = np.asarray(Image.fromarray(data, "RGBA").resize(size, resample))
+        # Agg draws the first row at the bottom
+        self.renderer.draw_image(
+            self.gc(),
+            round(x),
+            round(self.height - y - size[1]),
+            np.ascontiguousarray(pixels[::-1]),
+        )
+
+    def push_clip(self, box):
+        x0, y0, x1, y1 = box
+        # Nested clipping regions intersect
+        px0, py0, px1, py1 = self.clips[-1]
+        self.clips.append((max(x0, px0), max(y0, py0), min(x1, px1), min(y1, py1)))
+
+    def pop_clip(self):
+        self.clips.pop()
@@ -1,182 +1,1463 @@
+"""
+Rendering of matplotlib axes onto an ipycanvas.
+
+Drawing an axes is split in two stages:
+
+- ``prepare_*`` functions do the CPU-heavy work (transforms, culling, colors) and
+  return lists of plain dicts of NumPy arrays and styles. They do not send anything
+  to the canvas, so the preparation of several axes can run concurrently in threads.
+- ``emit_*`` functions turn the prepared data into canvas commands. They must be
+  called from the main thread, typically inside a ``hold_canvas`` batch.
+"""
+
+import itertools
+
 import numpy as np
-from matplotlib.colors import to_hex
+from matplotlib.collections import Collection, LineCollection, PolyCollection
+from matplotlib.colors import to_hex, to_rgba, to_rgba_array
+from matplotlib.markers import MarkerStyle
+from matplotlib.patches import Rectangle
+from matplotlib.transforms import Affine2D
 
+from .buffers import BufferPool
+from .config import rcParams
+from .store import SeriesStore
 from .utils import flip_y
 
+TICK_LENGTH = 6
+LABEL_OFFSET = 3
+FONT_SIZE = 12
+
+# Fraction of the view prepared on each side of it when panning
+PAN_OVERSCAN = 1.0
+
+# Line styles and markers meaning that nothing is drawn
+NO_LINESTYLES = ("None", "none", " ", "")
+NO_MARKERS = ("None", "none", " ", "", None)
+# Image interpolations which draw magnified pixels as squares
+NEAREST_INTERPOLATIONS = ("nearest", "none", "antialiased", "auto")
+
+
+def quality(context, key):
+    """
+    A setting of the rendering quality profile of the context (see ``config``),
+    the ``"final"`` profile by default
+    """
+    profile = (context or {}).get("quality") or rcParams["quality.final"]
+    return profile[key]
+
+
+def point_budget(context):
+    """
+    Maximum number of points to draw per artist, from progressive rendering and
+    from the quality profile
+    """
+    budgets = [
+        budget
+        for budget in (
+            (context or {}).get("max_points"),
+            quality(context, "max_points"),
+        )
+        if budget is not None
+    ]
+    return min(budgets, default=None)
+
+
+def subsample_stride(npoints, max_points):
+    """Stride for subsampling ``npoints`` points down to at most ``max_points``"""
+    if max_points is None or npoints <= max_points:
+        return 1
+    return -(-npoints // max_points)
+
 
-def draw_line(line, ax, canvas, limits):
+def max_artist_size(ax):
+    """
+    Number of points of the largest artist of an axes, as limited by the point
+    budget (``"max_points"``). All the patches count as one artist, and images
+    count the pixels drawn, at most about the pixels of the axes.
+    """
+    sizes = [len(line.get_xdata()) for line in ax.lines]
+    sizes += [len(collection.get_offsets()) for collection in ax.collections]
+    sizes += [
+        sum(len(x) for x in artist.xs)
+        for artist in ax.artists
+        if isinstance(artist, SeriesStore)
+    ]
+    sizes.append(len(ax.patches))
+    area = ax.bbox.width * ax.bbox.height
+    sizes += [
+        min(np.prod(image.get_array().shape[:2]), area)
+        for image in ax.images
+        if image.get_array() is not None
+    ]
+    return int(max(sizes, default=0))
+
+
+def rgb_bytes(rgba):
+    """Convert RGBA colors with values in [0, 1] to an (n, 3) array of uint8"""
+    return (np.asarray(rgba)[:, :3] * 255).round().astype(np.uint8)
+
+
+def scratch(context, key, shape, dtype=float):
+    """
+    A temporary array from the buffer pool of the context (see ``buffers``), or a
+    new array without a pool
+    """
+    pool = (context or {}).get("buffers")
+    if pool is None:
+        return np.empty(shape, dtype=dtype)
+    return pool.get(key, shape, dtype)
+
+
+def transform_points(transform, points, out=None):
+    """
+    Transform (n, 2) points, writing the result into ``out`` (allocated if
+    ``None``). Affine transforms (linear scales) need no temporary arrays.
+    """
+    if not transform.is_affine:
+        if out is None:
+            return transform.transform(points)
+        out[...] = transform.transform(points)
+        return out
+    matrix = transform.get_matrix()
+    out = np.dot(points, matrix[:2, :2].T, out=out)
+    out += matrix[:2, 2]
+    return out
+
+
+def prepare_line(line, transform, canvas, limits, context=None):
     # Get data coordinates
     xdata = line.get_xdata()
     ydata = line.get_ydata()
 
-    if len(xdata) == 0 or len(ydata) == 0:
-        return
+    if len(xdata) == 0 or len(ydata) == 0 or not line.get_visible():
+        return []
+
+    # Use the level-of-detail pyramid of the line if it has one, and if the data
+    # was not changed since it was built
+    context = context or {}
+    lod = context.get("lods", {}).get(id(line))
+    if lod is not None and lod["xdata"] is xdata and lod["ydata"] is ydata:
+        xdata, ydata = lod["pyramid"].decimate(
+            limits['xmin'],
+            limits['xmax'],
+            max_points=context.get(
+                "lod_points", quality(context, "lod_points_per_pixel") * canvas.width
+            ),
+        )
+    else:
+        stride = subsample_stride(len(xdata), point_budget(context))
+        xdata = xdata[::stride]
+        ydata = ydata[::stride]
+    # Masked values are drawn as gaps, like NaNs
+    xdata = np.ma.filled(np.ma.asarray(xdata, dtype=float), np.nan)
+    ydata = np.ma.filled(np.ma.asarray(ydata, dtype=float), np.nan)
+
+    # Pack the coordinates into a scratch buffer, and transform them straight into
+    # the (n, 2) array which is sent
+    packed = scratch(context, "packed", (len(xdata), 2))
+    packed[:, 0] = xdata
+    packed[:, 1] = ydata
+    points = transform_points(transform, packed, out=np.empty_like(packed))
+    np.subtract(canvas.height, points[:, 1], out=points[:, 1])
+
+    points, counts, _ = split_finite_runs(points, [len(points)], context)
+    if len(counts) == 0:
+        return []
+    items = []
+    if line.get_linestyle() not in NO_LINESTYLES:
+        rgba = to_rgba(line.get_color(), line.get_alpha())
+        items.append(
+            {
+                "kind": "lines",
+                "points": points,
+                "counts": counts,
+                "colors": np.repeat(rgb_bytes([rgba]), len(counts), axis=0),
+                "alpha": np.full(len(counts), rgba[3]),
+                "linewidth": line.get_linewidth(),
+            }
+        )
+    if line.get_marker() not in NO_MARKERS:
+        items += prepare_markers(line, points, transform, canvas, limits, context)
+    return items
 
-    x, y = ax.transData.transform(np.array((xdata, ydata)).T).T
-    y = flip_y(y, canvas)
 
-    canvas.stroke_style = to_hex(line.get_color())
-    canvas.line_width = line.get_linewidth()
-    # Use numpy array for efficient drawing
-    points = np.column_stack([x, y])
-    canvas.stroke_lines(points)
+def prepare_markers(line, points, transform, canvas, limits, context=None):
+    """
+    Prepare the markers of a line, at the given (finite) pixel positions.
+
+    Markers outside of the axes are culled, and only one marker is kept per pixel.
+    Circles and squares are drawn with the native batched canvas commands, other
+    markers as batches of polygons (or line segments for unfilled markers) built by
+    stamping the marker path at every position.
+    """
+    marker = MarkerStyle(line.get_marker(), line.get_fillstyle())
+    # Marker size is in points
+    size = line.get_markersize() * line.figure.dpi / 72.0
+    margin = size / 2 + line.get_markeredgewidth()
+
+    # Cull markers outside of the view
+    x, y = points.T
+    visible = in_bounds(x, y, pixel_bounds(transform, limits, canvas), margin)
+    x, y = x[visible], y[visible]
+    keep = thin_markers(x, y, context)
+    x, y = x[keep], y[keep]
+    if len(x) == 0:
+        return []
+
+    alpha = line.get_alpha()
+    fill = to_rgba(line.get_markerfacecolor(), alpha)
+    edge = to_rgba(line.get_markeredgecolor(), alpha)
+    filled = marker.is_filled() and marker.get_fillstyle() != "none" and fill[3] > 0
+    item = {
+        "kind": "markers",
+        "x": x,
+        "y": y,
+        "size": size,
+        "fill": to_hex(fill, keep_alpha=True) if filled else None,
+        "stroke": None,
+        "edgewidth": line.get_markeredgewidth(),
+    }
+    if edge[3] > 0 and (not filled or edge != fill):
+        item["stroke"] = to_hex(edge, keep_alpha=True)
+    elif edge[3] > 0:
+        # An edge of the fill color is not drawn: the fill covers it instead, as
+        # half of the edge is outside of the marker
+        size = item["size"] = size + item["edgewidth"]
+
+    symbol = marker.get_marker()
+    if symbol in ("o", "s"):
+        item["shape"] = symbol
+        return [item]
+
+    # Stamp the marker path: vertices in pixels relative to the marker center,
+    # with y pointing down
+    path = marker.get_path().transformed(
+        marker.get_transform() + Affine2D().scale(size, -size)
+    )
+    polygons = path.to_polygons(closed_only=filled)
+    if len(polygons) == 0:
+        return []
+    vertices = np.concatenate(polygons)
+    centers = np.column_stack([x, y])
+    item["shape"] = "polygons" if filled else "segments"
+    item["points"] = (centers[:, None, :] + vertices[None, :, :]).reshape(-1, 2)
+    item["counts"] = np.tile([len(polygon) for polygon in polygons], len(x))
+    return [item]
+
+
+def emit_markers(item, canvas):
+    shape = item["shape"]
+    x, y = item["x"], item["y"]
+    radius = item["size"] / 2
+    if item["fill"] is not None:
+        canvas.fill_style = item["fill"]
+        if shape == "o":
+            canvas.fill_circles(x, y, radius)
+        elif shape == "s":
+            canvas.fill_rects(x - radius, y - radius, item["size"])
+        else:
+            canvas.fill_polygons(item["points"], points_per_polygon=item["counts"])
+    if item["stroke"] is not None:
+        canvas.stroke_style = item["stroke"]
+        canvas.line_width = item["edgewidth"]
+        if shape == "o":
+            canvas.stroke_circles(x, y, radius)
+        elif shape == "s":
+            canvas.stroke_rects(x - radius, y - radius, item["size"])
+        elif shape == "polygons":
+            canvas.stroke_polygons(item["points"], points_per_polygon=item["counts"])
+        else:
+            canvas.stroke_line_segments(
+                item["points"], points_per_line_segment=item["counts"]
+            )
+
+
+def prepare_line_collection(collection, transform, canvas, limits, context=None):
+    segments = collection.get_segments()
+    if len(segments) == 0 or not collection.get_visible():
+        return []
+    points = transform.transform(np.concatenate(segments))
+    points[:, 1] = flip_y(points[:, 1], canvas)
+    points, counts, owner = split_finite_runs(
+        points, [len(segment) for segment in segments]
+    )
+
+    # Colors and line widths are cycled over the segments, like in matplotlib
+    rgba = to_rgba_array(collection.get_colors(), collection.get_alpha())
+    rgba = rgba[owner % len(rgba)]
+    linewidths = np.asarray(collection.get_linewidths())
+    linewidths = linewidths[owner % len(linewidths)]
+
+    # The line width is a property of the canvas, so one batch is needed for each
+    # line width
+    items = []
+    for linewidth in dict.fromkeys(linewidths):
+        keep = (linewidths == linewidth) & (counts > 1)
+        if not keep.any():
+            continue
+        items.append(
+            {
+                "kind": "lines",
+                "points": points[np.repeat(keep, counts)],
+                "counts": counts[keep],
+                "colors": rgb_bytes(rgba[keep]),
+                "alpha": rgba[keep, 3],
+                "linewidth": float(linewidth),
+            }
+        )
+    return items
+
+
+def split_finite_runs(points, counts, context=None):
+    """
+    Split polylines at their non-finite (NaN or infinite) points.
+
+    The polylines are given as an (n, 2) array of packed points, and the number of
+    points of each polyline. Returns the finite points, the number of points of
+    each resulting run of finite points, and the index of the input polyline that
+    each run comes from.
+    """
+    counts = np.asarray(counts)
+    finite = np.isfinite(
+        points[:, 0], out=scratch(context, "finite", len(points), bool)
+    )
+    finite &= np.isfinite(
+        points[:, 1], out=scratch(context, "finite_y", len(points), bool)
+    )
+    if finite.all():
+        return points, counts, np.arange(len(counts))
+
+    # A run starts at each finite point which is the first point of a polyline or
+    # which follows a non-finite point
+    first = np.cumsum(counts)[:-1]
+    starts = np.zeros(len(points), dtype=bool)
+    starts[first[first < len(points)]] = True
+    starts[0] = True
+    starts[1:] |= ~finite[:-1]
+    starts &= finite
+
+    run_index = np.cumsum(starts)[finite] - 1
+    owner = np.repeat(np.arange(len(counts)), counts)[starts]
+    return points[finite], np.bincount(run_index, minlength=len(owner)), owner
+
+
+def pixel_bounds(transform, limits, canvas):
+    """
+    Rectangle ``(xmin, ymin, xmax, ymax)``, in canvas coordinates, covered by the
+    given data limits
+    """
+    (x0, y0), (x1, y1) = transform.transform(
+        [(limits['xmin'], limits['ymin']), (limits['xmax'], limits['ymax'])]
+    )
+    y0, y1 = flip_y(y0, canvas), flip_y(y1, canvas)
+    return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
 
+def in_bounds(x, y, bounds, margin=0.0, out=None, tmp=None):
+    """
+    Mask of the points inside of a ``(xmin, ymin, xmax, ymax)`` rectangle. The
+    mask is written into ``out``, using ``tmp`` as temporary, if they are given.
+    """
+    xmin, ymin, xmax, ymax = bounds
+    mask = np.greater_equal(x, xmin - margin, out=out)
+    mask &= np.less_equal(x, xmax + margin, out=tmp)
+    mask &= np.greater_equal(y, ymin - margin, out=tmp)
+    mask &= np.less_equal(y, ymax + margin, out=tmp)
+    return mask
 
-def draw_collection(collection, ax, canvas, limits):
+
+def thin_markers(x, y, context=None, keep="first"):
+    """
+    Indices of the markers to draw, according to the deduplication and density
+    settings of the quality profile
+    """
+    cell = quality(context, "marker_dedup")
+    index = unique_pixels(x, y, keep=keep, size=cell) if cell else np.arange(len(x))
+    stride = subsample_stride(len(index), quality(context, "max_markers"))
+    return index[::stride]
+
+
+def unique_pixels(x, y, keep="first", size=1):
+    """
+    Indices of the points to keep so that at most one point is drawn per pixel
+    (or per cell of ``size`` pixels): the ``"first"`` or the ``"last"`` one, in
+    drawing order.
+    """
+    if len(x) == 0:
+        return np.arange(0)
+    xi = np.floor(np.asarray(x) / size + 0.5).astype(np.int64)
+    yi = np.floor(np.asarray(y) / size + 0.5).astype(np.int64)
+    xi -= xi.min()
+    yi -= yi.min()
+    # Pack the pixel coordinates into a single integer per point
+    packed = yi * (xi.max() + 1) + xi
+    if keep == "last":
+        _, index = np.unique(packed[::-1], return_index=True)
+        index = len(x) - 1 - index
+    else:
+        _, index = np.unique(packed, return_index=True)
+    index.sort()
+    return index
+
+
+def merge_lines(items):
+    """
+    Merge runs of consecutive "lines" items with the same line width into a single
+    item, so that they are drawn with a single batched command.
+    """
+    runs = []
+    for item in items:
+        if (
+            runs
+            and item["kind"] == "lines"
+            and runs[-1][0]["kind"] == "lines"
+            and runs[-1][0]["linewidth"] == item["linewidth"]
+        ):
+            runs[-1].append(item)
+        else:
+            runs.append([item])
+    return [
+        run[0]
+        if len(run) == 1
+        else {
+            "kind": "lines",
+            "points": np.concatenate([item["points"] for item in run]),
+            "counts": np.concatenate([item["counts"] for item in run]),
+            "colors": np.concatenate([item["colors"] for item in run]),
+            "alpha": np.concatenate([item["alpha"] for item in run]),
+            "linewidth": run[0]["linewidth"],
+        }
+        for run in runs
+    ]
+
+
+def emit_lines(item, canvas):
+    alpha = item["alpha"]
+    if np.all(alpha == alpha[0]):
+        # Avoid sending a buffer when all lines have the same opacity
+        alpha = float(alpha[0])
+    canvas.line_width = item["linewidth"]
+    canvas.stroke_styled_line_segments(
+        item["points"],
+        item["colors"],
+        alpha,
+        points_per_line_segment=item["counts"],
+    )
+
+
+def prepare_collection(collection, transform, canvas, limits, context=None):
     # Currently, only support scatter collections
     offsets = collection.get_offsets()
-    if len(offsets) == 0:
-        return
+    if len(offsets) == 0 or not collection.get_visible():
+        return []
+    stride = subsample_stride(len(offsets), point_budget(context))
+    offsets = offsets[::stride]
     xdata, ydata = offsets[:, 0], offsets[:, 1]
 
     # Select only points within limits
-    mask = xdata >= limits['xmin']
-    mask &= xdata <= limits['xmax']
-    mask &= ydata >= limits['ymin']
-    mask &= ydata <= limits['ymax']
-    if mask.sum() == 0:
-        return
-    xdata = xdata[mask]
-    ydata = ydata[mask]
-
-    x, y = ax.transData.transform(np.array((xdata, ydata)).T).T
-    y = flip_y(y, canvas)
+    mask = in_bounds(
+        xdata,
+        ydata,
+        (limits['xmin'], limits['ymin'], limits['xmax'], limits['ymax']),
+        out=scratch(context, "mask", len(xdata), bool),
+        tmp=scratch(context, "mask_tmp", len(xdata), bool),
+    )
+    count = np.count_nonzero(mask)
+    if count == 0:
+        return []
+    packed = scratch(context, "packed", (count, 2))
+    np.compress(mask, xdata, out=packed[:, 0])
+    np.compress(mask, ydata, out=packed[:, 1])
 
-    canvas.fill_style = to_hex(collection.get_facecolor())
-    canvas.stroke_style = to_hex(collection.get_edgecolor())
+    points = transform_points(transform, packed, out=np.empty_like(packed))
+    np.subtract(canvas.height, points[:, 1], out=points[:, 1])
+    x, y = points[:, 0], points[:, 1]
 
     size = collection.get_sizes() ** 0.5
     if len(size) == 1:
         size = size[0]
+    else:
+        size = per_point(size, stride, mask)
+
+    item = {
+        "kind": "collection",
+        "x": x,
+        "y": y,
+        "size": size,
+        # Square markers have 5 vertices
+        "marker": "s" if len(collection.get_paths()[0].vertices) == 5 else "o",
+    }
+    # Map the data values to colors, if any, as matplotlib does when drawing
+    collection.update_scalarmappable()
+    facecolors = collection.get_facecolor()
+    if len(facecolors) > 1:
+        facecolors = per_point(facecolors, stride, mask)
+        item["colors"] = rgb_bytes(facecolors)
+        item["alpha"] = facecolors[:, 3]
+    else:
+        item["fill"] = (
+            to_hex(facecolors[0], keep_alpha=True) if len(facecolors) else None
+        )
+    edgecolors = collection.get_edgecolor()
+    item["stroke"] = to_hex(edgecolors[0], keep_alpha=True) if len(edgecolors) else None
+
+    # Only keep one marker per pixel. Translucent markers add up where they
+    # overlap, so they are all kept.
+    alpha = item.get("alpha", facecolors[:, 3])
+    if np.ndim(size) == 0 and np.all(alpha == 1):
+        # With per-point colors, the topmost marker is the visible one
+        keep = thin_markers(x, y, context, keep="last" if "colors" in item else "first")
+        for key in ("x", "y", "colors", "alpha"):
+            if key in item:
+                item[key] = item[key][keep]
+    return [item]
+
+
+def prepare_store(store, transform, canvas, limits, context=None):
+    """
+    Prepare the series of a ``SeriesStore``. Lines are drawn in one batch per line
+    width, and scatter series in one batch per style. Series whose bounds are
+    outside of the view are skipped without touching their data.
+    """
+    if len(store) == 0 or not store.get_visible():
+        return []
+    kinds, series_styles, shown, bounds = store.columns()
+    xmin, xmax = sorted((limits['xmin'], limits['xmax']))
+    ymin, ymax = sorted((limits['ymin'], limits['ymax']))
+    shown &= (bounds[:, 0] <= xmax) & (bounds[:, 1] >= xmin)
+    shown &= (bounds[:, 2] <= ymax) & (bounds[:, 3] >= ymin)
+    if not shown.any():
+        return []
+    colors = to_rgba_array([style["color"] for style in store.styles])
+    stride = subsample_stride(
+        sum(len(store.xs[i]) for i in np.flatnonzero(shown)), point_budget(context)
+    )
+
+    def packed_points(series):
+        """Pixel positions of the points of several series, and their counts"""
+        xs = [store.xs[i][::stride] for i in series]
+        points = np.empty((sum(len(x) for x in xs), 2))
+        points[:, 0] = np.concatenate(xs)
+        points[:, 1] = np.concatenate([store.ys[i][::stride] for i in series])
+        points = transform.transform(points)
+        points[:, 1] = flip_y(points[:, 1], canvas)
+        return points, [len(x) for x in xs]
+
+    items = []
+    lines = np.flatnonzero(shown & (kinds == "line"))
+    linewidths = np.array(
+        [store.styles[style]["linewidth"] for style in series_styles[lines]]
+    )
+    for linewidth in dict.fromkeys(linewidths.tolist()):
+        series = lines[linewidths == linewidth]
+        points, counts, owner = split_finite_runs(*packed_points(series))
+        keep = counts > 1
+        if not keep.any():
+            continue
+        rgba = colors[series_styles[series[owner[keep]]]]
+        items.append(
+            {
+                "kind": "lines",
+                "points": points[np.repeat(keep, counts)],
+                "counts": counts[keep],
+                "colors": rgb_bytes(rgba),
+                "alpha": rgba[:, 3],
+                "linewidth": linewidth,
+            }
+        )
+
+    scatters = np.flatnonzero(shown & (kinds == "scatter"))
+    for style_id in dict.fromkeys(series_styles[scatters].tolist()):
+        style = store.styles[style_id]
+        points, _ = packed_points(scatters[series_styles[scatters] == style_id])
+        x, y = points.T
+        visible = in_bounds(
+            x, y, pixel_bounds(transform, limits, canvas), style["size"]
+        )
+        keep = thin_markers(x[visible], y[visible], context)
+        if len(keep) == 0:
+            continue
+        items.append(
+            {
+                "kind": "collection",
+                "x": x[visible][keep],
+                "y": y[visible][keep],
+                "size": style["size"],
+                "marker": style["marker"],
+                "fill": to_hex(style["color"], keep_alpha=True),
+                "stroke": None,
+            }
+        )
+    return items
+
 
-    first_path = collection.get_paths()[0]
-    if len(first_path.vertices) == 5:
-        canvas.fill_rects(x, y, size)  # Square markers have 5 vertices
+def per_point(values, stride, mask):
+    """
+    Select the values of the points which are drawn, cycling through the values if
+    there are fewer values than points (as matplotlib does)
+    """
+    index = np.flatnonzero(mask) * stride
+    return values[index % len(values)]
+
+
+def emit_collection(item, canvas):
+    if item["stroke"] is not None:
+        canvas.stroke_style = item["stroke"]
+    if "colors" in item:
+        if item["marker"] == "s":
+            canvas.fill_styled_rects(
+                item["x"],
+                item["y"],
+                item["size"],
+                item["size"],
+                color=item["colors"],
+                alpha=item["alpha"],
+            )
+        else:
+            canvas.fill_styled_circles(
+                item["x"],
+                item["y"],
+                item["size"],
+                color=item["colors"],
+                alpha=item["alpha"],
+            )
+        return
+    if item["fill"] is None:
+        return
+    canvas.fill_style = item["fill"]
+    if item["marker"] == "s":
+        canvas.fill_rects(item["x"], item["y"], item["size"])
     else:
-        canvas.fill_circles(x, y, size)
+        canvas.fill_circles(item["x"], item["y"], item["size"])
+
+
+def style_key(facecolor, edgecolor, linewidth, fill=True):
+    """
+    Drawing style of a patch or polygon, as a hashable ``(fill, stroke, linewidth)``
+    tuple. Invisible fills and strokes are ``None``.
+    """
+    fill = to_hex(facecolor, keep_alpha=True) if fill and facecolor[3] > 0 else None
+    visible = linewidth > 0 and edgecolor[3] > 0
+    stroke = to_hex(edgecolor, keep_alpha=True) if visible else None
+    return fill, stroke, float(linewidth) if visible else 0.0
+
+
+def group_by_style(keys):
+    """Group indices by drawing style, in order of first appearance"""
+    groups = {}
+    for i, key in enumerate(keys):
+        if key[0] is not None or key[1] is not None:
+            groups.setdefault(key, []).append(i)
+    return groups
+
+
+def prepare_patches(patches, ax, offset, canvas, limits, context=None):
+    """
+    Prepare patches, such as the bars of a bar chart or a histogram.
+
+    Axis-aligned rectangles in data coordinates are transformed all at once and
+    drawn as rectangle batches, any other patch is converted to a polygon. One
+    item is produced per drawing style. The patches are subsampled down to the
+    point budget.
+    """
+    patches = [patch for patch in patches if patch.get_visible()]
+    patches = patches[:: subsample_stride(len(patches), point_budget(context))]
+    is_rect = [
+        isinstance(patch, Rectangle)
+        and patch.get_angle() == 0
+        and patch.get_data_transform() is ax.transData
+        for patch in patches
+    ]
+    items = []
+
+    rects = [patch for patch, rect in zip(patches, is_rect, strict=True) if rect]
+    if rects:
+        x0 = np.array([r.get_x() for r in rects], dtype=float)
+        y0 = np.array([r.get_y() for r in rects], dtype=float)
+        x1 = x0 + np.array([r.get_width() for r in rects], dtype=float)
+        y1 = y0 + np.array([r.get_height() for r in rects], dtype=float)
+        # Cull rectangles outside of the view
+        visible = np.minimum(x0, x1) <= max(limits['xmin'], limits['xmax'])
+        visible &= np.maximum(x0, x1) >= min(limits['xmin'], limits['xmax'])
+        visible &= np.minimum(y0, y1) <= max(limits['ymin'], limits['ymax'])
+        visible &= np.maximum(y0, y1) >= min(limits['ymin'], limits['ymax'])
+        transform = ax.transData + offset
+        ax0, ay0 = transform.transform(np.column_stack([x0, y0])).T
+        ax1, ay1 = transform.transform(np.column_stack([x1, y1])).T
+        ay0, ay1 = flip_y(ay0, canvas), flip_y(ay1, canvas)
+        left, top = np.minimum(ax0, ax1), np.minimum(ay0, ay1)
+        width, height = np.abs(ax1 - ax0), np.abs(ay1 - ay0)
+        keys = [
+            style_key(
+                r.get_facecolor(), r.get_edgecolor(), r.get_linewidth(), r.get_fill()
+            )
+            for r in rects
+        ]
+        for (fill, stroke, linewidth), index in group_by_style(keys).items():
+            index = np.asarray(index)
+            index = index[visible[index]]
+            if len(index) == 0:
+                continue
+            items.append(
+                {
+                    "kind": "rects",
+                    "x": left[index],
+                    "y": top[index],
+                    "width": width[index],
+                    "height": height[index],
+                    "fill": fill,
+                    "stroke": stroke,
+                    "linewidth": linewidth,
+                }
+            )
+
+    others = [patch for patch, rect in zip(patches, is_rect, strict=True) if not rect]
+    polygons, keys = [], []
+    for patch in others:
+        transform = patch.get_transform() + offset
+        for polygon in patch.get_path().to_polygons(transform):
+            polygons.append(polygon)
+            keys.append(
+                style_key(
+                    patch.get_facecolor(),
+                    patch.get_edgecolor(),
+                    patch.get_linewidth(),
+                    patch.get_fill(),
+                )
+            )
+    bounds = pixel_bounds(ax.transData + offset, limits, canvas)
+    return items + prepare_polygons(polygons, keys, canvas, bounds)
+
+
+def prepare_poly_collection(collection, transform, canvas, limits, context=None):
+    """
+    Prepare a collection of polygons, such as the ones made by ``fill_between``.
+    """
+    paths = collection.get_paths()
+    if len(paths) == 0 or not collection.get_visible():
+        return []
+    bounds = pixel_bounds(transform, limits, canvas)
+    offset = transform - collection.axes.transData
+    transform = collection.get_transform() + offset
+    facecolors = collection.get_facecolor()
+    edgecolors = collection.get_edgecolor()
+    linewidths = collection.get_linewidth()
+    polygons, keys = [], []
+    for i, path in enumerate(paths):
+        key = style_key(
+            facecolors[i % len(facecolors)] if len(facecolors) else (0, 0, 0, 0),
+            edgecolors[i % len(edgecolors)] if len(edgecolors) else (0, 0, 0, 0),
+            linewidths[i % len(linewidths)] if len(linewidths) else 0.0,
+        )
+        for polygon in path.to_polygons(transform):
+            polygons.append(polygon)
+            keys.append(key)
+    return prepare_polygons(polygons, keys, canvas, bounds)
+
+
+def prepare_polygons(polygons, keys, canvas, bounds):
+    """
+    Batch polygons (in display coordinates relative to the canvas) by drawing style.
+    Polygons outside of the ``(xmin, ymin, xmax, ymax)`` bounds (in canvas
+    coordinates) are culled.
+    """
+    items = []
+    for (fill, stroke, linewidth), index in group_by_style(keys).items():
+        selected = [polygons[i] for i in index]
+        counts = np.array([len(polygon) for polygon in selected])
+        points = np.concatenate(selected)
+        points[:, 1] = flip_y(points[:, 1], canvas)
+        # Cull polygons whose bounding box is outside of the bounds
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        lower = np.minimum.reduceat(points, starts)
+        upper = np.maximum.reduceat(points, starts)
+        visible = (upper[:, 0] >= bounds[0]) & (lower[:, 0] <= bounds[2])
+        visible &= (upper[:, 1] >= bounds[1]) & (lower[:, 1] <= bounds[3])
+        if not visible.any():
+            continue
+        if not visible.all():
+            points = points[np.repeat(visible, counts)]
+            counts = counts[visible]
+        items.append(
+            {
+                "kind": "polygons",
+                "points": points,
+                "counts": counts,
+                "fill": fill,
+                "stroke": stroke,
+                "linewidth": linewidth,
+            }
+        )
+    return items
+
+
+def emit_rects(item, canvas):
+    if item["fill"] is not None:
+        canvas.fill_style = item["fill"]
+        canvas.fill_rects(item["x"], item["y"], item["width"], item["height"])
+    if item["stroke"] is not None:
+        canvas.stroke_style = item["stroke"]
+        canvas.line_width = item["linewidth"]
+        canvas.stroke_rects(item["x"], item["y"], item["width"], item["height"])
+
 
+def emit_polygons(item, canvas):
+    if item["fill"] is not None:
+        canvas.fill_style = item["fill"]
+        canvas.fill_polygons(item["points"], points_per_polygon=item["counts"])
+    if item["stroke"] is not None:
+        canvas.stroke_style = item["stroke"]
+        canvas.line_width = item["linewidth"]
+        canvas.stroke_polygons(item["points"], points_per_polygon=item["counts"])
 
-def draw_ticks_and_labels(ax, canvas):
+
+def prepare_image(image, transform, canvas, limits, context=None):
+    """
+    Prepare the tiles of an image which are visible within the data limits, at
+    the level of its pyramid matching the zoom (see ``tiles``). Images are only
+    drawn with a tile cache (``"tiles"`` in the context).
+    """
+    cache = (context or {}).get("tiles")
+    if cache is None or image.get_array() is None or not image.get_visible():
+        return []
+    pyramid = cache.pyramid(image)
+    if not image.norm.scaled():
+        image.autoscale_None()
+
+    rows, cols = pyramid.shape
+    x0, x1, y0, y1 = image.get_extent()
+    if image.origin == "upper":
+        # The first row is at the top of the extent
+        y0, y1 = y1, y0
+    (cx0, cy0), (cx1, cy1) = transform.transform([(x0, y0), (x1, y1)])
+    cy0, cy1 = flip_y(cy0, canvas), flip_y(cy1, canvas)
+    # Canvas pixels per image pixel, negative if the image is drawn flipped
+    sx, sy = (cx1 - cx0) / cols, (cy1 - cy0) / rows
+    if not (np.isfinite(sx) and np.isfinite(sy) and sx and sy):
+        return []
+    xmin, ymin, xmax, ymax = pixel_bounds(transform, limits, canvas)
+    level = pyramid.choose_level(1 / max(abs(sx), abs(sy)))
+    budget = (context or {}).get("max_points")
+    if budget is not None:
+        # Progressive rendering first draws coarser levels, of at most about
+        # "max_points" visible pixels
+        pixels = min(rows * cols, (xmax - xmin) * (ymax - ymin) / abs(sx * sy))
+        while level < pyramid.nlevels - 1 and pixels / 4**level > budget:
+            level += 1
+    nrows, ncols = pyramid.level_shape(level)
+    tile_size = pyramid.tile_size
+    # Pixels of the full-resolution image per tile
+    span = tile_size << level
+
+    # Range of visible tiles
+    col_edges = sorted(((xmin - cx0) / sx / span, (xmax - cx0) / sx / span))
+    row_edges = sorted(((ymin - cy0) / sy / span, (ymax - cy0) / sy / span))
+    first_col = max(int(np.floor(col_edges[0])), 0)
+    last_col = min(int(np.ceil(col_edges[1])), -(-ncols // tile_size))
+    first_row = max(int(np.floor(row_edges[0])), 0)
+    last_row = min(int(np.ceil(row_edges[1])), -(-nrows // tile_size))
+    if first_col >= last_col or first_row >= last_row:
+        return []
+    row, col = np.meshgrid(
+        np.arange(first_row, last_row), np.arange(first_col, last_col), indexing="ij"
+    )
+    row, col = row.ravel(), col.ravel()
+
+    # Tile edges in canvas pixels, rounded so that neighbouring tiles do not leave
+    # seams between them
+    # Tiles at the edges are smaller
+    width = np.minimum(ncols - col * tile_size, tile_size) << level
+    height = np.minimum(nrows - row * tile_size, tile_size) << level
+    x = np.round(cx0 + col * span * sx)
+    y = np.round(cy0 + row * span * sy)
+    x_end = np.round(cx0 + (col * span + width) * sx)
+    y_end = np.round(cy0 + (row * span + height) * sy)
+    norm = image.norm
+    item = {
+        "kind": "image",
+        "image": image,
+        "pyramid": pyramid,
+        "cache": cache,
+        "keys": np.column_stack([np.full(len(row), level), row, col]),
+        "x": np.minimum(x, x_end),
+        "y": np.minimum(y, y_end),
+        "width": np.abs(x_end - x),
+        "height": np.abs(y_end - y),
+        "flip": (bool(sx < 0), bool(sy < 0)),
+        "colormap": (
+            id(image.cmap),
+            id(norm),
+            norm.vmin,
+            norm.vmax,
+            image.get_alpha(),
+        ),
+        # Magnified pixels are drawn as squares, like matplotlib does
+        "smoothing": bool(abs(sx) * (1 << level) < 1)
+        or image.get_interpolation() not in NEAREST_INTERPOLATIONS,
+        # The last pixels of coarse levels extend past the image, whose
+        # extent clips the tiles
+        "extent": (
+            min(cx0, cx1),
+            min(cy0, cy1),
+            max(cx0, cx1),
+            max(cy0, cy1),
+        ),
+    }
+    # The tiles which are not in the browser yet are colormapped here, in the
+    # rendering threads, rather than when they are sent
+    for key in item["keys"].tolist():
+        if tile_key(item, *key) not in cache:
+            cache.stage(tile_key(item, *key), tile_rgba(item, *key))
+    return [item]
+
+
+def tile_key(item, level, row, col):
+    """Key of a tile of a prepared image in its tile cache"""
+    return (id(item["pyramid"]), level, row, col, item["flip"], item["colormap"])
+
+
+def tile_rgba(item, level, row, col):
+    """The colormapped pixels of a tile of a prepared image, oriented as drawn"""
+    rgba = item["image"].to_rgba(item["pyramid"].tile(level, row, col), bytes=True)
+    flipped_x, flipped_y = item["flip"]
+    if flipped_x:
+        rgba = rgba[:, ::-1]
+    if flipped_y:
+        rgba = rgba[::-1]
+    return np.ascontiguousarray(rgba)
+
+
+def emit_image(item, canvas):
+    """
+    Draw the tiles of an image from their offscreen canvases, sending the tiles
+    which are not in the browser yet
+    """
+    cache = item["cache"]
+    x0, y0, x1, y1 = item["extent"]
+    canvas.save()
+    canvas.begin_path()
+    canvas.rect(x0, y0, x1 - x0, y1 - y0)
+    canvas.clip()
+    canvas.image_smoothing_enabled = item["smoothing"]
+    for (level, row, col), x, y, width, height in zip(
+        item["keys"].tolist(),
+        item["x"],
+        item["y"],
+        item["width"],
+        item["height"],
+        strict=True,
+    ):
+        key = tile_key(item, level, row, col)
+        tile = cache.get(key)
+        if tile is None:
+            rgba = cache.staged(key)
+            if rgba is None:
+                # Staged tiles may have been discarded since the preparation
+                rgba = tile_rgba(item, level, row, col)
+            tile = cache.add(key, rgba)
+        canvas.draw_image(tile, x, y, width, height)
+    canvas.restore()
+
+
+def axis_ticks(axis, labels=True):
+    """
+    Locations and labels of the major ticks of an axis. Formatting the labels can
+    be skipped with ``labels=False``, in which case they are empty.
+    """
+    if not labels:
+        locs = axis.get_majorticklocs()
+        return locs, [""] * len(locs)
+    return axis.get_majorticklocs(), [
+        lab.get_text() for lab in axis.get_majorticklabels()
+    ]
+
+
+def prepare_ticks_and_labels(ax, canvas, offset, ticks=None, text=True):
+    """
+    ``ticks`` can give precomputed ``axis_ticks`` for the ``"x"`` and ``"y"`` axes,
+    e.g. to compute them once for a group of shared axes. Without ``text``, only
+    the ticks are drawn, without labels.
+    """
+    trans_data = ax.transData + offset
+    trans_axes = ax.transAxes + offset
+    (xmin, xmax), (ymin, ymax) = ax.get_xlim(), ax.get_ylim()
+    ticks = ticks or {}
+
+    # X axis ticks and labels (bottom)
+    xticks, xlabels = ticks.get("x") or axis_ticks(ax.xaxis, labels=text)
+    inside = (xticks >= min(xmin, xmax)) & (xticks <= max(xmin, xmax))
+    x, y = trans_data.transform(np.column_stack([xticks, np.full_like(xticks, ymin)])).T
+    xticks = [(x[i], flip_y(y[i], canvas), xlabels[i]) for i in np.flatnonzero(inside)]
+
+    # Y axis ticks and labels (left)
+    yticks, ylabels = ticks.get("y") or axis_ticks(ax.yaxis, labels=text)
+    inside = (yticks >= min(ymin, ymax)) & (yticks <= max(ymin, ymax))
+    x, y = trans_data.transform(np.column_stack([np.full_like(yticks, xmin), yticks])).T
+    yticks = [(x[i], flip_y(y[i], canvas), ylabels[i]) for i in np.flatnonzero(inside)]
+
+    xlabel = ax.xaxis.get_label()
+    ylabel = ax.yaxis.get_label()
+    xtext = xlabel.get_text() if text else ""
+    ytext = ylabel.get_text() if text else ""
+    prepared = {"xticks": xticks, "yticks": yticks, "xlabel": None, "ylabel": None}
+    if xtext:
+        x, y = trans_axes.transform(xlabel.get_position())
+        prepared["xlabel"] = (xtext, x, canvas.height)
+    if ytext:
+        x, y = trans_axes.transform(ylabel.get_position())
+        prepared["ylabel"] = (ytext, flip_y(y, canvas))
+    return prepared
+
+
+def emit_ticks_and_labels(prepared, canvas):
     # Draw ticks and labels on all sides
-    tick_length = 6
-    label_offset = 3
-    font_size = 12
-    canvas.font = f"{font_size}px sans-serif"
+    canvas.font = f"{FONT_SIZE}px sans-serif"
     canvas.fill_style = "black"
+    canvas.stroke_style = "black"
     canvas.text_align = "center"
     canvas.text_baseline = "top"
-
-    # transform = ax.transData.transform
-
-    # X axis ticks and labels (bottom)
-    (xmin, xmax), (ymin, ymax) = ax.get_xlim(), ax.get_ylim()
-    xticks = ax.get_xticks()
-    xlabels = [lab.get_text() for lab in ax.get_xticklabels()]
-    for tick, label in zip(xticks, xlabels, strict=True):
-        if tick < xmin or tick > xmax:
-            continue
-        x, y = ax.transData.transform((tick, ymin))
-        y = flip_y(y, canvas)
+    for x, y, label in prepared["xticks"]:
         # Tick
         canvas.begin_path()
         canvas.move_to(x, y)
-        canvas.line_to(x, y - tick_length)
+        canvas.line_to(x, y - TICK_LENGTH)
         canvas.stroke()
         # Label
-        canvas.fill_text(label, x, y + tick_length + label_offset)
+        if label:
+            canvas.fill_text(label, x, y + TICK_LENGTH + LABEL_OFFSET)
 
-    # Y axis ticks and labels (left)
     canvas.text_align = "right"
     canvas.text_baseline = "middle"
-    yticks = ax.get_yticks()
-    ylabels = [lab.get_text() for lab in ax.get_yticklabels()]
-    # xmin = ax.get_xlim()[0]
-    for tick, label in zip(yticks, ylabels, strict=True):
-        if tick < ymin or tick > ymax:
-            continue
-        x, y = ax.transData.transform((xmin, tick))
-        y = flip_y(y, canvas)
+    for x, y, label in prepared["yticks"]:
         # Tick
         canvas.begin_path()
         canvas.move_to(x, y)
-        canvas.line_to(x - tick_length, y)
+        canvas.line_to(x - TICK_LENGTH, y)
         canvas.stroke()
         # Label
-        canvas.fill_text(label, x - tick_length - label_offset, y)
+        if label:
+            canvas.fill_text(label, x - TICK_LENGTH - LABEL_OFFSET, y)
 
-    xlabel = ax.xaxis.get_label()
-    ylabel = ax.yaxis.get_label()
-    xtext = xlabel.get_text()
-    ytext = ylabel.get_text()
     canvas.text_align = "center"
     canvas.text_baseline = "bottom"
-    if xtext:
-        x, y = ax.transAxes.transform(xlabel.get_position())
-        canvas.fill_text(xtext, x, canvas.height)
+    if prepared["xlabel"] is not None:
+        canvas.fill_text(*prepared["xlabel"])
     canvas.text_baseline = "top"
-    if ytext:
-        x, y = ax.transAxes.transform(ylabel.get_position())
-        y = flip_y(y, canvas)
+    if prepared["ylabel"] is not None:
+        text, y = prepared["ylabel"]
         # Need to rotate the text 90 degrees for y label
         canvas.save()
         canvas.translate(0, y)
         canvas.rotate(-np.pi / 2)
-        canvas.fill_text(ytext, 0, 0)
+        canvas.fill_text(text, 0, 0)
         canvas.restore()
-        # canvas.fill_text(ytext, x, y)
 
 
-def draw_axes(ax, canvas):
-    # Draw frame
+def data_artists(ax):
+    """The artists of an axes drawn by ``prepare_artists``"""
+    stores = [artist for artist in ax.artists if isinstance(artist, SeriesStore)]
+    return [*ax.images, *ax.patches, *ax.lines, *ax.collections, *stores]
+
+
+# Versions of the artists, unique across all the artists
+_VERSIONS = itertools.count()
+
+
+class _VersionCallback:
+    """
+    Stale callback of an artist counting its changes, which calls the callback
+    it replaces (propagating the change to the axes)
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.version = next(_VERSIONS)
+
+    def __call__(self, artist, value):
+        self.version = next(_VERSIONS)
+        if self.callback is not None:
+            self.callback(artist, value)
+
+
+def artist_version(artist) -> int:
+    """
+    Version of an artist, which changes whenever the artist is changed (marked
+    stale). Unlike resetting the ``stale`` flags, this leaves matplotlib's own
+    state alone. Animated artists do not report their changes, so they get a
+    new version each time.
+    """
+    if artist.get_animated():
+        return next(_VERSIONS)
+    callback = artist.stale_callback
+    if not isinstance(callback, _VersionCallback):
+        callback = artist.stale_callback = _VersionCallback(callback)
+    return callback.version
+
+
+def artists_key(children):
+    """Cache key of the state of several artists"""
+    return [(id(child), artist_version(child)) for child in children]
+
+
+def prepare_artists(ax, offset, canvas, limits, context=None, children=None):
+    """
+    Prepare the data artists of an axes, within the given data limits.
+    ``children`` selects which of the artists to prepare (all of them by default).
+    """
+    trans_data = ax.transData + offset
+    images, patches = ax.images, ax.patches
+    others = [*ax.lines, *ax.collections]
+    others += [artist for artist in ax.artists if isinstance(artist, SeriesStore)]
+    if children is not None:
+        ids = {id(child) for child in children}
+        images = [image for image in images if id(image) in ids]
+        patches = [patch for patch in patches if id(patch) in ids]
+        others = [artist for artist in others if id(artist) in ids]
+    # Images are drawn below everything else, and patches are batched together,
+    # so they are drawn below the other artists
+    artists = []
+    for image in sorted(images, key=lambda a: a.get_zorder()):
+        artists += prepare_image(image, trans_data, canvas, limits, context)
+    artists += prepare_patches(patches, ax, offset, canvas, limits, context)
+    # Draw in the same order as matplotlib
+    for artist in sorted(others, key=lambda a: a.get_zorder()):
+        if isinstance(artist, SeriesStore):
+            prepare = prepare_store
+        elif isinstance(artist, LineCollection):
+            prepare = prepare_line_collection
+        elif isinstance(artist, PolyCollection):
+            prepare = prepare_poly_collection
+        elif isinstance(artist, Collection):
+            prepare = prepare_collection
+        else:
+            prepare = prepare_line
+        artists += prepare(artist, trans_data, canvas, limits=limits, context=context)
+    if not quality(context, "antialiased"):
+        # Lines through pixel centers are drawn crisp
+        for item in artists:
+            if item["kind"] == "lines":
+                item["points"] = np.floor(item["points"]) + 0.5
+    # Lines with compatible styles are drawn in a single batch
+    return merge_lines(artists)
+
+
+def prepare_static(ax, offset, canvas, limits, frame, static, context=None):
+    """
+    Prepare the static artists of an axes (whose ids are in ``static["ids"]``).
+    They are drawn once into an offscreen canvas, which is composited onto the
+    axes by later draws. Returns ``None`` if the offscreen canvas is still up to
+    date, i.e. if neither the view nor the static artists changed.
+    """
+    children = [child for child in data_artists(ax) if id(child) in static["ids"]]
+    key = (
+        tuple(limits.values()),
+        frame,
+        (canvas.width, canvas.height),
+        static.get("position", (0, 0)),
+        (ax.get_xscale(), ax.get_yscale()),
+        artists_key(children),
+        (context or {}).get("quality"),
+    )
+    if key == static.get("key"):
+        return None
+    artists = prepare_artists(ax, offset, canvas, limits, context, children=children)
+    static["key"] = key
+    return artists
+
+
+def widen_limits(limits, factor):
+    """Extend data limits by ``factor`` times their span on every side"""
+    dx = (limits['xmax'] - limits['xmin']) * factor
+    dy = (limits['ymax'] - limits['ymin']) * factor
+    return {
+        'xmin': limits['xmin'] - dx,
+        'xmax': limits['xmax'] + dx,
+        'ymin': limits['ymin'] - dy,
+        'ymax': limits['ymax'] + dy,
+    }
+
+
+def translate_artists(ax, transform, canvas, frame, pan):
+    """
+    Reuse the artists prepared in a previous frame of a pan, if the data-to-pixel
+    mapping only changed by a translation, and the new view is within the area
+    which was prepared. Returns ``None`` if the artists need to be prepared again.
+    """
+    if "matrix" not in pan:
+        return None
+    if pan["size"] != (canvas.width, canvas.height):
+        return None
+    if artists_key(data_artists(ax)) != pan["children"]:
+        return None
+    matrix = transform.get_matrix()
+    if not np.allclose(matrix[:2, :2], pan["matrix"][:2, :2]):
+        return None
+    # Canvas y axis points down
+    dx = matrix[0, 2] - pan["matrix"][0, 2]
+    dy = pan["matrix"][1, 2] - matrix[1, 2]
+
+    left, top, width, height = frame
+    xmin, ymin, xmax, ymax = pan["bounds"]
+    if left - dx < xmin or top - dy < ymin:
+        return None
+    if left + width - dx > xmax or top + height - dy > ymax:
+        return None
+    view = (left, top, left + width, top + height)
+    # Scratch arrays reused by every frame of the pan
+    buffers = pan.setdefault("buffers", BufferPool())
+    items = [
+        translate_item(item, dx, dy, view, buffers, key)
+        for key, item in enumerate(pan["artists"])
+    ]
+    return [item for item in items if item is not None]
+
+
+def translate_item(item, dx, dy, view, buffers=None, key=None):
+    """
+    Shift a prepared artist by a pixel offset, and cull what is outside of the
+    ``(xmin, ymin, xmax, ymax)`` view. Lines and polygons are only shifted, the
+    canvas clipping takes care of them.
+
+    The shifted arrays are written into the ``buffers`` pool (under ``key``), so
+    that the frames of a pan do not allocate memory.
+    """
+
+    def buffer(name, shape, dtype=float):
+        if buffers is None:
+            return np.empty(shape, dtype=dtype)
+        return buffers.get((key, name), shape, dtype)
+
+    def kept(name, values):
+        values = np.asarray(values)
+        shape = (count, *values.shape[1:])
+        return np.take(
+            values, kept_indices, axis=0, out=buffer(name, shape, values.dtype)
+        )
+
+    item = dict(item)
+    if "extent" in item:
+        x0, y0, x1, y1 = item["extent"]
+        item["extent"] = (x0 + dx, y0 + dy, x1 + dx, y1 + dy)
+    if "points" in item:
+        points = item["points"]
+        item["points"] = np.add(points, (dx, dy), out=buffer("points", points.shape))
+    if "x" not in item:
+        return item
+    n = len(item["x"])
+    x = np.add(item["x"], dx, out=buffer("x", n))
+    y = np.add(item["y"], dy, out=buffer("y", n))
+    mask, tmp = buffer("mask", n, bool), buffer("tmp", n, bool)
+    if item["kind"] in ("rects", "image"):
+        edge = buffer("edge", n)
+        np.greater_equal(np.add(x, item["width"], out=edge), view[0], out=mask)
+        mask &= np.less_equal(x, view[2], out=tmp)
+        mask &= np.greater_equal(np.add(y, item["height"], out=edge), view[1], out=tmp)
+        mask &= np.less_equal(y, view[3], out=tmp)
+    else:
+        in_bounds(x, y, view, margin=np.max(item["size"]), out=mask, tmp=tmp)
+    # The indices of the kept points are the only array allocated per frame, numpy
+    # has no way to compute them in place
+    kept_indices = np.flatnonzero(mask)
+    count = len(kept_indices)
+    if count == 0:
+        return None
+    if item["kind"] in ("rects", "image"):
+        item["width"], item["height"] = (
+            kept("width", item["width"]),
+            kept("height", item["height"]),
+        )
+        if "keys" in item:
+            item["keys"] = kept("keys", item["keys"])
+    else:
+        # Per-point values
+        for name in ("size", "colors", "alpha"):
+            if np.ndim(item.get(name)) > 0:
+                item[name] = kept(name, item[name])
+        if "points" in item:
+            # Stamped markers have the same number of vertices and polygons each
+            item["points"] = kept(
+                "kept_points", item["points"].reshape(n, -1, 2)
+            ).reshape(-1, 2)
+            item["counts"] = kept("counts", item["counts"].reshape(n, -1)).ravel()
+    item["x"], item["y"] = kept("kept_x", x), kept("kept_y", y)
+    return item
+
+
+def prepare_axes(ax, canvas, origin=(0.0, 0.0), context=None):
+    """
+    Compute everything needed to draw an axes into a canvas, without sending any
+    commands to the canvas.
+
+    ``origin`` is the position, in matplotlib display coordinates (bottom-left
+    origin), of the bottom-left corner of the canvas within the figure. This allows
+    drawing into a canvas that only covers the bounding box of the axes.
+
+    ``context`` holds the rendering state of the figure, such as the
+    level-of-detail pyramids of its lines (``"lods": {line_id: lod}``), or the
+    maximum number of points to draw per artist (``"max_points"``). During a pan,
+    ``"pan"`` is a dict in which the prepared artists are kept from frame to frame.
+    ``"ticks"`` holds the ticks of shared axes, computed once per group.
+    ``"static"`` holds the state of the offscreen canvas of static artists, and its
+    ``"position"`` in ``canvas``.
+    ``"tiles"`` holds the image pyramids and the tiles sent to the browser.
+    ``"buffers"`` is the pool of scratch arrays (see ``buffers.BufferPool``).
+
+    Outside of a pan, the result has a ``"key"`` which is the same for artists
+    prepared from the same state (of the artists, view and context), and a
+    ``"static_key"`` for the static artists (see ``diffing``).
+    """
+    offset = Affine2D().translate(-origin[0], -origin[1])
+    trans_data = ax.transData + offset
 
     # Apparently need to ask the axis limits for them to be set correctly
     xmin, xmax = ax.get_xlim()
     ymin, ymax = ax.get_ylim()
-    (xmin_disp, ymin_disp), (xmax_disp, ymax_disp) = ax.transData.transform(
+    (xmin_disp, ymin_disp), (xmax_disp, ymax_disp) = trans_data.transform(
         ((xmin, ymin), (xmax, ymax))
     )
-    width = xmax_disp - xmin_disp
-    height = ymax_disp - ymin_disp
+    # Axes rectangle in canvas coordinates (top-left origin)
+    frame = (
+        min(xmin_disp, xmax_disp),
+        flip_y(max(ymin_disp, ymax_disp), canvas),
+        abs(xmax_disp - xmin_disp),
+        abs(ymax_disp - ymin_disp),
+    )
 
     limits = {'xmin': xmin, 'xmax': xmax, 'ymin': ymin, 'ymax': ymax}
 
-    # (xmin_disp, ymin_disp), (xmax_disp, ymax_disp) = ax.transData.transform(
-    #     ((xmin, ymin), (xmax, ymax))
-    # )
-    # width = xmax_disp - xmin_disp
-    # height = ymax_disp - ymin_disp
-    # print(f"Drawing axes at {xmin_disp},{ymin_disp} size {width}x{height}")
+    result = {"frame": frame}
+    pan = (context or {}).get("pan")
+    static = (context or {}).get("static")
+    # Panning only translates the view with linear scales
+    if pan is None or not trans_data.is_affine:
+        children = None
+        result["key"] = (
+            artists_key(data_artists(ax)),
+            tuple(limits.values()),
+            frame,
+            (canvas.width, canvas.height),
+            (ax.get_xscale(), ax.get_yscale()),
+            [
+                (context or {}).get(name)
+                for name in ("quality", "max_points", "lod_points")
+            ],
+            None if static is None else sorted(static["ids"]),
+        )
+        if static is not None:
+            result["static"] = prepare_static(
+                ax, offset, canvas, limits, frame, static, context
+            )
+            result["static_key"] = static["key"]
+            result["static_position"] = static.get("position", (0, 0))
+            children = [
+                child for child in data_artists(ax) if id(child) not in static["ids"]
+            ]
+        artists = prepare_artists(ax, offset, canvas, limits, context, children)
+    else:
+        artists = translate_artists(ax, trans_data, canvas, frame, pan)
+        if artists is None:
+            # Prepare an area larger than the view, so that the next frames of the
+            # pan only need to translate the result
+            limits = widen_limits(limits, PAN_OVERSCAN)
+            lod_points = int(
+                quality(context, "lod_points_per_pixel")
+                * canvas.width
+                * (1 + 2 * PAN_OVERSCAN)
+            )
+            context = {**context, "lod_points": lod_points}
+            artists = prepare_artists(ax, offset, canvas, limits, context)
+            pan.update(
+                matrix=trans_data.get_matrix().copy(),
+                bounds=pixel_bounds(trans_data, limits, canvas),
+                size=(canvas.width, canvas.height),
+                children=artists_key(data_artists(ax)),
+                artists=artists,
+            )
+            # Only send what is within the view
+            artists = translate_artists(ax, trans_data, canvas, frame, pan)
 
-    # Set clipping region to axes area
+    result["artists"] = artists
+    result["ticks"] = prepare_ticks_and_labels(
+        ax,
+        canvas,
+        offset,
+        ticks=(context or {}).get("ticks"),
+        text=quality(context, "text"),
+    )
+    return result
+
+
+_EMITTERS = {
+    "lines": emit_lines,
+    "markers": emit_markers,
+    "rects": emit_rects,
+    "polygons": emit_polygons,
+    "collection": emit_collection,
+    "image": emit_image,
+}
+
+
+def emit_static(prepared, canvas):
+    """Draw the static artists of a prepared axes into their offscreen canvas"""
+    x, y = prepared["static_position"]
+    canvas.clear()
     canvas.save()
+    # The offscreen canvas covers the target canvas from (x, y)
+    canvas.translate(-x, -y)
     canvas.begin_path()
-    canvas.rect(xmin_disp, ymin_disp, width, height)
+    canvas.rect(*prepared["frame"])
     canvas.clip()
+    for item in prepared["static"]:
+        _EMITTERS[item["kind"]](item, canvas)
+    canvas.restore()
 
-    # Draw all line artists
-    for line in ax.lines:
-        draw_line(line, ax, canvas, limits=limits)
 
-    # Draw all collections
-    for collection in ax.collections:
-        draw_collection(collection, ax, canvas, limits=limits)
+def emit_axes(prepared, canvas, static_canvas=None, skip=()):
+    """
+    Send the canvas commands for an axes prepared with ``prepare_axes``.
 
-    # # Draw frame
-    # xmin, xmax = ax.get_xlim()
-    # ymin, ymax = ax.get_ylim()
-    (xmin_disp, ymin_disp), (xmax_disp, ymax_disp) = ax.transData.transform(
-        ((xmin, ymin), (xmax, ymax))
-    )
-    width = xmax_disp - xmin_disp
-    height = ymax_disp - ymin_disp
-    # print(f"Drawing axes at {xmin_disp},{ymin_disp} size {width}x{height}")
+    ``static_canvas`` is the offscreen canvas holding the static artists of the
+    axes, if it has any. It covers ``canvas`` from ``prepared["static_position"]``.
 
-    canvas.stroke_style = "black"
-    canvas.line_width = 1.0
-    canvas.stroke_rect(xmin_disp, ymin_disp, width, height)
+    ``skip`` holds the blocks of commands not to send (see ``diffing``): "static",
+    the indices of prepared artists, "frame" and "ticks".
+    """
+    # Set clipping region to axes area
+    canvas.save()
+    canvas.begin_path()
+    canvas.rect(*prepared["frame"])
+    canvas.clip()
+
+    # Static artists are drawn below the others, from their offscreen canvas
+    if "static" in prepared and "static" not in skip:
+        if prepared["static"] is not None:
+            emit_static(prepared, static_canvas)
+        canvas.draw_image(static_canvas, *prepared["static_position"])
+
+    # Draw all artists
+    for index, item in enumerate(prepared["artists"]):
+        if index not in skip:
+            _EMITTERS[item["kind"]](item, canvas)
+
+    # Draw frame
+    if "frame" not in skip:
+        canvas.stroke_style = "black"
+        canvas.line_width = 1.0
+        canvas.stroke_rect(*prepared["frame"])
 
     # Restore canvas state (remove clipping)
     canvas.restore()
 
     # Draw ticks and labels
-    draw_ticks_and_labels(ax, canvas)
+    if "ticks" not in skip:
+        emit_ticks_and_labels(prepared["ticks"], canvas)
+
+
+def draw_axes(ax, canvas, origin=(0.0, 0.0), context=None):
+    """
+    Draw an axes into a canvas.
+
+    See ``prepare_axes`` for the meaning of ``origin`` and ``context``.
+    """
+    emit_axes(prepare_axes(ax, canvas, origin=origin, context=context), canvas)
@@ -0,0 +1,184 @@
+# mplcanvas/selection.py
+"""
+Linked brushing: selecting points in one scatter plot highlights the same rows of
+the dataset in every other plot of it.
+
+Usage:
+    fig, (ax1, ax2) = plt.subplots(1, 2)
+    s1 = ax1.scatter(df.a, df.b)
+    s2 = ax2.scatter(df.c, df.d)
+    brush = fig.link_brushing(s1, s2)
+
+Then draw a lasso around points with the select tool of the toolbar. The
+selection is ``brush.mask``, a boolean array with one value per row.
+
+Selections work at the resolution of the screen: the points of each collection are
+indexed by the canvas pixel containing them (see ``PixelIndex``), and the lasso is
+rasterized. Selecting is then a lookup per point, whatever the shape of the
+lasso, and highlighting needs one marker per covered pixel.
+"""
+
+import numpy as np
+from matplotlib.colors import to_hex
+
+
+def rasterize_polygon(polygon, shape):
+    """
+    Mask of the pixels of a ``(rows, cols)`` grid whose centers are inside of a
+    polygon (with vertices in pixel coordinates), using the even-odd rule
+    """
+    rows, cols = shape
+    x0, y0 = polygon[:, 0], polygon[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    centers = np.arange(rows)[:, None] + 0.5
+    # Edges crossing the horizontal line through the centers of each row
+    crossing = (centers >= np.minimum(y0, y1)) & (centers < np.maximum(y0, y1))
+    row, edge = np.nonzero(crossing)
+    t = (centers[row, 0] - y0[edge]) / (y1[edge] - y0[edge])
+    x = x0[edge] + t * (x1[edge] - x0[edge])
+    # Each crossing flips the inside/outside state of the pixels on its right
+    flips = np.zeros((rows, cols + 1), dtype=np.int32)
+    np.add.at(flips, (row, np.clip(np.ceil(x - 0.5), 0, cols).astype(int)), 1)
+    return (np.cumsum(flips[:, :cols], axis=1) % 2).astype(bool)
+
+
+class PixelIndex:
+    """
+    Spatial index of the points of a scatter collection in the current view: the
+    flat index ``row * width + col`` of the canvas pixel containing each point, or
+    ``-1`` for the points outside of the axes.
+    """
+
+    def __init__(self, collection, canvas):
+        ax = collection.axes
+        self.width, self.height = canvas.width, canvas.height
+        x, y = ax.transData.transform(np.asarray(collection.get_offsets())).T
+        # Canvas y axis points down
+        y = self.height - y
+        left, bottom, width, height = ax.bbox.bounds
+        top = self.height - bottom - height
+        inside = (x >= max(left, 0)) & (x < min(left + width, self.width))
+        inside &= (y >= max(top, 0)) & (y < min(top + height, self.height))
+        col, row = x[inside].astype(np.int32), y[inside].astype(np.int32)
+        self.cells = np.full(len(x), -1, dtype=np.int32)
+        self.cells[inside] = row * self.width + col
+
+    def contains(self, polygon):
+        """
+        Mask of the points inside of a polygon (with vertices in canvas pixels).
+        The test is exact up to the pixel.
+        """
+        # Points outside of the axes (-1) find the last element, which is False
+        grid = np.zeros(self.height * self.width + 1, dtype=bool)
+        x0, y0 = np.clip(np.floor(polygon.min(axis=0)).astype(int), 0, None)
+        x1, y1 = np.ceil(polygon.max(axis=0)).astype(int) + 1
+        x1, y1 = min(x1, self.width), min(y1, self.height)
+        if x1 > x0 and y1 > y0:
+            pixels = grid[:-1].reshape(self.height, self.width)
+            pixels[y0:y1, x0:x1] = rasterize_polygon(
+                polygon - (x0, y0), (y1 - y0, x1 - x0)
+            )
+        return grid[self.cells]
+
+    def covered(self, mask):
+        """Centers of the pixels containing at least one of the points of ``mask``"""
+        covered = np.zeros(self.height * self.width + 1, dtype=bool)
+        covered[self.cells.compress(mask)] = True
+        row, col = np.divmod(np.flatnonzero(covered[:-1]), self.width)
+        return col + 0.5, row + 0.5
+
+    def centers(self, mask):
+        """
+        Centers of the pixels containing each of the points of ``mask``, and the
+        mask of the points of ``mask`` which are in the axes
+        """
+        cells = self.cells.compress(mask)
+        visible = cells >= 0
+        row, col = np.divmod(cells[visible], self.width)
+        return col + 0.5, row + 0.5, visible
+
+
+class LinkedBrush:
+    """
+    A dataset drawn by several scatter collections, with one point per row of the
+    dataset in each of them. The selection is a boolean ``mask`` over the rows, and
+    the selected points are highlighted with ``color`` in every collection.
+    """
+
+    def __init__(self, collections, color="red"):
+        self.collections = list(collections)
+        sizes = {len(collection.get_offsets()) for collection in self.collections}
+        if len(sizes) != 1:
+            raise ValueError("Linked collections must have the same number of points.")
+        self.mask = np.zeros(sizes.pop(), dtype=bool)
+        self.color = color
+        # {collection_id: {"offsets": offsets, "view": view, "index": index}}
+        self._indexes = {}
+
+    def index(self, collection, canvas) -> PixelIndex:
+        """
+        The pixel index of a collection, built again if its points, its view, or
+        the canvas size changed
+        """
+        ax = collection.axes
+        offsets = collection.get_offsets()
+        view = (
+            ax.get_xlim(),
+            ax.get_ylim(),
+            ax.get_xscale(),
+            ax.get_yscale(),
+            ax.bbox.bounds,
+            (canvas.width, canvas.height),
+        )
+        entry = self._indexes.get(id(collection))
+        if entry is None or entry["offsets"] is not offsets or entry["view"] != view:
+            entry = {
+                "offsets": offsets,
+                "view": view,
+                "index": PixelIndex(collection, canvas),
+            }
+            self._indexes[id(collection)] = entry
+        return entry["index"]
+
+    def select(self, collection, polygon, canvas):
+        """
+        Select the rows whose points of ``collection`` are inside of a polygon, with
+        vertices in canvas pixels. Fewer than 3 vertices clear the selection.
+        """
+        polygon = np.asarray(polygon, dtype=float).reshape(-1, 2)
+        if len(polygon) < 3:
+            self.mask[:] = False
+        else:
+            self.mask[:] = self.index(collection, canvas).contains(polygon)
+        return self.mask
+
+    def prepare_highlight(self, collection, canvas):
+        """
+        Prepare the markers highlighting the selected points of a collection, in
+        the format of ``render.prepare_collection``
+        """
+        if not self.mask.any() or not collection.get_visible():
+            return []
+        index = self.index(collection, canvas)
+        size = collection.get_sizes() ** 0.5
+        if len(size) == 1:
+            # All the markers look the same, so one marker per pixel is enough
+            x, y = index.covered(self.mask)
+            size = size[0]
+        else:
+            x, y, visible = index.centers(self.mask)
+            size = size[np.flatnonzero(self.mask) % len(size)][visible]
+        if len(x) == 0:
+            return []
+        return [
+            {
+                "kind": "collection",
+                "x": x,
+                "y": y,
+                "size": size,
+                # Square markers have 5 vertices
+                "marker": "s" if len(collection.get_paths()[0].vertices) == 5 else "o",
+                "fill": to_hex(self.color, keep_alpha=True),
+                "stroke": None,
+            }
+        ]
@@ -0,0 +1,280 @@
+# mplcanvas/store.py
+"""
+Compact storage for many line and scatter series.
+
+Each ``plot`` or ``scatter`` call of matplotlib creates a full artist, with its
+property machinery, path caches and callbacks. With tens of thousands of series
+(e.g. one trace per channel), that overhead dominates creation time and memory.
+A ``SeriesStore`` is a single artist holding any number of series in columns
+(data arrays, bounds, style and visibility of each series), with the styles in a
+shared table. It is drawn directly by ``render.prepare_store``, in one batch per
+line width or marker style.
+
+Usage:
+    store = series_store(ax)
+    for y in channels:
+        store.plot(x, y, color="C0", linewidth=0.5)
+    line = store.plot(x, y2)
+    line.set_ydata(y3)
+
+Only the common subset of the ``plot``/``scatter`` API is supported: single
+colors, solid lines, and circle or square markers.
+"""
+
+import matplotlib as mpl
+import numpy as np
+from matplotlib.artist import Artist
+from matplotlib.colors import to_rgba
+
+
+class Series:
+    """
+    Handle on a series of a ``SeriesStore``, with the data accessors of ``Line2D``
+    (for lines) and ``PathCollection`` (for scatter series)
+    """
+
+    __slots__ = ("_index", "_store")
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    @property
+    def axes(self):
+        return self._store.axes
+
+    def get_xdata(self):
+        return self._store.xs[self._index]
+
+    def get_ydata(self):
+        return self._store.ys[self._index]
+
+    def get_data(self):
+        return self.get_xdata(), self.get_ydata()
+
+    def set_data(self, *args):
+        """Set the x and y data, given as ``(x, y)`` or as one (2, n) array"""
+        x, y = args if len(args) == 2 else args[0]
+        self._store._set_data(self._index, x, y)
+
+    def set_xdata(self, x):
+        self._store._set_data(self._index, x, self.get_ydata())
+
+    def set_ydata(self, y):
+        self._store._set_data(self._index, self.get_xdata(), y)
+
+    def get_offsets(self):
+        return np.column_stack(self.get_data())
+
+    def set_offsets(self, offsets):
+        offsets = np.asarray(offsets, dtype=float).reshape(-1, 2)
+        self._store._set_data(self._index, offsets[:, 0], offsets[:, 1])
+
+    def get_color(self):
+        return self._store.styles[self._store.series_styles[self._index]]["color"]
+
+    def set_color(self, color):
+        store = self._store
+        style = dict(
+            store.styles[store.series_styles[self._index]], color=to_rgba(color)
+        )
+        store.series_styles[self._index] = store._add_style(style)
+        store.stale = True
+
+    def get_visible(self):
+        return self._store.shown[self._index]
+
+    def set_visible(self, visible):
+        self._store.shown[self._index] = bool(visible)
+        self._store.stale = True
+
+    def remove(self):
+        """
+        Remove the series from its store. Its row is kept, empty and hidden, so
+        that the indices of the other handles stay valid: the store does not
+        shrink when series are removed.
+        """
+        self.set_visible(False)
+        self._store._set_data(self._index, [], [])
+
+
+class SeriesStore(Artist):
+    """
+    A single artist drawing many line and scatter series, stored as columns.
+
+    Use ``series_store(ax)`` to get the store of an axes.
+    """
+
+    zorder = 2
+
+    def __init__(self):
+        super().__init__()
+        # The store takes no room outside of the axes
+        self.set_in_layout(False)
+        # Columns, with one entry per series
+        self.xs = []
+        self.ys = []
+        self.bounds = []  # (xmin, xmax, ymin, ymax)
+        self.kinds = []  # "line" or "scatter"
+        self.series_styles = []  # index in the style table
+        self.shown = []
+        # Style table: {"color", "linewidth"} for lines, {"color", "size",
+        # "marker"} for scatter series
+        self.styles = []
+        self._style_keys = {}
+        # Number of colors taken from each color cycle, without the ones of the
+        # axes (see _next_color)
+        self._colors_taken = {}
+
+    def __len__(self):
+        return len(self.xs)
+
+    def _add_style(self, style):
+        key = tuple(sorted(style.items()))
+        if key not in self._style_keys:
+            self._style_keys[key] = len(self.styles)
+            self.styles.append(style)
+        return self._style_keys[key]
+
+    def _add(self, kind, x, y, style):
+        self.xs.append(None)
+        self.ys.append(None)
+        self.bounds.append(None)
+        self.kinds.append(kind)
+        self.series_styles.append(self._add_style(style))
+        self.shown.append(True)
+        index = len(self.xs) - 1
+        self._set_data(index, x, y)
+        return Series(self, index)
+
+    def _set_data(self, index, x, y):
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        if len(x) != len(y):
+            raise ValueError("x and y must have the same length.")
+        self.xs[index], self.ys[index] = x, y
+        bounds = (np.nan,) * 4
+        finite = np.isfinite(x) & np.isfinite(y)
+        if finite.any():
+            x, y = x[finite], y[finite]
+            bounds = (x.min(), x.max(), y.min(), y.max())
+        self.bounds[index] = bounds
+        self._update_datalim(bounds)
+        self.stale = True
+
+    def _update_datalim(self, bounds):
+        """
+        Extend the data limits of the axes, and request an autoscale. This is much
+        cheaper than ``Axes.update_datalim`` and ``Axes.autoscale_view``, which
+        would dominate the cost of adding a series.
+        """
+        ax = self.axes
+        if ax is None or np.isnan(bounds[0]):
+            return
+        xmin, xmax, ymin, ymax = bounds
+        if ax.ignore_existing_data_limits:
+            points = [[xmin, ymin], [xmax, ymax]]
+        else:
+            (x0, y0), (x1, y1) = ax.dataLim.get_points()
+            points = [
+                [min(x0, xmin), min(y0, ymin)],
+                [max(x1, xmax), max(y1, ymax)],
+            ]
+        ax.dataLim.set_points(np.array(points))
+        ax.ignore_existing_data_limits = False
+        # Autoscaling happens when the limits are needed, as for matplotlib artists
+        # (a private API, so autoscale right away without it)
+        request_autoscale = getattr(ax, "_request_autoscale_view", None)
+        if callable(request_autoscale):
+            request_autoscale()
+        else:
+            ax.autoscale_view()
+
+    def _next_color(self, cycle):
+        """
+        The next color of a color cycle of the axes (``"_get_lines"`` for lines,
+        ``"_get_patches_for_fill"`` for scatter series), so that the series get
+        the same colors as matplotlib artists. These are private APIs: without
+        them, the colors of ``rcParams["axes.prop_cycle"]`` are cycled through.
+        """
+        get_next_color = getattr(
+            getattr(self.axes, cycle, None), "get_next_color", None
+        )
+        if callable(get_next_color):
+            return get_next_color()
+        colors = mpl.rcParams["axes.prop_cycle"].by_key().get("color", ["k"])
+        taken = self._colors_taken.get(cycle, 0)
+        self._colors_taken[cycle] = taken + 1
+        return colors[taken % len(colors)]
+
+    def plot(self, x, y=None, color=None, linewidth=None, **kwargs):
+        """
+        Add a line, like ``Axes.plot(x, y)``. ``lw`` and ``c`` are accepted as
+        aliases. Returns a ``Series`` handle.
+        """
+        if y is None:
+            x, y = np.arange(len(x)), x
+        color = color if color is not None else kwargs.pop("c", None)
+        linewidth = linewidth if linewidth is not None else kwargs.pop("lw", None)
+        kwargs.pop("linestyle", kwargs.pop("ls", None))
+        if kwargs:
+            raise TypeError(f"Unsupported arguments: {', '.join(kwargs)}")
+        if color is None:
+            color = self._next_color("_get_lines")
+        style = {
+            "color": to_rgba(color),
+            "linewidth": float(
+                linewidth if linewidth is not None else mpl.rcParams["lines.linewidth"]
+            ),
+        }
+        return self._add("line", x, y, style)
+
+    def scatter(self, x, y, s=None, c=None, marker="o", color=None, alpha=None):
+        """
+        Add a scatter series with a single color and size, like
+        ``Axes.scatter(x, y)``. Returns a ``Series`` handle.
+        """
+        color = color if color is not None else c
+        if color is None:
+            color = self._next_color("_get_patches_for_fill")
+        if np.ndim(s) > 0:
+            raise ValueError("Scatter series only support a single marker size.")
+        if marker not in ("o", "s"):
+            raise ValueError("Series only support 'o' and 's' markers.")
+        size = s if s is not None else mpl.rcParams["lines.markersize"] ** 2
+        style = {
+            # Arrays of colors are rejected by to_rgba
+            "color": to_rgba(color, alpha),
+            "size": float(size) ** 0.5,
+            "marker": marker,
+        }
+        return self._add("scatter", x, y, style)
+
+    def columns(self):
+        """
+        The per-series columns as arrays: kind, style index, visibility, and
+        bounds ``(n, 4)``
+        """
+        return (
+            np.array(self.kinds),
+            np.array(self.series_styles, dtype=np.int64),
+            np.array(self.shown, dtype=bool),
+            np.array(self.bounds, dtype=float).reshape(-1, 4),
+        )
+
+    def get_tightbbox(self, renderer=None):
+        return None
+
+    def draw(self, renderer):
+        # Drawn by mplcanvas only
+        self.stale = False
+
+
+def series_store(ax) -> SeriesStore:
+    """The series store of an axes, created on first use"""
+    for artist in ax.artists:
+        if isinstance(artist, SeriesStore):
+            return artist
+    store = SeriesStore()
+    ax.add_artist(store)
+    return store
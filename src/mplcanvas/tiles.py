@@ -0,0 +1,228 @@
+# mplcanvas/tiles.py
+"""
+Tiled multi-resolution pyramids for large images.
+
+Level ``k`` of a pyramid is the image downsampled by ``2**k`` (each pixel is the
+mean of 2x2 pixels of level ``k - 1``), cut into tiles of ``TILE_SIZE`` pixels
+squared. Pixel ``i`` of level ``k`` covers the pixels ``i * 2**k`` to
+``(i + 1) * 2**k`` of the image, so the last pixel of a level may extend past the
+image. Drawing an image only needs the visible tiles of the level whose pixels
+are about the size of a screen pixel, so the amount of data sent does not depend
+on the size of the image.
+
+Tiles are uploaded once into offscreen canvases in the browser (see
+``TileCache``), and later frames (e.g. while panning) draw them from there: only
+newly exposed tiles are transferred.
+"""
+
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from ipycanvas import Canvas
+
+from .recording import RecordingCanvas
+
+# Size (in pixels of its level) of the side of a tile
+TILE_SIZE = 256
+# Maximum number of tiles kept in the browser (256 KiB each)
+MAX_CACHED_TILES = 256
+# Number of rows of a level computed at once when reducing the previous level,
+# which bounds the memory used when the levels are memory-mapped
+REDUCE_ROWS = 1024
+
+
+def reduce_image(data, out=None):
+    """
+    Downsample an image (2D, or 3D with color channels) by a factor of 2, by
+    averaging blocks of 2x2 pixels. A trailing odd row or column is repeated, so
+    that the reduced image covers the whole image.
+    """
+    rows, cols = reduced_shape(data.shape[:2])
+    channels = data.shape[2:]
+    if out is None:
+        out = np.empty((rows, cols, *channels), dtype=level_dtype(data.dtype))
+    for start in range(0, rows, REDUCE_ROWS):
+        stop = min(start + REDUCE_ROWS, rows)
+        block = np.asarray(data[2 * start : 2 * stop], dtype=np.float32)
+        if len(block) % 2:
+            block = np.concatenate([block, block[-1:]])
+        if block.shape[1] % 2:
+            block = np.concatenate([block, block[:, -1:]], axis=1)
+        block = block.reshape(stop - start, 2, cols, 2, *channels).mean(axis=(1, 3))
+        if np.issubdtype(out.dtype, np.integer):
+            block = block.round()
+        out[start:stop] = block
+    return out
+
+
+def reduced_shape(shape):
+    """Number of (rows, columns) of an image of ``shape`` reduced by ``reduce_image``"""
+    return (-(-shape[0] // 2), -(-shape[1] // 2))
+
+
+def level_dtype(dtype):
+    """Data type of the reduced levels of an image of type ``dtype``"""
+    if np.issubdtype(dtype, np.integer):
+        return dtype
+    return np.result_type(dtype, np.float32)
+
+
+class ImagePyramid:
+    """
+    Multi-resolution pyramid of an image, with levels built lazily on first use.
+
+    ``data`` can itself be memory-mapped (e.g. with ``np.load(mmap_mode="r")``).
+    With ``memmap=True``, the reduced levels are stored in temporary files instead
+    of memory.
+    """
+
+    def __init__(self, data, tile_size: int = TILE_SIZE, memmap: bool = False):
+        if np.ndim(data) not in (2, 3):
+            raise ValueError("Image pyramids require 2D or 3D (color) data.")
+        self.levels = [data]
+        self.shape = data.shape[:2]
+        self.tile_size = tile_size
+        self.memmap = memmap
+        # Number of levels, up to the first one which fits in a single tile
+        self.nlevels = 1
+        while max(self.level_shape(self.nlevels - 1)) > tile_size:
+            self.nlevels += 1
+
+    def level_shape(self, level: int):
+        """Number of (rows, columns) of a level"""
+        size = 1 << level
+        return (-(-self.shape[0] // size), -(-self.shape[1] // size))
+
+    def level(self, level: int):
+        """The pixels of a level, reducing the previous levels as needed"""
+        while len(self.levels) <= level:
+            previous = self.levels[-1]
+            out = None
+            if self.memmap:
+                rows, cols = reduced_shape(previous.shape)
+                # The mapping outlives the (deleted) file
+                with tempfile.TemporaryFile() as file:
+                    out = np.memmap(
+                        file,
+                        dtype=level_dtype(previous.dtype),
+                        mode="w+",
+                        shape=(rows, cols, *previous.shape[2:]),
+                    )
+            self.levels.append(reduce_image(previous, out=out))
+        return self.levels[level]
+
+    def choose_level(self, scale: float) -> int:
+        """
+        Coarsest level whose pixels are not larger than a screen pixel, given the
+        number of image pixels per screen pixel
+        """
+        if not scale > 1:
+            return 0
+        return min(int(np.log2(scale)), self.nlevels - 1)
+
+    def tile(self, level: int, row: int, col: int):
+        """The pixels of a tile (smaller than ``tile_size`` at the edges)"""
+        size = self.tile_size
+        return self.level(level)[
+            row * size : (row + 1) * size, col * size : (col + 1) * size
+        ]
+
+
+class TileCache:
+    """
+    Pyramids of the images of a figure, and tiles already sent to the browser.
+
+    Each tile sent is kept in its own offscreen canvas, keyed by its pyramid,
+    level, position, and colormapping. The least recently drawn tiles are
+    discarded when there are more than ``max_tiles``. Tiles are drawn into
+    ``canvas_class`` canvases.
+
+    The tiles to send are colormapped while preparing a frame, in the rendering
+    threads (see ``stage``), so that sending them does not block the kernel.
+    """
+
+    def __init__(self, max_tiles: int = MAX_CACHED_TILES, canvas_class=Canvas):
+        self.max_tiles = max_tiles
+        self.canvas_class = canvas_class
+        # {image_id: {"array": array, "pyramid": pyramid}}
+        self._pyramids = {}
+        self._tiles = OrderedDict()
+        # Colormapped tiles which are not sent yet: {key: rgba}
+        self._staged = OrderedDict()
+        self._lock = threading.Lock()
+
+    def recording(self) -> "TileCache":
+        """
+        A cache sharing the pyramids of this one, whose tiles are recorded instead
+        of being sent to the browser
+        """
+        cache = TileCache(max_tiles=self.max_tiles, canvas_class=RecordingCanvas)
+        cache._pyramids = self._pyramids
+        return cache
+
+    def set_pyramid(self, image, pyramid):
+        self._pyramids[id(image)] = {"array": image.get_array(), "pyramid": pyramid}
+
+    def pyramid(self, image) -> ImagePyramid:
+        """
+        The pyramid of an image, built (lazily) from its data if it has none, or
+        if its data changed
+        """
+        array = image.get_array()
+        entry = self._pyramids.get(id(image))
+        if entry is None or entry["array"] is not array:
+            # Masked values are NaN, which is drawn with the "bad" color
+            data = np.ma.getdata(array)
+            if np.ma.is_masked(array):
+                data = array.astype(np.result_type(array.dtype, np.float32)).filled(
+                    np.nan
+                )
+            self.set_pyramid(image, ImagePyramid(data))
+            entry = self._pyramids[id(image)]
+        return entry["pyramid"]
+
+    def __contains__(self, key):
+        return key in self._tiles
+
+    def stage(self, key, rgba):
+        """
+        Keep the pixels of a tile (an RGBA array of uint8) until it is sent. At most
+        ``max_tiles`` tiles are staged, the oldest ones are discarded.
+        """
+        with self._lock:
+            self._staged[key] = rgba
+            while len(self._staged) > self.max_tiles:
+                self._staged.popitem(last=False)
+
+    def staged(self, key):
+        """The pixels of a staged tile, or ``None`` if it was not staged"""
+        with self._lock:
+            return self._staged.pop(key, None)
+
+    def get(self, key):
+        """The canvas of a tile in the browser, or ``None`` if it was not sent"""
+        canvas = self._tiles.get(key)
+        if canvas is not None:
+            self._tiles.move_to_end(key)
+        return canvas
+
+    def clear(self):
+        """Forget all the pyramids, and close the canvases of the tiles"""
+        self._pyramids.clear()
+        with self._lock:
+            self._staged.clear()
+        while self._tiles:
+            _, tile = self._tiles.popitem()
+            tile.close()
+
+    def add(self, key, rgba):
+        """Send a tile (an RGBA array of uint8) to a new offscreen canvas"""
+        canvas = self.canvas_class(width=rgba.shape[1], height=rgba.shape[0])
+        canvas.put_image_data(rgba, 0, 0)
+        self._tiles[key] = canvas
+        while len(self._tiles) > self.max_tiles:
+            _, evicted = self._tiles.popitem(last=False)
+            evicted.close()
+        return canvas
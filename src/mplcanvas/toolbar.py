@@ -6,7 +6,18 @@ Navigation toolbar for mplcanvas - operates on any axes in the figure
 import ipywidgets as widgets
 from ipycanvas import hold_canvas
 
-from .utils import flip_y
+from .utils import flip_y, running_loop
+
+# Zoom factor for one wheel notch (a delta of 100 pixels in most browsers)
+WHEEL_ZOOM_FACTOR = 1.2
+WHEEL_NOTCH = 100.0
+# Minimum time between two limit changes from the mouse wheel, in seconds
+WHEEL_INTERVAL = 1 / 30
+# Time without wheel events after which a wheel zoom is considered finished, and
+# the axes is drawn at full quality
+WHEEL_SETTLE = 0.3
+# Minimum time between two selection updates while drawing a lasso, in seconds
+BRUSH_INTERVAL = 1 / 30
 
 
 class Toolbar(widgets.VBox):
@@ -17,11 +28,14 @@ class Toolbar(widgets.VBox):
     on whichever axes the user interacts with.
     """
 
-    def __init__(self, figure, **kwargs):
+    def __init__(self, figure, wheel_preview: bool = True, **kwargs):
         self.figure = figure
+        # Show a scaled copy of the current image while wheel zooming, until the
+        # axes is redrawn
+        self.wheel_preview = wheel_preview
 
         # Tool state
-        self._active_tool = None  # 'zoom', 'pan', or None
+        self._active_tool = None  # 'zoom', 'pan', 'select', or None
         # self._zoom_rect_start = None
         # self._pan_info_canvas = None
         self._pan_info = None
@@ -30,6 +44,18 @@ class Toolbar(widgets.VBox):
         self._zoom_info = None
         self._active_axes = None  # Which axes is currently being interacted with
         self._tools_lock = False
+        # Last mouse position (display coordinates), and pending wheel zoom
+        self._mouse_position = None
+        self._wheel_info = None
+        self._wheel_handle = None
+        self._wheel_settle_handle = None
+        # Wheel zoom applied to the limits of an axes, but whose frame is not sent
+        # yet: {"axes", "transform"}, with the transform (scale, tx, ty) mapping the
+        # image in the browser to the new view (in canvas pixels)
+        self._wheel_shown = None
+        # Lasso being drawn with the select tool, and pending selection update
+        self._lasso = None
+        self._brush_handle = None
 
         # Store home views for all axes (will be populated as axes are added)
         self._home_views = {}  # {axes_id: (xlim, ylim)}
@@ -69,10 +95,20 @@ class Toolbar(widgets.VBox):
         )
         self.zoom_button.observe(self._on_zoom_clicked, names="value")
 
+        # Select button
+        self.select_button = widgets.ToggleButton(
+            icon="crosshairs",
+            tooltip="Select tool - draw a lasso around points to highlight them in "
+            "all linked plots",
+            layout=button_layout,
+        )
+        self.select_button.observe(self._on_select_clicked, names="value")
+
         self.tools = {
             "home": self.home_button,
             "pan": self.pan_button,
             "zoom": self.zoom_button,
+            "select": self.select_button,
         }
 
         # Set up event connections - we'll connect to all axes
@@ -110,6 +146,7 @@ class Toolbar(widgets.VBox):
         if change["new"]:  # Button toggled on
             self._active_tool = "pan"
             self.zoom_button.value = False  # Deactivate zoom if active
+            self.select_button.value = False
             # self.status_label.value = "Pan tool active - drag on any plot to move it"
         else:  # Button toggled off
             if self._active_tool == "pan":
@@ -132,6 +169,7 @@ class Toolbar(widgets.VBox):
         if change["new"]:  # Button toggled on
             self._active_tool = "zoom"
             self.pan_button.value = False  # Deactivate pan if active
+            self.select_button.value = False
             # self._clear_zoom_rectangle()  # Clear any active rectangle
 
             # self.status_label.value = (
@@ -152,6 +190,19 @@ class Toolbar(widgets.VBox):
         #     # )
         # self._update_button_states()
 
+    def _on_select_clicked(self, change):
+        """Activate/deactivate select tool"""
+        if self._tools_lock:
+            return
+        self._tools_lock = True
+        if change["new"]:
+            self._active_tool = "select"
+            self.pan_button.value = False
+            self.zoom_button.value = False
+        elif self._active_tool == "select":
+            self._active_tool = None
+        self._tools_lock = False
+
     # def _store_home_view(self, axes):
     #     """Store the current view of an axes as its home view"""
     #     axes_id = id(axes)
@@ -164,6 +215,7 @@ class Toolbar(widgets.VBox):
         self.figure.canvas.on_mouse_down(self._on_canvas_mouse_down)
         self.figure.canvas.on_mouse_up(self._on_canvas_mouse_up)
         self.figure.canvas.on_mouse_move(self._on_canvas_mouse_move)
+        self.figure.canvas.on_mouse_wheel(self._on_canvas_mouse_wheel)
 
     def _on_canvas_mouse_move(self, x: float, y: float):
         """Handle canvas mouse move events"""
@@ -171,6 +223,7 @@ class Toolbar(widgets.VBox):
         # self._current_mouse_pos = (x, y)
         canvas_y = y
         y = flip_y(y, self.figure.canvas)
+        self._mouse_position = (x, y)
         if self._active_axes is None:
             ax = self.figure._find_axes_at_position((x, y))
             if ax is None:
@@ -188,6 +241,8 @@ class Toolbar(widgets.VBox):
             self._do_pan(x, y)
         elif self._active_tool == "zoom" and self._zoom_info is not None:
             self._update_zoom_preview(x, canvas_y)
+        elif self._active_tool == "select" and self._lasso is not None:
+            self._extend_lasso(x, y)
 
     def _on_canvas_mouse_down(self, x: float, y: float):
         """Handle mouse press for active tools"""
@@ -204,6 +259,8 @@ class Toolbar(widgets.VBox):
         elif self._active_tool == "zoom":
             # self._active_axes = self._determine_active_axes(event)
             self._start_zoom(x, canvas_y)
+        elif self._active_tool == "select":
+            self._start_lasso(x, y)
 
         # if not self._point_in_axes(x, y):
         #     return
@@ -214,6 +271,8 @@ class Toolbar(widgets.VBox):
         elif self._active_tool == "zoom":
             # print("Ending zoom", x, y)
             self._end_zoom(x, y)
+        elif self._active_tool == "select" and self._lasso is not None:
+            self._end_lasso()
 
     # In toolbar _start_pan:
     def _start_pan(self, x, y):
@@ -238,6 +297,7 @@ class Toolbar(widgets.VBox):
                 (ylim[1] - ylim[0]) / (ylim_canvas[1] - ylim_canvas[0]),
             ),
         }
+        self.figure._begin_pan(ax)
 
         # self._pan_info_limits = (ax.get_xlim(), ax.get_ylim())
         # print("self._pan_info_point", self._pan_info_point)
@@ -277,11 +337,212 @@ class Toolbar(widgets.VBox):
 
     def _end_pan(self):
         """End panning operation"""
+        if self._active_axes is not None:
+            self.figure._end_pan(self._active_axes)
         self._pan_info = None
         self._active_axes = None
         # self._pan_info_limits = None
         # self._active_axes = None
 
+    def _on_canvas_mouse_wheel(self, dx: float, dy: float):
+        """
+        Zoom around the cursor with the mouse wheel, when the pan or zoom tool is
+        active. Wheel deltas are accumulated, and applied at most once per
+        ``WHEEL_INTERVAL``, so that fast scrolling does not queue many redraws.
+        """
+        if self._active_tool not in ("pan", "zoom") or self._mouse_position is None:
+            return
+        ax = self.figure._find_axes_at_position(self._mouse_position)
+        if ax is None:
+            return
+        if self._wheel_info is not None and self._wheel_info["axes"] is not ax:
+            self._apply_wheel_zoom()
+        if self._wheel_info is None:
+            self._wheel_info = {"axes": ax, "delta": 0.0}
+        self._wheel_info["position"] = self._mouse_position
+        self._wheel_info["delta"] += dy
+
+        loop = running_loop()
+        if loop is None:
+            self._apply_wheel_zoom()
+            return
+        if self.wheel_preview:
+            self._draw_wheel_preview()
+        if self._wheel_handle is None:
+            self._wheel_handle = loop.call_later(WHEEL_INTERVAL, self._apply_wheel_zoom)
+
+    def _wheel_scale(self):
+        """Factor by which the pending wheel zoom scales the view"""
+        return WHEEL_ZOOM_FACTOR ** (-self._wheel_info["delta"] / WHEEL_NOTCH)
+
+    def _wheel_transform(self, ax, scale=1.0, position=None):
+        """
+        The transform ``(scale, tx, ty)`` from the image of an axes in the browser
+        to its view after the wheel zooms which are not drawn yet, followed by a
+        scaling around ``position`` (display coordinates)
+        """
+        shown = self._wheel_shown
+        s, tx, ty = (1.0, 0.0, 0.0)
+        if shown is not None and shown["axes"] is ax:
+            s, tx, ty = shown["transform"]
+        if position is None:
+            return s, tx, ty
+        x, y = position[0], flip_y(position[1], self.figure.drawing_canvas)
+        return s * scale, tx * scale + x * (1 - scale), ty * scale + y * (1 - scale)
+
+    def _apply_wheel_zoom(self):
+        """Change the axes limits by the accumulated wheel zoom, and redraw"""
+        if self._wheel_handle is not None:
+            self._wheel_handle.cancel()
+            self._wheel_handle = None
+        if self._wheel_info is None:
+            return
+        ax = self._wheel_info["axes"]
+        scale = self._wheel_scale()
+        x, y = self._wheel_info["position"]
+        self._wheel_info = None
+        # The preview is shown until the frame of the new limits is sent
+        self._wheel_shown = {
+            "axes": ax,
+            "transform": self._wheel_transform(ax, scale, (x, y)),
+        }
+
+        # Scale the axes rectangle around the cursor in display space, so that
+        # non-linear scales zoom around the cursor too
+        (x0, y0), (x1, y1) = ax.transData.transform(
+            ((ax.get_xlim()[0], ax.get_ylim()[0]), (ax.get_xlim()[1], ax.get_ylim()[1]))
+        )
+        corners = [
+            (x + (x0 - x) / scale, y + (y0 - y) / scale),
+            (x + (x1 - x) / scale, y + (y1 - y) / scale),
+        ]
+        (xmin, ymin), (xmax, ymax) = ax.transData.inverted().transform(corners)
+        ax.set(xlim=(xmin, xmax), ylim=(ymin, ymax))
+        loop = running_loop()
+        if loop is None:
+            self.figure.draw(ax=ax)
+            return
+        self.figure._begin_interaction()
+        self.figure.draw(ax=ax)
+        if self._wheel_shown is not None and self.wheel_preview:
+            # The frame was deferred
+            self._draw_wheel_preview()
+        if self._wheel_settle_handle is not None:
+            self._wheel_settle_handle.cancel()
+        self._wheel_settle_handle = loop.call_later(
+            WHEEL_SETTLE, self._settle_wheel_zoom, ax
+        )
+
+    def _settle_wheel_zoom(self, ax):
+        """Draw at full quality once the wheel zoom is over"""
+        self._wheel_settle_handle = None
+        if self._wheel_info is not None:
+            # Still zooming
+            self._wheel_settle_handle = running_loop().call_later(
+                WHEEL_SETTLE, self._settle_wheel_zoom, ax
+            )
+            return
+        self.figure._end_interaction(ax)
+
+    def _on_frame_drawn(self, axes_ids):
+        """Remove the wheel zoom preview of an axes once its new frame is sent"""
+        shown = self._wheel_shown
+        if shown is None or id(shown["axes"]) not in axes_ids:
+            return
+        self._wheel_shown = None
+        if not self.wheel_preview:
+            return
+        if self._wheel_info is not None:
+            self._draw_wheel_preview()
+        else:
+            self.figure.drawing_canvas.clear()
+
+    def _draw_wheel_preview(self):
+        """
+        Show the axes as it will look after the wheel zooms which are pending or
+        not drawn yet, by scaling the image which is already in the browser. No
+        data is sent.
+        """
+        if self._wheel_info is not None:
+            ax = self._wheel_info["axes"]
+            scale, tx, ty = self._wheel_transform(
+                ax, self._wheel_scale(), self._wheel_info["position"]
+            )
+        else:
+            ax = self._wheel_shown["axes"]
+            scale, tx, ty = self._wheel_transform(ax)
+        canvas = self.figure.drawing_canvas
+        left, bottom, width, height = ax.bbox.bounds
+        top = flip_y(bottom + height, canvas)
+
+        # Image of the axes, and its rectangle within the figure canvas
+        layer = self.figure._axes_layers[id(ax)]
+        source, (rx, ry, rw, rh) = layer["canvas"], layer["rect"]
+        if source is None:
+            source = self.figure.data_canvas
+            rx, ry, rw, rh = 0, 0, canvas.width, canvas.height
+
+        with hold_canvas():
+            canvas.clear()
+            canvas.save()
+            canvas.begin_path()
+            canvas.rect(left, top, width, height)
+            canvas.clip()
+            canvas.fill_style = self.figure.facecolor
+            canvas.fill_rect(left, top, width, height)
+            canvas.draw_image(
+                source, rx * scale + tx, ry * scale + ty, rw * scale, rh * scale
+            )
+            canvas.restore()
+
+    def _start_lasso(self, x, y):
+        """Start drawing a lasso on the active axes, if it has linked points"""
+        if not self.figure._brushable(self._active_axes):
+            self._active_axes = None
+            return
+        self._lasso = {"axes": self._active_axes, "points": [(x, y)]}
+
+    def _extend_lasso(self, x, y):
+        """
+        Add a point to the lasso, and update the selection. Selection updates are
+        applied at most once per ``BRUSH_INTERVAL``, so that a fast mouse does not
+        queue many redraws.
+        """
+        self._lasso["points"].append((x, y))
+        self._draw_lasso()
+        loop = running_loop()
+        if loop is None:
+            self._apply_brush()
+        elif self._brush_handle is None:
+            self._brush_handle = loop.call_later(BRUSH_INTERVAL, self._apply_brush)
+
+    def _apply_brush(self):
+        """Select the points inside of the (closed) lasso"""
+        self._brush_handle = None
+        if self._lasso is not None:
+            self.figure._brush(self._lasso["axes"], self._lasso["points"])
+
+    def _draw_lasso(self):
+        canvas = self.figure.drawing_canvas
+        points = [(x, flip_y(y, canvas)) for x, y in self._lasso["points"]]
+        with hold_canvas():
+            canvas.clear()
+            canvas.stroke_style = "black"
+            canvas.line_width = 1.0
+            canvas.stroke_lines(points)
+
+    def _end_lasso(self):
+        """
+        Apply the final selection of the lasso. A click without dragging clears
+        the selection.
+        """
+        if self._brush_handle is not None:
+            self._brush_handle.cancel()
+        self._apply_brush()
+        self.figure.drawing_canvas.clear()
+        self._lasso = None
+        self._active_axes = None
+
     def _start_zoom(self, x, y):
         """Start zoom selection on the active axes"""
         ax = self._active_axes
@@ -297,6 +558,7 @@ class Toolbar(widgets.VBox):
             "ymin": ymin_canvas,
             "ymax": ymax_canvas,
         }
+        self.figure._begin_interaction()
 
     def _update_zoom_preview(self, x: float, y: float):
         """Optimized zoom rectangle with minimal redraw"""
@@ -322,7 +584,7 @@ class Toolbar(widgets.VBox):
         rect_height = abs(y2 - y1)
         self._zoom_info["rectangle"] = (rect_x, rect_y, rect_width, rect_height)
 
-        with hold_canvas(canvas):
+        with hold_canvas():
             # Redraw figure content (same as figure.draw() internals)
             canvas.clear()
             # canvas.fill_style = self.figure.facecolor
@@ -364,12 +626,12 @@ class Toolbar(widgets.VBox):
             self._zoom_info["rectangle"][2] < min_size
             or self._zoom_info["rectangle"][3] < min_size
         ):
+            self.figure._end_interaction(self._active_axes)
             self._zoom_info = None
             self._active_axes = None
             return
 
-        index = self.figure._axes_to_canvas[id(self._active_axes)]
-        canvas = self.figure.canvas[index]
+        canvas = self.figure.canvas
 
         # Set new limits on the active axes
         # ax = self._active_axes
@@ -393,7 +655,8 @@ class Toolbar(widgets.VBox):
 
         # Clean up
         # self.status_label.value = "Zoomed"
-        self.figure.draw(ax=self._active_axes)  # Final draw to ensure clean state
+        # Final draw, with the "final" quality profile
+        self.figure._end_interaction(self._active_axes)
         self._zoom_info = None
         self._active_axes = None
 
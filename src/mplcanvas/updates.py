@@ -0,0 +1,141 @@
+# mplcanvas/updates.py
+"""
+Thread-safe queue for updating figures from background threads.
+
+The ipycanvas (and matplotlib) calls made when drawing are not thread-safe, so
+worker threads (e.g. data acquisition) should not call ``Figure.draw`` directly.
+Instead, they submit updates to an ``UpdateQueue``, which applies them and redraws
+the affected axes on the kernel event loop, at a bounded rate.
+
+Usage:
+    updates = UpdateQueue(fig, max_fps=20)  # create on the main thread
+
+    # in a worker thread
+    updates.set_data(line, x, y)
+    updates.set_xlim(ax, 0, x[-1])
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+from matplotlib.axes import Axes
+
+from .utils import running_loop
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateQueue:
+    """
+    Collect updates from any thread and render them on the event loop.
+
+    Only the latest update for each (artist, method) pair is kept: updates which
+    are superseded before they are rendered are dropped. Submitting never waits
+    for rendering, and array arguments are copied on submission, so the renderer
+    never sees arrays that are being modified by the producer.
+
+    If there is no running event loop when the queue is created (e.g. in a plain
+    script), updates are only applied when calling ``flush()``.
+    """
+
+    def __init__(self, figure, max_fps: float = 30.0, loop=None):
+        self.figure = figure
+        self.min_interval = 1.0 / max_fps
+        self._loop = loop if loop is not None else running_loop()
+
+        self._lock = threading.Lock()
+        # {(artist_id, method): (artist, method, args, kwargs)}
+        self._pending = {}
+        self._wake_pending = False
+        self._handle = None
+        self._last_draw = 0.0
+        # Number of updates which were superseded before being rendered
+        self.dropped = 0
+
+    def submit(self, artist, method: str, *args, **kwargs):
+        """
+        Schedule ``getattr(artist, method)(*args, **kwargs)``, followed by a redraw
+        of the axes the artist belongs to. Safe to call from any thread.
+        """
+        if not callable(getattr(artist, method, None)):
+            raise AttributeError(f"{type(artist).__name__} has no method '{method}'.")
+        args = tuple(_snapshot(arg) for arg in args)
+        kwargs = {key: _snapshot(value) for key, value in kwargs.items()}
+        with self._lock:
+            key = (id(artist), method)
+            if key in self._pending:
+                self.dropped += 1
+            self._pending[key] = (artist, method, args, kwargs)
+            wake = self._loop is not None and not self._wake_pending
+            self._wake_pending = True
+        if wake:
+            self._loop.call_soon_threadsafe(self._wake)
+
+    def set_data(self, artist, *args):
+        """
+        Update the data of a line (``set_data(x, y)``) or scatter (``set_offsets``,
+        given either the offsets or ``x, y``)
+        """
+        if hasattr(artist, "set_data"):
+            if len(args) != 2:
+                raise TypeError("Lines are updated with set_data(line, x, y).")
+            self.submit(artist, "set_data", *args)
+        elif len(args) == 2:
+            self.submit(artist, "set_offsets", np.column_stack(args))
+        elif len(args) == 1:
+            self.submit(artist, "set_offsets", *args)
+        else:
+            raise TypeError(
+                "Collections are updated with set_data(collection, offsets) or "
+                "set_data(collection, x, y)."
+            )
+
+    def set_xlim(self, ax: Axes, *args, **kwargs):
+        """Update the x limits of an axes"""
+        self.submit(ax, "set_xlim", *args, **kwargs)
+
+    def set_ylim(self, ax: Axes, *args, **kwargs):
+        """Update the y limits of an axes"""
+        self.submit(ax, "set_ylim", *args, **kwargs)
+
+    def _wake(self):
+        """Schedule a flush on the event loop, respecting the maximum frame rate"""
+        if self._handle is not None:
+            return
+        delay = max(0.0, self._last_draw + self.min_interval - time.monotonic())
+        self._handle = self._loop.call_later(delay, self.flush)
+
+    def flush(self):
+        """
+        Apply all pending updates and redraw the affected axes in one batch. An
+        update which raises is logged, and does not prevent the other ones.
+        """
+        self._handle = None
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._wake_pending = False
+        if not pending:
+            return
+
+        axes = []
+        for artist, method, args, kwargs in pending.values():
+            try:
+                getattr(artist, method)(*args, **kwargs)
+            except Exception:
+                logger.exception("Failed to apply %s to %r", method, artist)
+                continue
+            ax = artist if isinstance(artist, Axes) else artist.axes
+            if ax is not None and all(ax is not other for other in axes):
+                axes.append(ax)
+        self._last_draw = time.monotonic()
+        if axes:
+            self.figure.draw(axes)
+
+
+def _snapshot(value):
+    """Copy arrays so that the producer can keep modifying its buffers"""
+    if isinstance(value, np.ndarray | list):
+        return np.array(value, copy=True)
+    return value
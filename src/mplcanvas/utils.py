@@ -1,3 +1,24 @@
+import asyncio
+
+
 def flip_y(y, canvas):
     """Flip y coordinate for canvas (top-left origin)"""
     return canvas.height - y
+
+
+def rects_overlap(a, b):
+    """Check if two (x, y, width, height) rectangles overlap"""
+    return (
+        a[0] < b[0] + b[2]
+        and b[0] < a[0] + a[2]
+        and a[1] < b[1] + b[3]
+        and b[1] < a[1] + a[3]
+    )
+
+
+def running_loop():
+    """Return the running asyncio event loop (e.g. the kernel's), or None"""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
@@ -0,0 +1,83 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Scipp contributors (https://github.com/scipp)
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from mplcanvas import pyplot as plt
+from mplcanvas.animation import FuncAnimation
+
+
+def test_blitting_only_redraws_the_axes_of_the_animated_artists(monkeypatch):
+    fig, (ax, other) = plt.subplots(1, 2)
+    (line,) = ax.plot([0, 1], [0, 1])
+    (background,) = ax.plot([0, 1], [1, 0])
+    image = ax.imshow(np.zeros((2, 2)))
+    other.plot([0, 1], [0, 1])
+    drawn = []
+    draw = fig.draw
+
+    def spy(ax=None):
+        drawn.append(ax)
+        draw(ax)
+
+    monkeypatch.setattr(fig, "draw", spy)
+
+    def update(i):
+        line.set_ydata([i, 0])
+        return (line,)
+
+    async def run():
+        anim = FuncAnimation(fig, update, frames=3, repeat=False, blit=True)
+        for _ in range(3):
+            anim._handle.cancel()
+            anim._step()
+        static = set(fig._static_artists)
+        anim._step()
+        return static
+
+    static = asyncio.run(run())
+    assert drawn == [[ax]] * 3
+    assert list(line.get_ydata()) == [2, 0]
+    assert static == {id(background), id(image)}
+    # The artists are not static anymore after the animation
+    assert not fig._static_artists
+
+
+def test_blitting_requires_the_changed_artists():
+    fig, _ = plt.subplots()
+
+    async def run():
+        anim = FuncAnimation(fig, lambda i: None, blit=True)
+        anim._handle.cancel()
+        with pytest.raises(RuntimeError, match="sequence of Artists"):
+            anim._step()
+
+    asyncio.run(run())
+
+
+def test_skipping_frames_still_draws_the_last_frame():
+    fig, ax = plt.subplots()
+    (line,) = ax.plot([0, 1], [0, 1])
+    computed = []
+
+    def update(i):
+        computed.append(i)
+        line.set_ydata([i, 0])
+        time.sleep(0.05)
+        return (line,)
+
+    async def run():
+        anim = FuncAnimation(fig, update, frames=10, interval=10, repeat=False)
+        while anim._handle is not None:
+            await asyncio.sleep(0.01)
+        return anim
+
+    anim = asyncio.run(run())
+    assert anim.skipped > 0
+    assert len(computed) + anim.skipped == 10
+    assert computed[-1] == 9
+    assert list(line.get_ydata()) == [9, 0]
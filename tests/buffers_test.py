@@ -0,0 +1,33 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Scipp contributors (https://github.com/scipp)
+
+import numpy as np
+
+from mplcanvas.buffers import BufferPool
+from mplcanvas.render import translate_item
+
+
+def test_buffer_pool_reuses_memory_until_it_needs_to_grow():
+    pool = BufferPool()
+    first = pool.get("x", (100, 2))
+    assert first.shape == (100, 2)
+    assert np.shares_memory(pool.get("x", 150), first)
+    assert pool.get("mask", 10, bool).dtype == bool
+    grown = pool.get("x", (300, 2))
+    assert not np.shares_memory(grown, first)
+    assert np.shares_memory(pool.get("x", 10), grown)
+
+
+def test_translate_item_writes_into_the_pool():
+    item = {
+        "kind": "collection",
+        "x": np.array([10.0, 50.0, 90.0]),
+        "y": np.array([10.0, 10.0, 10.0]),
+        "size": np.array([1.0, 2.0, 3.0]),
+    }
+    pool = BufferPool()
+    first = translate_item(item, -45.0, 0.0, (0.0, 0.0, 100.0, 100.0), pool, 0)
+    second = translate_item(item, -40.0, 0.0, (0.0, 0.0, 100.0, 100.0), pool, 0)
+    assert second["x"].tolist() == [10.0, 50.0]
+    assert second["size"].tolist() == [2.0, 3.0]
+    assert np.shares_memory(first["x"], second["x"])
@@ -0,0 +1,68 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Scipp contributors (https://github.com/scipp)
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from mplcanvas import diffing
+from mplcanvas.diffing import emit_changes
+from mplcanvas.recording import RecordingCanvas
+from mplcanvas.render import emit_axes, prepare_axes
+
+
+def test_emit_changes_only_sends_changed_blocks():
+    fig, ax = plt.subplots(figsize=(4, 3))
+    ax.plot([0, 1, 2], [0, 1, 0], color="C0")
+    moving = ax.scatter([0.5], [0.5], s=25, color="C1")
+    ax.set(xlim=(0, 2), ylim=(0, 1))
+    canvas = RecordingCanvas(400, 300)
+    record = {}
+    assert emit_changes(prepare_axes(ax, canvas), canvas, record)
+    count = len(canvas.commands)
+    assert not emit_changes(prepare_axes(ax, canvas), canvas, record)
+    assert len(canvas.commands) == count
+
+    # Onto the line, which is partly drawn again
+    moving.set_offsets([[1.5, 0.5]])
+    prepared = prepare_axes(ax, canvas)
+    assert emit_changes(prepared, canvas, record)
+    names = [name for name, _, _ in canvas.commands[count:]]
+    assert "clear_rect" in names
+    assert "fill_text" not in names
+
+    # The updated image is the same as drawing everything again, up to the
+    # antialiasing of the lines cut at the edges of the region
+    expected = RecordingCanvas(400, 300)
+    emit_axes(prepared, expected)
+    difference = np.asarray(canvas.to_image(), dtype=int) - np.asarray(
+        expected.to_image(), dtype=int
+    )
+    assert np.abs(difference).max() <= 2
+    plt.close(fig)
+
+
+def test_emit_changes_skips_unchanged_artists_and_static_canvas(monkeypatch):
+    fig, ax = plt.subplots(figsize=(4, 3))
+    (reference,) = ax.plot([0, 1], [1, 0])
+    (line,) = ax.plot([0, 1], [0, 1])
+    canvas, static_canvas = RecordingCanvas(400, 300), RecordingCanvas(400, 300)
+    context = {"static": {"ids": {id(reference)}}}
+    record = {}
+    assert emit_changes(
+        prepare_axes(ax, canvas, context=context), canvas, record, static_canvas
+    )
+    count = len(canvas.commands)
+    bounds = []
+    monkeypatch.setattr(diffing, "item_bounds", lambda item: bounds.append(item))
+
+    # The artists are not compared again when nothing changed
+    prepared = prepare_axes(ax, canvas, context=context)
+    assert prepared["static"] is None
+    assert not emit_changes(prepared, canvas, record, static_canvas)
+    assert len(canvas.commands) == count
+    assert not bounds
+
+    line.set_ydata([0.5, 0.5])
+    emit_changes(prepare_axes(ax, canvas, context=context), canvas, record)
+    assert bounds
+    plt.close(fig)
@@ -0,0 +1,377 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Scipp contributors (https://github.com/scipp)
+
+import asyncio
+import importlib
+import io
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from mplcanvas import pyplot as plt
+
+
+def test_set_size_inches_resizes_layers_in_place():
+    fig, ax = plt.subplots()
+    fig.mpl_figure.set_layout_engine("constrained")
+    ax.plot([0, 1], [0, 1])
+    fig.draw()
+    (layer,) = fig._axes_layers.values()
+    canvas = layer["canvas"]
+    width, figure_width = canvas.width, fig.width
+    fig.set_size_inches(fig.figsize[0] * 2, fig.figsize[1])
+    assert fig.canvas.width == fig.width == 2 * figure_width
+    assert fig.data_canvas.width == fig.width
+    assert layer["canvas"] is canvas
+    assert canvas.width > 1.5 * width
+
+
+def test_ncanvases_is_deprecated_and_ignored():
+    with pytest.warns(DeprecationWarning, match="ncanvases"):
+        fig = plt.figure(ncanvases=2)
+    ax = fig.add_subplot(1, 1, 1)
+    ax.plot([0, 1], [0, 1])
+    fig.draw()
+    assert len(fig._axes_layers) == 1
+
+
+def test_axes_layers_are_sized_to_their_bounding_box(monkeypatch):
+    fig, axes = plt.subplots(1, 2)
+    for ax in axes:
+        ax.plot([0, 1], [0, 1])
+    fig.draw()
+    for ax in axes:
+        layer = fig._axes_layers[id(ax)]
+        x, y, width, height = layer["rect"]
+        assert (layer["canvas"].width, layer["canvas"].height) == (width, height)
+        assert width < fig.width / 2 + 20
+        # The layer covers the axes, in canvas coordinates with a top-left origin
+        bbox = ax.get_window_extent()
+        assert x <= bbox.x0 <= bbox.x1 <= x + width
+        assert y <= fig.height - bbox.y1 <= fig.height - bbox.y0 <= y + height
+    # Redrawing an axes only composites its own region again
+    composited = []
+    monkeypatch.setattr(fig, "_composite", lambda rect=None: composited.append(rect))
+    axes[0].lines[0].set_ydata([1, 0])
+    fig.draw(axes[0])
+    assert composited == [fig._axes_layers[id(axes[0])]["rect"]]
+
+
+def test_single_canvas_redraws_only_the_region_of_an_axes(monkeypatch):
+    fig, axes = plt.subplots(1, 3, single_canvas=True)
+    for ax in axes:
+        ax.plot([0, 1], [0, 1])
+    fig.draw()
+    module = importlib.import_module("mplcanvas.figure")
+    emitted = []
+    emit_axes = module.emit_axes
+
+    def spy(prepared, *args, **kwargs):
+        emitted.append(prepared)
+        emit_axes(prepared, *args, **kwargs)
+
+    monkeypatch.setattr(module, "emit_axes", spy)
+    cleared = []
+    monkeypatch.setattr(fig.data_canvas, "clear", lambda: cleared.append(None))
+    monkeypatch.setattr(fig.data_canvas, "clear_rect", lambda *r: cleared.append(r))
+    fig.draw(axes[0])
+    rect = fig._axes_layers[id(axes[0])]["rect"]
+    assert cleared == [tuple(rect)]
+    # The neighbour overlapping the region is drawn again, clipped to it, but not
+    # the axes further away
+    frames = [prepared["frame"] for prepared in emitted]
+    prepared = fig._prepare([id(ax) for ax in axes])
+    assert prepared[id(axes[0])]["frame"] in frames
+    assert prepared[id(axes[2])]["frame"] not in frames
+
+
+def test_threaded_preparation_matches_serial_preparation(monkeypatch):
+    fig, axes = plt.subplots(2, 2, sharex=True, sharey=True, render_threads=4)
+    rng = np.random.default_rng(0)
+    for i, ax in enumerate(np.ravel(axes)):
+        ax.plot(np.arange(1000) * (i + 1), rng.normal(size=1000))
+        ax.scatter(rng.uniform(size=100), rng.uniform(size=100) * i)
+    fig.draw()
+    module = importlib.import_module("mplcanvas.figure")
+    threads = []
+    prepare_axes = module.prepare_axes
+
+    def spy(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return prepare_axes(*args, **kwargs)
+
+    monkeypatch.setattr(module, "prepare_axes", spy)
+    axes_ids = list(fig._axes_layers)
+    threaded = fig._prepare(axes_ids)
+    assert all(name.startswith("mplcanvas-render") for name in threads)
+    threads.clear()
+    fig.render_threads = 1
+    serial = fig._prepare(axes_ids)
+    assert threads == [threading.current_thread().name] * len(axes_ids)
+    for axes_id in axes_ids:
+        np.testing.assert_equal(threaded[axes_id], serial[axes_id])
+
+
+def test_shared_axes_are_redrawn_together_with_shared_ticks(monkeypatch):
+    fig, axes = plt.subplots(2, 2, sharex="col")
+    top_left, top_right, bottom_left, bottom_right = np.ravel(axes)
+    for ax in np.ravel(axes):
+        ax.plot([0, 1], [0, 1])
+    fig.draw()
+    assert fig._linked_axes(top_left) == [top_left, bottom_left]
+    assert fig._linked_axes(bottom_right) == [top_right, bottom_right]
+
+    # The ticks of each shared axis are computed once for its group
+    ticks = fig._shared_ticks([top_left, top_right, bottom_left, bottom_right])
+    assert set(ticks) == {id(ax) for ax in np.ravel(axes)}
+    assert ticks[id(top_left)]["x"] is ticks[id(bottom_left)]["x"]
+    assert ticks[id(top_left)]["x"] is not ticks[id(top_right)]["x"]
+    assert "y" not in ticks[id(top_left)]
+
+    batches = []
+    prepare = fig._prepare
+    monkeypatch.setattr(
+        fig, "_prepare", lambda ids: batches.append(ids) or prepare(ids)
+    )
+    top_left.set_xlim(0, 10)
+    fig.draw(top_left)
+    # The axes sharing the x axis are redrawn with it, in the same batch
+    assert [set(ids) for ids in batches] == [{id(top_left), id(bottom_left)}]
+    prepared = prepare([id(top_left), id(bottom_left)])
+    top, bottom = (
+        prepared[id(ax)]["ticks"]["xticks"] for ax in (top_left, bottom_left)
+    )
+    assert [label for _, _, label in top] == [label for _, _, label in bottom]
+    assert "10" in [label for _, _, label in top]
+
+
+def test_resize_burst_computes_the_layout_once(monkeypatch):
+    fig, _ = plt.subplots()
+    fig.draw()
+    layouts = []
+    update_layout = fig._update_layout
+    monkeypatch.setattr(fig, "_update_layout", lambda: layouts.append(update_layout()))
+    module = importlib.import_module("mplcanvas.figure")
+    monkeypatch.setattr(module, "RESIZE_DELAY", 0.01)
+
+    async def drag():
+        for width in range(300, 400, 10):
+            fig.resize(width, 300)
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(drag())
+    assert len(layouts) == 1
+    assert (fig.width, fig.height) == (390, 300)
+
+
+def test_savefig_writes_svg_and_png_to_file_objects():
+    fig, ax = plt.subplots()
+    ax.plot([0, 1], [0, 1])
+    svg, png = io.BytesIO(), io.BytesIO()
+    fig.savefig(svg, format="svg")
+    fig.savefig(png, format="png")
+    assert svg.getvalue().startswith(b"<svg")
+    assert png.getvalue().startswith(b"\x89PNG")
+
+
+def test_savefig_includes_images():
+    fig, ax = plt.subplots()
+    ax.imshow(np.zeros((4, 4)), cmap="gray", extent=(0, 1, 0, 1))
+    ax.set(xlim=(-1, 2), ylim=(-1, 2))
+    svg, png = io.BytesIO(), io.BytesIO()
+    fig.savefig(svg, format="svg")
+    fig.savefig(png, format="png")
+    assert b"<image" in svg.getvalue()
+    image = np.asarray(Image.open(png))
+    # The image is black, in the middle of the axes
+    assert tuple(image[image.shape[0] // 2, image.shape[1] // 2]) == (0, 0, 0)
+    assert tuple(image[2, 2]) == (255, 255, 255)
+
+
+def test_savefig_places_tick_labels_next_to_their_axes():
+    fig, (top, bottom) = plt.subplots(2, 1)
+    top.set(xticks=[], yticks=[])
+    bottom.plot([0, 1], [0, 1])
+    png = io.BytesIO()
+    fig.savefig(png, format="png")
+    ink = np.asarray(Image.open(png))[:, :, 0] < 128
+    # The frames are the only ink right of the left edge of the axes, so the tick
+    # labels of the bottom axes are left of its frame and below it
+    left = int(bottom.get_window_extent().x0) - 2
+    rows = np.flatnonzero(ink[:, :left].any(axis=1))
+    assert rows[0] > fig.height / 2
+    below = fig.height - int(bottom.get_window_extent().y0) + 2
+    assert ink[below:, left:].any()
+    assert not ink[: fig.height // 2, :left].any()
+
+
+def test_set_facecolor_and_show_draw_the_figure():
+    fig, ax = plt.subplots()
+    ax.plot([0, 1], [0, 1])
+    fig.set_facecolor("black")
+    assert fig.mpl_figure.get_facecolor() == (0, 0, 0, 1)
+    assert fig.show() is fig
+    png = io.BytesIO()
+    fig.savefig(png, format="png")
+    assert tuple(np.asarray(Image.open(png))[0, 0]) == (0, 0, 0)
+
+
+def acknowledge(fig, frame):
+    """Send the acknowledgement of a frame, as the browser does"""
+    data = io.BytesIO()
+    Image.new("RGB", (1, 1), f"#{frame:06x}").save(data, format="png")
+    fig._on_frame_ack({"new": data.getvalue()})
+
+
+def test_frames_are_not_deferred_before_the_first_acknowledgement():
+    fig, _ = plt.subplots()
+
+    async def display():
+        for _ in range(5):
+            fig.draw()
+        assert fig._deferred_handle is None
+        acknowledge(fig, 5)
+        fig.draw()
+        fig.draw()
+        fig.draw()
+        assert fig._deferred_handle is not None
+
+    asyncio.run(display())
+
+
+def test_late_acknowledgements_do_not_acknowledge_newer_frames():
+    fig, _ = plt.subplots()
+
+    async def display():
+        fig.draw()
+        fig.draw()
+        acknowledge(fig, 2)
+        fig.draw()
+        fig.draw()
+        # The acknowledgement of a frame which timed out
+        acknowledge(fig, 1)
+        assert [frame for frame, _ in fig._frames_in_flight] == [3, 4]
+        acknowledge(fig, 3)
+        assert [frame for frame, _ in fig._frames_in_flight] == [4]
+
+    asyncio.run(display())
+
+
+def test_lost_acknowledgements_suspend_flow_control(monkeypatch):
+    fig, _ = plt.subplots()
+    module = importlib.import_module("mplcanvas.figure")
+    monkeypatch.setattr(module, "FRAME_ACK_TIMEOUT", 0.01)
+
+    async def display():
+        fig.draw()
+        acknowledge(fig, 1)
+        fig.draw()
+        fig.draw()
+        fig.draw()
+        assert fig._deferred_handle is not None
+        # The deferred frame is drawn once the frames in flight time out
+        await asyncio.sleep(0.05)
+        assert fig._deferred_handle is None
+        assert fig._frame_count == 4
+        # Later frames are not deferred until the next acknowledgement
+        for _ in range(5):
+            fig.draw()
+        assert fig._deferred_handle is None
+        acknowledge(fig, 9)
+        fig.draw()
+        fig.draw()
+        fig.draw()
+        assert fig._deferred_handle is not None
+
+    asyncio.run(display())
+
+
+def spy_budgets(monkeypatch):
+    """The point budget of each axes prepared by the figures"""
+    module = importlib.import_module("mplcanvas.figure")
+    budgets = []
+    prepare = module.prepare_axes
+
+    def prepare_axes(*args, context, **kwargs):
+        budgets.append(context.get("max_points"))
+        return prepare(*args, context=context, **kwargs)
+
+    monkeypatch.setattr(module, "prepare_axes", prepare_axes)
+    monkeypatch.setattr(module, "PROGRESSIVE_START_POINTS", 100)
+    return budgets
+
+
+def test_draw_progressive_refines_up_to_all_the_points(monkeypatch):
+    budgets = spy_budgets(monkeypatch)
+    fig, ax = plt.subplots()
+    ax.scatter(np.arange(5000.0), np.arange(5000.0))
+
+    async def display():
+        fig.draw_progressive()
+        # The first pass is drawn right away
+        assert budgets == [100]
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    asyncio.run(display())
+    assert budgets == [100, 1000, None]
+
+
+def test_draw_progressive_waits_for_deferred_frames(monkeypatch):
+    budgets = spy_budgets(monkeypatch)
+    fig, ax = plt.subplots()
+    ax.plot(np.arange(50_000.0))
+
+    async def display():
+        fig.draw_progressive()
+        acknowledge(fig, 1)
+        for _ in range(5):
+            await asyncio.sleep(0)
+        # The browser did not display the next frames, so the fourth pass is
+        # deferred, and the next ones are not drawn before it
+        assert budgets == [100, 1000, 10_000]
+        acknowledge(fig, 2)
+        assert budgets == [100, 1000, 10_000, None]
+
+    asyncio.run(display())
+
+
+def test_clf_closes_the_canvases_and_resets_the_state():
+    fig, ax = plt.subplots()
+    (line,) = ax.plot(np.arange(10.0))
+    ax.imshow(np.zeros((4, 4)))
+    fig.build_lod(line)
+    fig.set_static(line)
+    fig.link_brushing(ax.scatter([0], [0]))
+    fig.draw()
+    (layer,) = fig._axes_layers.values()
+    tiles = fig._render_context["tiles"]
+    assert tiles._tiles
+    fig.clf()
+    assert not fig.mpl_figure.axes
+    assert not fig._axes_layers
+    assert layer["canvas"].comm is None
+    assert layer["static"]["canvas"].comm is None
+    assert not fig._static_artists
+    assert not fig._brushes
+    assert not fig._render_context["lods"]
+    assert not tiles._tiles
+    assert not tiles._pyramids
+
+
+def test_single_canvas_static_canvases_cover_their_axes_only():
+    fig, axes = plt.subplots(1, 3, single_canvas=True)
+    for ax in axes:
+        (line,) = ax.plot([0, 1], [0, 1])
+        fig.set_static(line)
+    fig.draw()
+    for ax in axes:
+        layer = fig._axes_layers[id(ax)]
+        x, y, width, height = layer["rect"]
+        static = layer["static"]
+        assert (static["canvas"].width, static["canvas"].height) == (width, height)
+        assert width < fig.width / 2
+        assert static["position"] == (x, y)
@@ -0,0 +1,23 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Scipp contributors (https://github.com/scipp)
+
+import numpy as np
+
+from mplcanvas.lod import LinePyramid
+from mplcanvas.offload import build_pyramid
+
+
+def test_build_pyramid_in_a_worker_matches_building_it_in_process():
+    x = np.arange(100_000, dtype=float)
+    y = np.sin(x / 100) + np.random.default_rng(0).normal(size=len(x))
+    pyramid = build_pyramid(x, y).result(timeout=60)
+    expected = LinePyramid.build(x, y)
+    assert len(pyramid.levels) == len(expected.levels) > 1
+    for (ymin, ymax), (expected_min, expected_max) in zip(
+        pyramid.levels, expected.levels, strict=True
+    ):
+        assert np.array_equal(ymin, expected_min)
+        assert np.array_equal(ymax, expected_max)
+    assert np.array_equal(
+        pyramid.decimate(0, 1000, 100), expected.decimate(0, 1000, 100)
+    )
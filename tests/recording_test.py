@@ -0,0 +1,76 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Scipp contributors (https://github.com/scipp)
+
+import numpy as np
+import pytest
+
+from mplcanvas.recording import RecordingCanvas
+
+
+def test_recording_canvas_records_commands_and_styles():
+    canvas = RecordingCanvas(10, 10)
+    canvas.fill_style = "red"
+    canvas.fill_rects(1, 2, 3)
+    assert canvas.commands == [
+        ("set", ("fill_style", "red"), {}),
+        ("fill_rects", (1, 2, 3), {}),
+    ]
+
+
+def test_to_image_rasterizes_clipped_rects():
+    canvas = RecordingCanvas(20, 10)
+    canvas.save()
+    canvas.begin_path()
+    canvas.rect(0, 0, 10, 10)
+    canvas.clip()
+    canvas.fill_style = "#ff0000"
+    canvas.fill_rects(np.array([2.0, 8.0]), 2.0, 6.0, 6.0)
+    canvas.restore()
+    image = np.asarray(canvas.to_image())
+    assert tuple(image[4, 4]) == (255, 0, 0)
+    # Outside of the clipping region
+    assert tuple(image[4, 13]) == (255, 255, 255)
+
+
+def test_to_image_places_text_from_the_top():
+    canvas = RecordingCanvas(100, 100)
+    canvas.font = "20px sans-serif"
+    canvas.text_baseline = "top"
+    canvas.fill_text("H", 10, 20)
+    canvas.text_baseline = "alphabetic"
+    canvas.fill_text("H", 60, 80)
+    ink = np.asarray(canvas.to_image())[:, :, 0] < 128
+    top = np.flatnonzero(ink[:, :50].any(axis=1))
+    bottom = np.flatnonzero(ink[:, 50:].any(axis=1))
+    assert 20 <= top[0] <= 24
+    assert 78 <= bottom[-1] <= 80
+
+
+def test_to_svg_batches_lines_into_one_path():
+    canvas = RecordingCanvas(20, 10)
+    points = np.array([[0, 0], [5, 5], [10, 0], [0, 5], [5, 9]], dtype=float)
+    canvas.stroke_line_segments(points, points_per_line_segment=[3, 2])
+    svg = canvas.to_svg()
+    assert svg.count("<path") == 1
+    assert svg.count("M") == 2
+
+
+def test_to_image_draws_recorded_images():
+    tile = RecordingCanvas(2, 1)
+    tile.put_image_data(np.array([[[255, 0, 0, 255], [0, 0, 255, 255]]]), 0, 0)
+    canvas = RecordingCanvas(20, 10)
+    canvas.image_smoothing_enabled = False
+    canvas.draw_image(tile, 0, 0, 20, 10)
+    image = np.asarray(canvas.to_image())
+    assert tuple(image[5, 5]) == (255, 0, 0)
+    assert tuple(image[5, 15]) == (0, 0, 255)
+    assert "data:image/png;base64," in canvas.to_svg()
+
+
+def test_to_image_rejects_images_it_cannot_draw():
+    source = RecordingCanvas(2, 2)
+    source.fill_rect(0, 0, 2)
+    canvas = RecordingCanvas(20, 10)
+    canvas.draw_image(source, 0, 0)
+    with pytest.raises(ValueError, match="put_image_data"):
+        canvas.to_image()
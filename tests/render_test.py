@@ -0,0 +1,231 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Scipp contributors (https://github.com/scipp)
+
+import matplotlib.pyplot as plt
+import numpy as np
+from ipycanvas import Canvas
+from matplotlib.collections import LineCollection
+
+from mplcanvas.recording import RecordingCanvas
+from mplcanvas.render import (
+    emit_axes,
+    max_artist_size,
+    prepare_axes,
+    split_finite_runs,
+    thin_markers,
+    translate_item,
+    unique_pixels,
+)
+
+
+def test_split_finite_runs_without_gaps_keeps_lines():
+    points = np.arange(10.0).reshape(5, 2)
+    out, counts, owner = split_finite_runs(points, [3, 2])
+    assert np.array_equal(out, points)
+    assert list(counts) == [3, 2]
+    assert list(owner) == [0, 1]
+
+
+def test_line_collection_is_batched_by_line_width():
+    fig, ax = plt.subplots(figsize=(4, 3), dpi=72)
+    segments = [
+        [(0, 0), (1, 1)],
+        [(0, 1), (1, 0)],
+        [(0, 0.5), (0.5, 0.5), (1, 0.5)],
+        [(0.5, 0), (0.5, 1)],
+    ]
+    ax.add_collection(
+        LineCollection(
+            segments, linewidths=[1, 3], colors=["red", "blue", "green", "black"]
+        )
+    )
+    canvas = Canvas(width=288, height=216)
+    thin, thick = prepare_axes(ax, canvas)["artists"]
+    assert thin["linewidth"] == 1
+    assert thin["counts"].tolist() == [2, 3]
+    assert thin["colors"].tolist() == [[255, 0, 0], [0, 128, 0]]
+    assert thick["linewidth"] == 3
+    assert thick["counts"].tolist() == [2, 2]
+    assert thick["colors"].tolist() == [[0, 0, 255], [0, 0, 0]]
+    plt.close(fig)
+
+
+def test_bars_histograms_and_fills_are_batched_by_style():
+    fig, (bars, hist, fill) = plt.subplots(1, 3, figsize=(6, 2), dpi=72)
+    bars.bar(np.arange(5), np.arange(1, 6), color="red")
+    bars.bar(np.arange(3), -np.ones(3), color="blue", edgecolor="black")
+    hist.hist(np.arange(100) % 10, bins=10, color="green")
+    hist.hist(np.arange(100) % 5, bins=5, histtype="step", color="orange")
+    x = np.linspace(0, 1, 50)
+    fill.fill_between(x, x, x**2, color="purple")
+    fill.fill_between(x, -x, 0, where=x < 0.5, color="cyan")
+    canvas = Canvas(width=432, height=144)
+    red, blue = prepare_axes(bars, canvas)["artists"]
+    assert red["kind"] == blue["kind"] == "rects"
+    assert (len(red["x"]), red["fill"], red["stroke"]) == (5, "#ff0000ff", None)
+    assert (len(blue["x"]), blue["fill"]) == (3, "#0000ffff")
+    assert blue["stroke"] == "#000000ff"
+    # Bars below the baseline have a positive height in canvas pixels
+    assert np.all(blue["height"] > 0)
+    green, orange = prepare_axes(hist, canvas)["artists"]
+    assert (green["kind"], len(green["x"]), green["fill"]) == ("rects", 10, "#008000ff")
+    # A step histogram is a single unfilled polygon
+    assert orange["kind"] == "polygons"
+    assert (len(orange["counts"]), orange["fill"]) == (1, None)
+    assert orange["stroke"] == "#ffa500ff"
+    purple, cyan = prepare_axes(fill, canvas)["artists"]
+    assert purple["kind"] == cyan["kind"] == "polygons"
+    assert (len(purple["counts"]), purple["fill"]) == (1, "#800080ff")
+    assert (len(cyan["counts"]), cyan["fill"]) == (1, "#00ffffff")
+    plt.close(fig)
+
+
+def test_split_finite_runs_splits_at_nans():
+    points = np.column_stack([np.arange(7.0), np.arange(7.0)])
+    points[2, 1] = np.nan
+    points[5, 0] = np.inf
+    out, counts, owner = split_finite_runs(points, [7])
+    assert list(counts) == [2, 2, 1]
+    assert list(owner) == [0, 0, 0]
+    assert list(out[:, 0]) == [0, 1, 3, 4, 6]
+
+
+def test_split_finite_runs_splits_at_line_boundaries():
+    points = np.column_stack([np.arange(6.0), np.arange(6.0)])
+    points[0, 0] = np.nan
+    out, counts, owner = split_finite_runs(points, [3, 3])
+    assert list(counts) == [2, 3]
+    assert list(owner) == [0, 1]
+    assert len(out) == 5
+
+
+def test_split_finite_runs_all_nan():
+    points = np.full((4, 2), np.nan)
+    out, counts, owner = split_finite_runs(points, [4])
+    assert len(out) == 0
+    assert len(counts) == 0
+    assert len(owner) == 0
+
+
+def test_unique_pixels_keeps_first_point_per_pixel():
+    x = np.array([1.0, 1.2, 5.0, 0.9, 5.4])
+    y = np.array([2.0, 2.1, 2.0, 1.8, 2.0])
+    np.testing.assert_array_equal(unique_pixels(x, y), [0, 2])
+
+
+def test_unique_pixels_empty():
+    assert len(unique_pixels(np.array([]), np.array([]))) == 0
+
+
+def test_translate_item_shifts_and_culls_scatter():
+    item = {
+        "kind": "collection",
+        "x": np.array([10.0, 50.0, 90.0]),
+        "y": np.array([10.0, 10.0, 10.0]),
+        "size": 2.0,
+    }
+    out = translate_item(item, -40.0, 5.0, (0.0, 0.0, 100.0, 100.0))
+    np.testing.assert_array_equal(out["x"], [10.0, 50.0])
+    np.testing.assert_array_equal(out["y"], [15.0, 15.0])
+    # The prepared item is left untouched, to be translated again later
+    assert len(item["x"]) == 3
+
+
+def test_translate_item_returns_none_when_nothing_is_visible():
+    item = {
+        "kind": "rects",
+        "x": np.array([10.0]),
+        "y": np.array([10.0]),
+        "width": np.array([5.0]),
+        "height": np.array([5.0]),
+    }
+    assert translate_item(item, 200.0, 0.0, (0.0, 0.0, 100.0, 100.0)) is None
+
+
+def test_unique_pixels_can_keep_last_point_per_pixel():
+    x = np.array([1.0, 1.2, 5.0, 0.9, 5.4])
+    y = np.array([2.0, 2.1, 2.0, 1.8, 2.0])
+    np.testing.assert_array_equal(unique_pixels(x, y, keep="last"), [3, 4])
+
+
+def test_thin_markers_follows_quality_profile():
+    x = np.arange(10.0)
+    y = np.zeros(10)
+    profile = {"marker_dedup": 0, "max_markers": None}
+    assert len(thin_markers(x, y, {"quality": profile})) == 10
+    profile = {"marker_dedup": 2, "max_markers": None}
+    assert len(thin_markers(x, y, {"quality": profile})) == 6
+    profile = {"marker_dedup": 0, "max_markers": 5}
+    np.testing.assert_array_equal(
+        thin_markers(x, y, {"quality": profile}), [0, 2, 4, 6, 8]
+    )
+
+
+def test_max_artist_size_counts_patches_and_image_pixels():
+    fig, ax = plt.subplots(figsize=(4, 3), dpi=100)
+    ax.bar(np.arange(50), np.ones(50))
+    assert max_artist_size(ax) == 50
+    ax.imshow(np.zeros((1000, 1000)))
+    # Images count at most the pixels of the axes
+    assert max_artist_size(ax) == int(ax.bbox.width * ax.bbox.height)
+    plt.close(fig)
+
+
+def test_prepare_axes_caches_static_artists_without_touching_stale():
+    fig, ax = plt.subplots(figsize=(4, 3), dpi=100)
+    (line,) = ax.plot([0, 1], [0, 1])
+    ax.plot([0, 1], [1, 0])
+    canvas = RecordingCanvas(400, 300)
+    static = {"ids": {id(line)}}
+    context = {"static": static}
+    assert prepare_axes(ax, canvas, context=context)["static"]
+    assert line.stale
+    assert prepare_axes(ax, canvas, context=context)["static"] is None
+    line.set_ydata([1, 1])
+    assert prepare_axes(ax, canvas, context=context)["static"]
+    plt.close(fig)
+
+
+def test_markers_without_edge_are_filled_up_to_the_edge():
+    fig, ax = plt.subplots(figsize=(4, 3), dpi=72)
+    ax.plot([0, 1], [0, 1], "o", ms=10, mew=2, mfc="red", mec="red")
+    ax.plot([0, 1], [1, 0], "^", ms=10, mew=2, mfc="red", mec="blue")
+    canvas = RecordingCanvas(288, 216)
+    same, other = [
+        item
+        for item in prepare_axes(ax, canvas)["artists"]
+        if item["kind"] == "markers"
+    ]
+    assert same["stroke"] is None
+    assert same["size"] == 12
+    assert other["stroke"] is not None
+    assert other["size"] == 10
+    plt.close(fig)
+
+
+def test_static_canvas_can_cover_a_region_of_the_canvas():
+    fig, ax = plt.subplots(figsize=(4, 3), dpi=72)
+    ax.plot([0, 1], [0, 1], lw=3)
+    canvas = RecordingCanvas(288, 216)
+    emit_axes(prepare_axes(ax, canvas), canvas)
+    full = np.asarray(canvas.to_image())
+    x, y, width, height = 20, 10, 250, 190
+    static = {"ids": {id(ax.lines[0])}, "canvas": RecordingCanvas(width, height)}
+    static["position"] = (x, y)
+    canvas = RecordingCanvas(288, 216)
+    emit_axes(
+        prepare_axes(ax, canvas, context={"static": static}), canvas, static["canvas"]
+    )
+    assert ("draw_image", (static["canvas"], x, y), {}) in canvas.commands
+    # Inside of the frame and ticks, the offscreen canvas holds what the canvas
+    # would show
+    left, top, right, bottom = (round(v) for v in ax.bbox.extents)
+    region = (slice(216 - bottom + 8, 216 - top - 8), slice(left + 8, right - 8))
+    shifted = (
+        slice(region[0].start - y, region[0].stop - y),
+        slice(region[1].start - x, region[1].stop - x),
+    )
+    image = np.asarray(static["canvas"].to_image())
+    assert (full[region] < 128).any()
+    assert np.array_equal(image[shifted], full[region])
+    plt.close(fig)
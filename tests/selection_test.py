@@ -0,0 +1,40 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Scipp contributors (https://github.com/scipp)
+
+from types import SimpleNamespace
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from mplcanvas.selection import LinkedBrush, rasterize_polygon
+
+
+def test_rasterize_polygon_fills_pixel_centers_inside():
+    square = np.array([[1.0, 1.0], [4.0, 1.0], [4.0, 3.0], [1.0, 3.0]])
+    grid = rasterize_polygon(square, (5, 6))
+    expected = np.zeros((5, 6), dtype=bool)
+    expected[1:3, 1:4] = True
+    assert np.array_equal(grid, expected)
+
+
+def test_linked_brush_selects_rows_in_all_collections():
+    fig, (ax1, ax2) = plt.subplots(1, 2)
+    x = np.array([0.0, 1.0, 2.0, 3.0])
+    s1 = ax1.scatter(x, x)
+    s2 = ax2.scatter(x, -x)
+    ax1.set(xlim=(-1, 4), ylim=(-1, 4))
+    canvas = SimpleNamespace(width=int(fig.bbox.width), height=int(fig.bbox.height))
+    brush = LinkedBrush([s1, s2])
+
+    # Lasso around the first two points, in canvas pixels
+    corners = ax1.transData.transform([(-0.5, -0.5), (1.5, 1.5)])
+    (x0, y0), (x1, y1) = corners[0], corners[1]
+    y0, y1 = canvas.height - y0, canvas.height - y1
+    brush.select(s1, [(x0, y0), (x1, y0), (x1, y1), (x0, y1)], canvas)
+    assert brush.mask.tolist() == [True, True, False, False]
+    (item,) = brush.prepare_highlight(s2, canvas)
+    assert len(item["x"]) == 2
+
+    brush.select(s1, [], canvas)
+    assert not brush.mask.any()
+    plt.close(fig)
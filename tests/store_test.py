@@ -0,0 +1,68 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Scipp contributors (https://github.com/scipp)
+
+from types import SimpleNamespace
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.colors import to_rgba
+
+from mplcanvas.render import prepare_store
+from mplcanvas.store import series_store
+
+
+def test_series_store_updates_limits_and_data():
+    fig, ax = plt.subplots()
+    store = series_store(ax)
+    assert series_store(ax) is store
+    line = store.plot([0, 1, 2], [0, 5, 10])
+    store.plot([0, 1], [-3, 1], color="red")
+    assert ax.get_ylim()[0] < -3
+    assert ax.get_ylim()[1] > 10
+    line.set_ydata([1, 2, 3])
+    assert line.get_ydata().tolist() == [1, 2, 3]
+    assert len(store) == 2
+    plt.close(fig)
+
+
+def test_prepare_store_batches_lines_and_skips_series_out_of_view():
+    fig, ax = plt.subplots()
+    store = series_store(ax)
+    for offset in range(10):
+        store.plot([0, 1], [offset, offset + 0.5], color=f"C{offset}")
+    store.scatter([0.5], [0.5], s=16, color="black")
+    canvas = SimpleNamespace(width=640, height=480)
+    limits = {"xmin": 0, "xmax": 1, "ymin": 0, "ymax": 2.9}
+    lines, markers = prepare_store(store, ax.transData, canvas, limits)
+    # Only the 3 lines starting below y=2.9 are drawn, in one batch
+    assert lines["counts"].tolist() == [2, 2, 2]
+    assert len(np.unique(lines["colors"], axis=0)) == 3
+    assert markers["size"] == 4.0
+    plt.close(fig)
+
+
+def test_series_store_private_matplotlib_apis():
+    # The store relies on these to behave like matplotlib artists
+    fig, ax = plt.subplots()
+    assert callable(ax._request_autoscale_view)
+    assert callable(ax._get_lines.get_next_color)
+    assert callable(ax._get_patches_for_fill.get_next_color)
+    store = series_store(ax)
+    ax.plot([0, 1])
+    assert store.plot([0, 1]).get_color() == to_rgba("C1")
+    plt.close(fig)
+
+
+def test_series_store_works_without_private_matplotlib_apis(monkeypatch):
+    fig, ax = plt.subplots()
+    monkeypatch.setattr(ax, "_request_autoscale_view", None)
+    monkeypatch.delattr(ax, "_get_lines")
+    monkeypatch.delattr(ax, "_get_patches_for_fill")
+    store = series_store(ax)
+    first = store.plot([0, 1], [0, 20])
+    second = store.plot([0, 1], [0, 1])
+    assert ax.get_ylim()[1] >= 20
+    assert first.get_color() == to_rgba("C0")
+    assert second.get_color() == to_rgba("C1")
+    assert store.scatter([0], [0]).get_color() == to_rgba("C0")
+    plt.close(fig)
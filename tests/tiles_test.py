@@ -0,0 +1,73 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Scipp contributors (https://github.com/scipp)
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+from mplcanvas.recording import RecordingCanvas
+from mplcanvas.render import emit_axes, prepare_axes
+from mplcanvas.tiles import ImagePyramid, TileCache, reduce_image
+
+
+def test_reduce_image_averages_blocks_and_repeats_odd_edges():
+    data = np.arange(20, dtype=float).reshape(4, 5)
+    reduced = reduce_image(data)
+    assert reduced.shape == (2, 3)
+    assert np.array_equal(reduced, [[3.0, 5.0, 6.5], [13.0, 15.0, 16.5]])
+    assert reduce_image(data[:3]).tolist() == [[3.0, 5.0, 6.5], [10.5, 12.5, 14.0]]
+
+
+def test_reduce_image_keeps_integer_colors():
+    data = np.zeros((2, 2, 3), dtype=np.uint8)
+    data[0, 0] = 255
+    reduced = reduce_image(data)
+    assert reduced.dtype == np.uint8
+    assert reduced.tolist() == [[[64, 64, 64]]]
+
+
+def test_image_pyramid_levels_are_built_lazily():
+    pyramid = ImagePyramid(np.ones((1000, 300)), tile_size=100, memmap=True)
+    assert pyramid.nlevels == 5
+    assert len(pyramid.levels) == 1
+    assert pyramid.tile(4, 0, 0).shape == (63, 19)
+    assert len(pyramid.levels) == 5
+    assert isinstance(pyramid.levels[-1], np.memmap)
+    assert pyramid.choose_level(0.5) == 0
+    assert pyramid.choose_level(2.5) == 1
+    assert pyramid.choose_level(1000) == 4
+
+
+def test_coarse_tiles_are_drawn_at_scale_and_clipped_to_the_image():
+    fig, ax = plt.subplots(figsize=(4, 3), dpi=72)
+    ax.imshow(np.zeros((1001, 1001)), aspect="auto")
+    canvas = RecordingCanvas(288, 216)
+    cache = TileCache(canvas_class=RecordingCanvas)
+    prepared = prepare_axes(ax, canvas, context={"tiles": cache})
+    (item,) = prepared["artists"]
+    # Level 2 has 251 pixels, the last one covering the last pixel of the image
+    assert item["keys"].tolist() == [[2, 0, 0]]
+    left, _, width, _ = prepared["frame"]
+    assert item["width"][0] == pytest.approx(width * 1004 / 1001, abs=1)
+    assert item["extent"][0] == pytest.approx(left)
+    assert item["extent"][2] == pytest.approx(left + width)
+    plt.close(fig)
+
+
+def test_tiles_are_colormapped_when_prepared(monkeypatch):
+    fig, ax = plt.subplots(figsize=(4, 3), dpi=72)
+    image = ax.imshow(np.arange(16.0).reshape(4, 4))
+    canvas = RecordingCanvas(288, 216)
+    cache = TileCache(canvas_class=RecordingCanvas)
+    prepared = prepare_axes(ax, canvas, context={"tiles": cache})
+    assert len(cache._staged) == 1
+    monkeypatch.setattr(
+        image, "to_rgba", lambda *args, **kwargs: pytest.fail("colormapped when sent")
+    )
+    emit_axes(prepared, canvas)
+    assert not cache._staged
+    assert len(cache._tiles) == 1
+    # Tiles in the cache are not colormapped again
+    emit_axes(prepare_axes(ax, canvas, context={"tiles": cache}), canvas)
+    assert not cache._staged
+    plt.close(fig)
@@ -0,0 +1,93 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Scipp contributors (https://github.com/scipp)
+
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+from mplcanvas import pyplot as plt
+from mplcanvas.toolbar import WHEEL_INTERVAL
+
+
+def acknowledge(fig, frame):
+    """Send the acknowledgement of a frame, as the browser does"""
+    data = io.BytesIO()
+    Image.new("RGB", (1, 1), f"#{frame:06x}").save(data, format="png")
+    fig._on_frame_ack({"new": data.getvalue()})
+
+
+def test_wheel_only_zooms_with_the_pan_and_zoom_tools():
+    fig, ax = plt.subplots()
+    ax.plot([0, 1], [0, 1])
+    fig.draw()
+    toolbar = fig.toolbar
+    toolbar._mouse_position = tuple(ax.bbox.bounds[:2] + ax.bbox.size / 2)
+    xlim = ax.get_xlim()
+    for tool in (None, "select"):
+        toolbar._active_tool = tool
+        toolbar._on_canvas_mouse_wheel(0, -100)
+        assert ax.get_xlim() == xlim
+    toolbar._active_tool = "pan"
+    toolbar._on_canvas_mouse_wheel(0, -100)
+    assert ax.get_xlim()[1] - ax.get_xlim()[0] < xlim[1] - xlim[0]
+
+
+def test_wheel_preview_is_kept_until_the_frame_is_sent():
+    fig, ax = plt.subplots()
+    ax.plot([0, 1], [0, 1])
+    toolbar = fig.toolbar
+    toolbar._active_tool = "zoom"
+    toolbar._mouse_position = tuple(ax.bbox.bounds[:2] + ax.bbox.size / 2)
+    previews = []
+    draw_preview = toolbar._draw_wheel_preview
+
+    def spy():
+        previews.append(toolbar._wheel_transform(ax)[0])
+        draw_preview()
+
+    toolbar._draw_wheel_preview = spy
+
+    async def zoom():
+        fig.draw()
+        acknowledge(fig, 1)
+        fig.draw()
+        fig.draw()
+        # The browser has not displayed the last two frames yet
+        toolbar._on_canvas_mouse_wheel(0, -100)
+        await asyncio.sleep(2 * WHEEL_INTERVAL)
+        assert id(ax) in fig._dirty
+        # The preview still shows the zoom, which is applied to the limits
+        assert toolbar._wheel_shown is not None
+        assert previews[-1] == pytest.approx(1.2)
+        acknowledge(fig, 3)
+        assert id(ax) not in fig._dirty
+        assert toolbar._wheel_shown is None
+
+    asyncio.run(zoom())
+
+
+def test_zoom_drag_uses_the_interactive_quality_profile():
+    fig, ax = plt.subplots()
+    ax.plot([0, 1], [0, 1])
+    fig.draw()
+    toolbar = fig.toolbar
+    toolbar._active_tool = "zoom"
+    qualities = []
+    draw = fig.draw
+
+    def spy(*args, **kwargs):
+        qualities.append(fig._quality)
+        draw(*args, **kwargs)
+
+    fig.draw = spy
+    x0, y0, width, height = ax.bbox.bounds
+    top = fig.canvas.height - (y0 + height)
+    toolbar._on_canvas_mouse_down(x0 + width / 4, top + height / 4)
+    assert fig._quality == "interactive"
+    toolbar._on_canvas_mouse_move(x0 + width / 2, top + height / 2)
+    toolbar._on_canvas_mouse_up(x0 + width / 2, top + height / 2)
+    assert fig._quality == "final"
+    assert qualities[-1] == "final"
+    assert ax.get_xlim()[1] - ax.get_xlim()[0] < 1
@@ -0,0 +1,49 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Scipp contributors (https://github.com/scipp)
+
+import threading
+
+import numpy as np
+import pytest
+
+from mplcanvas import UpdateQueue
+from mplcanvas import pyplot as plt
+
+
+def test_flush_coalesces_updates_from_threads_and_redraws(monkeypatch):
+    fig, ax = plt.subplots()
+    (line,) = ax.plot([0, 1], [0, 1])
+    scatter = ax.scatter([0], [0])
+    drawn = []
+    monkeypatch.setattr(fig, "draw", drawn.append)
+    updates = UpdateQueue(fig)
+
+    def produce():
+        for i in range(10):
+            updates.set_data(line, np.arange(i + 2), np.zeros(i + 2))
+        updates.set_data(scatter, [1, 2], [3, 4])
+
+    thread = threading.Thread(target=produce)
+    thread.start()
+    thread.join()
+    assert updates.dropped == 9
+    updates.flush()
+    assert len(line.get_xdata()) == 11
+    assert scatter.get_offsets().tolist() == [[1, 3], [2, 4]]
+    assert drawn == [[ax]]
+
+
+def test_flush_applies_the_other_updates_when_one_fails(monkeypatch, caplog):
+    fig, ax = plt.subplots()
+    (line,) = ax.plot([0, 1], [0, 1])
+    drawn = []
+    monkeypatch.setattr(fig, "draw", drawn.append)
+    updates = UpdateQueue(fig)
+    updates.set_xlim(ax, 0, 1, unknown=True)
+    updates.set_data(line, [0, 1, 2], [2, 1, 0])
+    updates.flush()
+    assert "set_xlim" in caplog.text
+    assert line.get_ydata().tolist() == [2, 1, 0]
+    assert drawn == [[ax]]
+    with pytest.raises(TypeError):
+        updates.set_data(line, [[0, 1]])